@@ -1,6 +1,12 @@
 from .indexer import *
 from .utility import *
 from .search import *
+from .boolean_search import *
+from .benchmark import *
+from .preprocess_benchmark import *
+from .spell_benchmark import *
+from .serving import *
+from .sharding import *
 from .link_analysis import *
 from .classification import *
 from .clustering import *
@@ -0,0 +1,387 @@
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import subprocess
+import tracemalloc
+
+import numpy as np
+
+from .search import SearchEngine
+from .indexer import Indexes, Index_reader
+from .utility import MetricsRegistry, Preprocessor, SearchProfile
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+class SearchBenchmark:
+    configurations = [
+        {"method": "ltn.lnn", "safe_ranking": True},
+        {"method": "ltn.lnn", "safe_ranking": False},
+        {"method": "ltc.lnc", "safe_ranking": True},
+        {"method": "ltc.lnc", "safe_ranking": False},
+        {"method": "OkapiBM25", "safe_ranking": True},
+        {"method": "OkapiBM25", "safe_ranking": False},
+        {"method": "unigram", "smoothing_method": "naive"},
+        {"method": "unigram", "smoothing_method": "bayes"},
+        {"method": "unigram", "smoothing_method": "mixture"},
+    ]
+
+    def __init__(
+        self,
+        search_engine,
+        documents,
+        number_of_queries=200,
+        max_results=10,
+        warmup_queries=10,
+        seed=0,
+        crawled_movies=None,
+    ):
+        """
+        Initializes the SearchBenchmark.
+
+        Parameters
+        ----------
+        search_engine : SearchEngine
+            The search engine to benchmark.
+        documents : dict
+            The documents index ({document_id: document}) the query log is generated from.
+        number_of_queries : int
+            The number of queries in the synthetic query log.
+        max_results : int
+            The number of results requested per query.
+        warmup_queries : int
+            The number of queries run before measuring each configuration.
+        seed : int
+            The seed of the query log, so that runs on different commits replay the same queries.
+        crawled_movies : list, optional
+            The crawled movies (IMDB_crawled.json). If given, the queries are made of their raw
+            titles, star names and summaries, the way users type them.
+        """
+        self.search_engine = search_engine
+        self.documents = documents
+        self.crawled_movies = crawled_movies
+        # only the query log generator needs a preprocessor when there is no search engine
+        self.preprocessor = (
+            search_engine.query_analyzer.preprocessor if search_engine is not None else Preprocessor([])
+        )
+        self.number_of_queries = number_of_queries
+        self.max_results = max_results
+        self.warmup_queries = warmup_queries
+        self.seed = seed
+        self.weights = {Indexes.STARS: 1, Indexes.GENRES: 1, Indexes.SUMMARIES: 1}
+
+    def generate_queries(self):
+        """
+        Generates a synthetic query log from the documents.
+
+        Each query is either the movie's title (when it is known), a short run of consecutive
+        summary words, or its first two star names.
+
+        Returns
+        -------
+        list of str
+            The queries.
+
+        Note
+        -------
+            The documents index only holds the preprocessed terms, and preprocessing them again
+            can change them (e.g. 'cours' becomes 'cour'), so queries made of them would read
+            other postings than the queries of users. The raw text of the crawled movies is used
+            when it is given; otherwise only the terms that preprocess to themselves are used.
+        """
+        rng = random.Random(self.seed)
+        if self.crawled_movies is not None:
+            movies = sorted(
+                (movie for movie in self.crawled_movies if movie["id"] in self.documents),
+                key=lambda movie: movie["id"],
+            )
+            documents = [self.get_raw_document(movie) for movie in movies]
+        else:
+            documents = [self.get_stable_document(self.documents[doc_id]) for doc_id in sorted(self.documents)]
+        documents = [
+            document for document in documents if document.get("title") or document["stars"] or document["summaries"]
+        ]
+        if not documents:
+            raise ValueError("None of the documents has a title, stars or summaries to make queries of.")
+
+        queries = []
+        while len(queries) < self.number_of_queries:
+            document = rng.choice(documents)
+            sources = ["summaries", "stars"]
+            if document.get("title"):
+                sources.append("title")
+            source = rng.choice(sources)
+
+            if source == "title":
+                query = document["title"]
+            elif source == "stars":
+                query = " ".join(document["stars"][:2])
+            else:
+                words = document["summaries"]
+                length = rng.randint(2, 4)
+                start = rng.randint(0, max(len(words) - length, 0))
+                query = " ".join(words[start : start + length])
+
+            if query.strip():
+                queries.append(query)
+        return queries
+
+    def get_raw_document(self, movie):
+        """
+        Returns the title, star names and summary words of a crawled movie.
+        """
+        summaries = movie.get("summaries") or [movie.get("first_page_summary") or ""]
+        return {
+            "title": movie.get("title"),
+            "stars": movie.get("stars") or [],
+            "summaries": " ".join(summaries).split(),
+        }
+
+    def get_stable_document(self, document):
+        """
+        Returns the stars and summaries of an indexed document without the terms that change
+        when they are preprocessed again.
+        """
+        preprocess_text = self.preprocessor.preprocess_text
+        return {
+            field: [term for term in document.get(field, []) if preprocess_text(term) == [term]]
+            for field in ("stars", "summaries")
+        }
+
+    def run_configuration(self, configuration, queries):
+        """
+        Replays the query log with one configuration.
+
+        Parameters
+        ----------
+        configuration : dict
+            The method and its options (safe_ranking or smoothing_method).
+        queries : list of str
+            The query log.
+
+        Returns
+        -------
+        dict
+            QPS, latency percentiles (in milliseconds), the peak memory allocated while searching
+            and the postings/documents counters of the engine.
+        """
+        options = dict(configuration)
+        method = options.pop("method")
+
+        for query in queries[: self.warmup_queries]:
+            self.search_engine.search(
+                query, method, self.weights, max_results=self.max_results, **options
+            )
+
+        registry = MetricsRegistry()
+        latencies = []
+        start = time.perf_counter()
+        for query in queries:
+            profile = SearchProfile([registry])
+            query_start = time.perf_counter()
+            self.search_engine.search(
+                query,
+                method,
+                self.weights,
+                max_results=self.max_results,
+                profile=profile,
+                **options,
+            )
+            latencies.append(time.perf_counter() - query_start)
+            profile.finish()
+        elapsed = time.perf_counter() - start
+
+        # allocations are traced in a separate pass so tracing does not slow down the timed one
+        tracemalloc.start()
+        for query in queries:
+            self.search_engine.search(
+                query, method, self.weights, max_results=self.max_results, **options
+            )
+        _, peak_allocated = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        latencies = np.array(latencies) * 1e3
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        summary = registry.summary()
+        return {
+            "configuration": configuration,
+            "queries": len(queries),
+            "qps": len(queries) / elapsed,
+            "latency_ms": {
+                "mean": float(latencies.mean()),
+                "p50": float(p50),
+                "p95": float(p95),
+                "p99": float(p99),
+                "max": float(latencies.max()),
+            },
+            "peak_allocated_bytes": peak_allocated,
+            "postings_read": summary.get("counter.postings_read"),
+            "documents_scored": summary.get("counter.documents_scored"),
+        }
+
+    def run(self):
+        """
+        Runs every configuration on the same query log.
+
+        Returns
+        -------
+        dict
+            The environment of the run and the results of each configuration.
+        """
+        queries = self.generate_queries()
+        results = []
+        for configuration in self.configurations:
+            results.append(self.run_configuration(configuration, queries))
+
+        return {
+            "commit": get_commit(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": self.seed,
+            "max_results": self.max_results,
+            "peak_rss_bytes": get_peak_rss(),
+            "results": results,
+        }
+
+
+def load_crawled_movies(path):
+    """
+    Reads the crawled movies, or returns None if the file does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+def get_commit():
+    """
+    Returns the current git commit, or None outside a git checkout.
+    """
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def get_peak_rss():
+    """
+    Returns the peak resident set size of the process in bytes, or None if it is unknown.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def configuration_name(configuration):
+    """
+    Returns a readable name of a benchmark configuration, e.g. `OkapiBM25 (unsafe)`.
+    """
+    method = configuration["method"]
+    if method == "unigram":
+        return f"{method} ({configuration['smoothing_method']})"
+    return f"{method} ({'safe' if configuration['safe_ranking'] else 'unsafe'})"
+
+
+def compare_benchmark_results(baseline, current, tolerance=0.1):
+    """
+    Compares two benchmark runs configuration by configuration.
+
+    Parameters
+    ----------
+    baseline : dict
+        The results of the earlier run (as stored by the benchmark).
+    current : dict
+        The results of the new run.
+    tolerance : float
+        The relative slowdown of p50 or p95 latency that counts as a regression.
+
+    Returns
+    -------
+    list of dict
+        One entry per configuration present in both runs, with the latency ratios and whether
+        it regressed.
+    """
+    baseline_results = {
+        configuration_name(result["configuration"]): result for result in baseline["results"]
+    }
+    comparison = []
+    for result in current["results"]:
+        name = configuration_name(result["configuration"])
+        if name not in baseline_results:
+            continue
+        old = baseline_results[name]["latency_ms"]
+        new = result["latency_ms"]
+        p50_ratio = new["p50"] / old["p50"] if old["p50"] else float("inf")
+        p95_ratio = new["p95"] / old["p95"] if old["p95"] else float("inf")
+        comparison.append(
+            {
+                "configuration": name,
+                "p50_ratio": p50_ratio,
+                "p95_ratio": p95_ratio,
+                "regressed": p50_ratio > 1 + tolerance or p95_ratio > 1 + tolerance,
+            }
+        )
+    return comparison
+
+
+def print_results(results):
+    """
+    Prints a table of a benchmark run.
+    """
+    print(f"commit: {results['commit']}  peak rss: {results['peak_rss_bytes']}")
+    print(f"{'configuration':<22}{'qps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak KiB':>12}")
+    for result in results["results"]:
+        latency = result["latency_ms"]
+        print(
+            f"{configuration_name(result['configuration']):<22}{result['qps']:>10.1f}"
+            f"{latency['p50']:>10.3f}{latency['p95']:>10.3f}{latency['p99']:>10.3f}"
+            f"{result['peak_allocated_bytes'] / 1024:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a synthetic query log against every search method.")
+    parser.add_argument("--indexes", default=None, help="path to the indexes directory")
+    parser.add_argument("--queries", type=int, default=200, help="number of queries in the log")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the query log")
+    parser.add_argument("--crawl", default="IMDB_crawled.json", help="the crawled movies the queries are made of, if present")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to store the results")
+    parser.add_argument("--compare", default=None, help="an earlier results file to compare against")
+    args = parser.parse_args()
+
+    search_engine = SearchEngine(args.indexes)
+    documents = Index_reader(search_engine.path, Indexes.DOCUMENTS).index
+    crawled_movies = load_crawled_movies(args.crawl)
+    benchmark = SearchBenchmark(
+        search_engine, documents, number_of_queries=args.queries, seed=args.seed, crawled_movies=crawled_movies
+    )
+    results = benchmark.run()
+    print_results(results)
+
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=4)
+
+    if args.compare is not None:
+        with open(args.compare, "r") as file:
+            baseline = json.load(file)
+        for row in compare_benchmark_results(baseline, results):
+            status = "REGRESSED" if row["regressed"] else "ok"
+            print(f"{row['configuration']:<22} p50 x{row['p50_ratio']:.2f}  p95 x{row['p95_ratio']:.2f}  {status}")
@@ -0,0 +1,439 @@
+import re
+from bisect import bisect_left
+from types import MappingProxyType
+
+from .indexer import Indexes
+
+FIELDS = {field.value: field for field in [Indexes.STARS, Indexes.GENRES, Indexes.SUMMARIES]}
+TOKEN_PATTERN = re.compile(r'\s*(?:(\()|(\))|(\w+):"([^"]*)"|(\w+):([^\s()"]+)|"([^"]*)"|([^\s()"]+))')
+
+
+def galloping_search(postings, target, low=0):
+    """
+    Finds the first position of a sorted list at or after `low` whose value is not smaller
+    than `target`, by doubling the step before the binary search.
+
+    Returns
+    -------
+    int
+        The position, or len(postings) if every value is smaller.
+    """
+    step = 1
+    high = low
+    while high < len(postings) and postings[high] < target:
+        low = high + 1
+        high += step
+        step *= 2
+    return bisect_left(postings, target, low, min(high + 1, len(postings)))
+
+
+def intersect_postings(postings1, postings2):
+    """
+    Intersects two sorted posting lists.
+
+    Note
+    -------
+        When one list is much shorter, each of its documents is galloped to in the longer one,
+        which reads O(m log(n / m)) postings instead of all n + m.
+
+    Returns
+    -------
+    list
+        The sorted documents in both lists.
+    """
+    if len(postings1) > len(postings2):
+        postings1, postings2 = postings2, postings1
+    result = []
+    if len(postings1) * 8 < len(postings2):
+        position = 0
+        for doc_id in postings1:
+            position = galloping_search(postings2, doc_id, position)
+            if position == len(postings2):
+                break
+            if postings2[position] == doc_id:
+                result.append(doc_id)
+        return result
+
+    i = j = 0
+    while i < len(postings1) and j < len(postings2):
+        if postings1[i] == postings2[j]:
+            result.append(postings1[i])
+            i += 1
+            j += 1
+        elif postings1[i] < postings2[j]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def subtract_postings(postings1, postings2):
+    """
+    Returns the documents of the sorted list `postings1` that are not in the sorted list `postings2`.
+    """
+    result = []
+    position = 0
+    for doc_id in postings1:
+        position = galloping_search(postings2, doc_id, position)
+        if position == len(postings2) or postings2[position] != doc_id:
+            result.append(doc_id)
+    return result
+
+
+def unite_postings(postings_lists):
+    """
+    Returns the sorted union of several sorted posting lists.
+    """
+    if len(postings_lists) == 1:
+        return postings_lists[0]
+    return sorted(set().union(*postings_lists))
+
+
+class BooleanQueryParser:
+    def __init__(self, query_analyzer):
+        """
+        Parses boolean field queries such as `stars:pacino AND genres:crime NOT summaries:war`.
+
+        Grammar
+        -------
+            query := and_query (OR and_query)*
+            and_query := unary ([AND] unary | NOT unary)*
+            unary := NOT unary | '(' query ')' | [field:]word | [field:]"words" | [field:]pattern
+
+        Adjacent terms are ANDed, `a NOT b` means `a AND NOT b`, and a term without a field
+        matches any of stars, genres and summaries. The words of a term are analyzed like the
+        field they are looked up in; a term of several text words needs all of them, while in a
+        keyword field (e.g. `stars:"al pacino"`) the whole term is one keyword.
+        A word with `*` or `?` (e.g. `stars:pac*`) is a wildcard pattern; it is lower-cased but
+        not stemmed, and matches any of the indexed terms it expands to.
+
+        Parameters
+        ----------
+        query_analyzer : QueryAnalyzer
+            The analyzer used to preprocess the words of the terms.
+        """
+        self.query_analyzer = query_analyzer
+
+    def tokenize(self, query):
+        """
+        Splits a query into parentheses, operators and (field, text) terms.
+
+        Returns
+        -------
+        list
+            The tokens.
+        """
+        tokens = []
+        position = 0
+        query = query.strip()
+        while position < len(query):
+            match = TOKEN_PATTERN.match(query, position)
+            if match is None or match.end() == position:
+                raise ValueError(f"Invalid boolean query near: {query[position:]!r}")
+            position = match.end()
+            opening, closing, quoted_field, quoted_text, field, text, quoted, word = match.groups()
+            if opening:
+                tokens.append('(')
+            elif closing:
+                tokens.append(')')
+            elif quoted_field is not None:
+                tokens.append(('term', quoted_field, quoted_text))
+            elif field is not None:
+                tokens.append(('term', field, text))
+            elif quoted is not None:
+                tokens.append(('term', None, quoted))
+            elif word in ('AND', 'OR', 'NOT'):
+                tokens.append(word)
+            elif word.endswith(':'):
+                raise ValueError(f"Missing term after {word!r} in boolean query")
+            else:
+                tokens.append(('term', None, word))
+        return tokens
+
+    def parse(self, query):
+        """
+        Parses a query.
+
+        Returns
+        -------
+        tuple
+            The query tree. Its nodes are ('and', [nodes]), ('or', [nodes]), ('not', node),
+            ('term', field, term) for one preprocessed term in a field (None for any field),
+            ('wildcard', field, pattern) and ('all',) for a term that preprocessing removed
+            (e.g. a stopword).
+        """
+        self.tokens = self.tokenize(query)
+        self.position = 0
+        if not self.tokens:
+            raise ValueError("Empty boolean query")
+        node = self.parse_or()
+        if self.position != len(self.tokens):
+            raise ValueError(f"Unexpected {self.tokens[self.position]!r} in boolean query")
+        return node
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() == 'OR':
+            self.position += 1
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else ('or', children)
+
+    def parse_and(self):
+        children = [self.parse_unary()]
+        while self.peek() not in (None, 'OR', ')'):
+            if self.peek() == 'AND':
+                self.position += 1
+                children.append(self.parse_unary())
+            elif self.peek() == 'NOT':
+                self.position += 1
+                children.append(self.negate(self.parse_unary()))
+            else:
+                children.append(self.parse_unary())
+        return children[0] if len(children) == 1 else ('and', children)
+
+    def parse_unary(self):
+        token = self.peek()
+        if token is None:
+            raise ValueError("Boolean query ends unexpectedly")
+        self.position += 1
+        if token == 'NOT':
+            return self.negate(self.parse_unary())
+        if token == '(':
+            node = self.parse_or()
+            if self.peek() != ')':
+                raise ValueError("Missing ')' in boolean query")
+            self.position += 1
+            return node
+        if token in ('AND', 'OR', ')'):
+            raise ValueError(f"Unexpected {token!r} in boolean query")
+
+        _, field, text = token
+        if field is not None and field not in FIELDS:
+            raise ValueError(f"Unknown field {field!r}; use one of {', '.join(FIELDS)}")
+        if '*' in text or '?' in text:
+            return ('wildcard', field, text.lower())
+        if field is None and self.query_analyzer.field_analyzers:
+            # the fields analyze the words differently, so the term is looked up in each of them
+            nodes = [node for node in (self.parse_text(name, text) for name in FIELDS) if node != ('all',)]
+            if not nodes:
+                return ('all',)
+            return nodes[0] if len(nodes) == 1 else ('or', nodes)
+        return self.parse_text(field, text)
+
+    def negate(self, node):
+        """
+        Negates a node. A term that preprocessing removed is dropped like it is from an AND, so
+        `NOT the` restricts nothing instead of matching no document.
+        """
+        return node if node == ('all',) else ('not', node)
+
+    def parse_text(self, field, text):
+        """
+        Analyzes the text of a term like the field it is looked up in was indexed.
+        """
+        analyzer = None if field is None else self.query_analyzer.field_analyzers.get(FIELDS[field])
+        words = self.query_analyzer.analyze(text) if analyzer is None else analyzer.analyze(text)
+        terms = [('term', field, term) for term in words]
+        if not terms:
+            return ('all',)
+        return terms[0] if len(terms) == 1 else ('and', terms)
+
+
+class BooleanSearch:
+    def __init__(self, search_engine):
+        """
+        Answers boolean field queries on the indexes of a search engine.
+
+        Parameters
+        ----------
+        search_engine : SearchEngine
+            The engine whose indexes, analyzer and scorers are used.
+
+        Note
+        -------
+            The sorted posting lists are built here, once, so that a boolean search only reads
+            them and one instance can serve concurrent searches on a frozen engine.
+        """
+        self.search_engine = search_engine
+        self.sorted_postings = {
+            field: MappingProxyType(
+                {term: sorted(postings) for term, postings in search_engine.document_indexes[field].index.items()}
+            )
+            for field in FIELDS.values()
+        }
+        documents = set()
+        for field in FIELDS.values():
+            documents.update(search_engine.document_lengths_index[field].index.keys())
+        self.all_documents = sorted(documents)
+
+    def get_postings(self, field, term):
+        """
+        Returns the sorted document IDs of a term in a field.
+
+        Parameters
+        ----------
+        field : Indexes or None
+            The field. None means any of the fields.
+        term : str
+            The preprocessed term.
+
+        Returns
+        -------
+        list
+            The sorted document IDs.
+        """
+        if field is None:
+            return unite_postings([self.get_postings(field, term) for field in FIELDS.values()])
+        return self.sorted_postings[field].get(term, [])
+
+    def expand_wildcard(self, node):
+        """
+        Expands a wildcard node to ('term', field, term) nodes with the term dictionaries.
+
+        Returns
+        -------
+        list of tuple
+            The term nodes, one per field and matching term.
+        """
+        fields = FIELDS.values() if node[1] is None else [FIELDS[node[1]]]
+        return [
+            ('term', field.value, term)
+            for field in fields
+            for term in self.search_engine.expand_term(node[2], field)
+        ]
+
+    def get_all_documents(self):
+        """
+        Returns the sorted IDs of all the documents, the universe of a leading NOT.
+        """
+        return self.all_documents
+
+    def estimate_cost(self, node):
+        """
+        Estimates the number of documents a node matches, from the posting lengths.
+        """
+        kind = node[0]
+        if kind == 'term':
+            field = None if node[1] is None else FIELDS[node[1]]
+            if field is None:
+                return sum(len(self.get_postings(field, node[2])) for field in FIELDS.values())
+            return len(self.get_postings(field, node[2]))
+        if kind == 'wildcard':
+            return sum(self.estimate_cost(child) for child in self.expand_wildcard(node))
+        if kind == 'or':
+            return sum(self.estimate_cost(child) for child in node[1])
+        if kind == 'and':
+            costs = [self.estimate_cost(child) for child in node[1] if child[0] not in ('not', 'all')]
+            return min(costs) if costs else len(self.get_all_documents())
+        return len(self.get_all_documents())
+
+    def evaluate(self, node):
+        """
+        Evaluates a query tree.
+
+        Note
+        -------
+            The positive children of an AND are intersected from the shortest posting list up,
+            so every intersection is at most as long as the shortest list and the evaluation stops
+            as soon as it is empty. The NOT children are subtracted from the result at the end.
+
+        Returns
+        -------
+        list
+            The sorted IDs of the matching documents.
+        """
+        kind = node[0]
+        if kind == 'term':
+            field = None if node[1] is None else FIELDS[node[1]]
+            return self.get_postings(field, node[2])
+        if kind == 'all':
+            return self.get_all_documents()
+        if kind == 'wildcard':
+            terms = self.expand_wildcard(node)
+            return unite_postings([self.evaluate(term) for term in terms]) if terms else []
+        if kind == 'not':
+            return subtract_postings(self.get_all_documents(), self.evaluate(node[1]))
+        if kind == 'or':
+            return unite_postings([self.evaluate(child) for child in node[1]])
+
+        positive = [child for child in node[1] if child[0] not in ('not', 'all')]
+        negative = [child[1] for child in node[1] if child[0] == 'not']
+        positive.sort(key=self.estimate_cost)
+        result = self.evaluate(positive[0]) if positive else self.get_all_documents()
+        for child in positive[1:]:
+            if not result:
+                return []
+            result = intersect_postings(result, self.evaluate(child))
+        for child in negative:
+            if not result:
+                return []
+            result = subtract_postings(result, self.evaluate(child))
+        return result
+
+    def get_query_terms(self, node, terms=None):
+        """
+        Collects the positive terms of a query tree per field, for ranking.
+
+        Returns
+        -------
+        dict
+            The terms and their counts per field ({Indexes: {term: count}}).
+        """
+        if terms is None:
+            terms = {field: {} for field in FIELDS.values()}
+        kind = node[0]
+        if kind == 'term':
+            fields = FIELDS.values() if node[1] is None else [FIELDS[node[1]]]
+            for field in fields:
+                terms[field][node[2]] = terms[field].get(node[2], 0) + 1
+        elif kind == 'wildcard':
+            for child in self.expand_wildcard(node):
+                self.get_query_terms(child, terms)
+        elif kind in ('and', 'or'):
+            for child in node[1]:
+                self.get_query_terms(child, terms)
+        return terms
+
+    def search(self, query, method=None, weights=None, max_results=None):
+        """
+        Finds the documents that match a boolean query.
+
+        Parameters
+        ----------
+        query : str
+            The boolean query, e.g. `stars:pacino AND genres:crime NOT summaries:war`.
+        method : str ((n|l)(n|t)(n|c).(n|l)(n|t)(n|c)) | OkapiBM25, optional
+            If given, the matching documents are ranked with this method on the positive terms
+            of the query. Otherwise nothing is scored.
+        weights : dict, optional
+            The weights of the fields for ranking. Defaults to 1 for every field.
+        max_results : int, optional
+            The maximum number of results to return. If None, all results are returned.
+
+        Returns
+        -------
+        list
+            Without a method, the sorted IDs of the matching documents. With a method, tuples of
+            the document IDs and their scores sorted by their scores, ties by document ID.
+        """
+        # the parser keeps the position in the query, so every search gets its own
+        node = BooleanQueryParser(self.search_engine.query_analyzer).parse(query)
+        documents = self.evaluate(node)
+        if method is None:
+            return documents if max_results is None else documents[:max_results]
+
+        if weights is None:
+            weights = {field: 1 for field in FIELDS.values()}
+        final_scores = dict.fromkeys(documents, 0)
+        for field, field_terms in self.get_query_terms(node).items():
+            weight = weights.get(field, 0)
+            if weight == 0 or not field_terms:
+                continue
+            field_scores = self.search_engine.get_field_scores(field_terms, method, field, documents)
+            for doc_id, score in field_scores.items():
+                final_scores[doc_id] += weight * score
+        result = sorted(final_scores.items(), key=lambda x: (-x[1], x[0]))
+        return result if max_results is None else result[:max_results]
@@ -3,6 +3,7 @@ import os
 import numpy as np
 import itertools
 import random
+from ..utility.shingles import ShingleArrays, hash_shingles, jaccard_of_arrays
 
 
 class MinHashLSH:
@@ -12,39 +13,59 @@ class MinHashLSH:
 
         Parameters
         ----------
-        documents : list of str
-            The input documents for similarity analysis.
+        documents : iterable of str or list of str
+            The input documents for similarity analysis, as texts or as lists of words (e.g.
+            from `Preprocessor.iter_preprocess`). They are read once, when the characteristic
+            matrix is built.
         num_hashes : int
             Number of hashes for mini-hashing.
         """
         self.documents = documents
         self.num_hashes = num_hashes
 
+    def get_document_text(self, document):
+        """
+        Returns the lowercase text of a document given as a text or as a list of words.
+        """
+        if not isinstance(document, str):
+            document = ' '.join(document)
+        return document.lower()
+
     def shingle_document(self, document, k=2):
         """
-        Convert a document into a set of shingles.
+        Convert a document into its shingles.
 
         Parameters
         ----------
-        document : str
-            The input document.
+        document : str or list of str
+            The input document, as a text or as a list of words.
         k : int
             The size of each shingle.
 
         Returns
         ----------
-        set
-            A set of shingles.
+        np.ndarray
+            The sorted hashes of the distinct shingles.
         """
-        document = document.lower()
-        shingles = set()
+        return hash_shingles(self.get_document_text(document), k)
 
-        chars = [char for char in document]
+    def shingle_documents(self, documents, k=2):
+        """
+        Convert many documents into their shingles at once.
+
+        Parameters
+        ----------
+        documents : iterable of str or list of str
+            The input documents.
+        k : int
+            The size of each shingle.
 
-        for i in range(len(chars) - k + 1):
-            shingle = ''.join(chars[i : i + k])
-            shingles.add(shingle)
-        return shingles
+        Returns
+        ----------
+        ShingleArrays
+            The sorted hashes of the distinct shingles of every document, in one buffer.
+        """
+        return ShingleArrays.from_texts([self.get_document_text(document) for document in documents], k)
 
     def build_characteristic_matrix(self):
         """
@@ -55,28 +76,15 @@ class MinHashLSH:
         numpy.ndarray
             The binary characteristic matrix.
         """
-        all_shingles = set()
-        all_docs = self.documents
-        docs_shingles = []
-
-        for document in all_docs:
-            shingles = self.shingle_document(document)
-            docs_shingles.append(list(shingles))
-            all_shingles.update(shingles)
-        
-        doc_num = len(all_docs)
-        shingle_num = len(all_shingles)
+        docs_shingles = self.shingle_documents(self.documents)
+        # the columns are the distinct shingles of all the documents, in the order of their hashes
+        _, shingle_ids = np.unique(docs_shingles.values, return_inverse=True)
+        doc_ids = np.repeat(np.arange(len(docs_shingles)), docs_shingles.get_sizes())
+
+        doc_num = len(docs_shingles)
+        shingle_num = int(shingle_ids.max()) + 1 if len(shingle_ids) else 0
         characteristic_matrix = np.zeros((doc_num, shingle_num), dtype=int)
-        
-        shingles_index = {}
-        for idx, shingle in enumerate(all_shingles):
-            shingles_index[shingle] = idx
-        
-        for doc_idx in range(len(all_docs)):
-            shingles = docs_shingles[doc_idx]
-            for shingle in shingles:
-                characteristic_matrix[doc_idx, shingles_index[shingle]] = 1
-        
+        characteristic_matrix[doc_ids, shingle_ids] = 1
         return characteristic_matrix
 
     def min_hash_signature(self):
@@ -164,21 +172,17 @@ class MinHashLSH:
 
         Parameters
         ----------
-        first_set : set
-            Set of first shingled document.
-        second_set : set
-            Set of second shingled document.
+        first_set : np.ndarray
+            Sorted shingles of the first document.
+        second_set : np.ndarray
+            Sorted shingles of the second document.
 
         Returns
         ----------
         float
             Jaccard score.
         """
-        intersection = len(first_set.intersection(second_set))
-        union = len(first_set.union(second_set))
-        if union != 0:
-            return intersection / union
-        return 0
+        return jaccard_of_arrays(first_set, second_set)
 
     def jaccard_similarity_test(self, buckets, all_documents):
         """
@@ -193,6 +197,7 @@ class MinHashLSH:
         """
         correct_near_duplicates = 0
         all_near_duplicates = 0
+        shingled_documents = self.shingle_documents(all_documents)
 
         for bucket_id in buckets.keys():
             docs_in_this_bucket = buckets[bucket_id]
@@ -205,8 +210,8 @@ class MinHashLSH:
                     first_doc_id = comb[0]
                     second_doc_id = comb[1]
 
-                    first_shingled_doc = self.shingle_document(all_documents[first_doc_id], 2)
-                    second_shingled_doc = self.shingle_document(all_documents[second_doc_id], 2)
+                    first_shingled_doc = shingled_documents[first_doc_id]
+                    second_shingled_doc = shingled_documents[second_doc_id]
 
                     near_duplicated_jaccard_score = self.jaccard_score(first_shingled_doc, second_shingled_doc)
                     current_score = 0
@@ -215,7 +220,7 @@ class MinHashLSH:
                         random_doc_id = first_doc_id
                         while random_doc_id == first_doc_id or random_doc_id == second_doc_id:
                             random_doc_id = random.randint(0, len(all_documents) - 1)
-                        random_shingled_doc = self.shingle_document(all_documents[random_doc_id], 2)
+                        random_shingled_doc = shingled_documents[random_doc_id]
 
                         random_jaccard_score = self.jaccard_score(first_shingled_doc, random_shingled_doc)
 
@@ -228,32 +233,33 @@ class MinHashLSH:
         # a good score is around 0.8
         print("your final score in near duplicate detection:", correct_near_duplicates / all_near_duplicates)
 
-script_dir = os.path.dirname(os.path.abspath(__file__))
-fake_path = os.path.join(script_dir, "LSHFakeData.json")
-with open(fake_path, "r") as file:
-    fake_data = json.load(file)
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    fake_path = os.path.join(script_dir, "LSHFakeData.json")
+    with open(fake_path, "r") as file:
+        fake_data = json.load(file)
 
-file_path = os.path.abspath("./IMDB_crawled.json")
-with open(file_path, "r") as f:
-    real_data = json.load(f)
+    file_path = os.path.abspath("./IMDB_crawled.json")
+    with open(file_path, "r") as f:
+        real_data = json.load(f)
 
-fake = [' '.join(movie['summaries']) for movie in fake_data]
-real = [' '.join(movie['summaries']) for movie in real_data if movie['summaries'] and movie['summaries'] != 'No summary']
+    fake = [' '.join(movie['summaries']) for movie in fake_data]
+    real = [' '.join(movie['summaries']) for movie in real_data if movie['summaries'] and movie['summaries'] != 'No summary']
 
-all_data = fake + real
+    all_data = fake + real
 
-min_hash = MinHashLSH(all_data, num_hashes=100)
-buckets = min_hash.perform_lsh()
-print(f"Number of buckets : {len(buckets)}")
+    min_hash = MinHashLSH(all_data, num_hashes=100)
+    buckets = min_hash.perform_lsh()
+    print(f"Number of buckets : {len(buckets)}")
 
-min_hash.jaccard_similarity_test(buckets, all_data)
+    min_hash.jaccard_similarity_test(buckets, all_data)
 
-# min_hash = MinHashLSH(fake, num_hashes=100)
-# buckets = min_hash.perform_lsh()
-# print(f"Number of buckets : {len(buckets)}")
-# min_hash.jaccard_similarity_test(buckets, fake)
-# *****************************************************
-# min_hash = MinHashLSH(real, num_hashes=100)
-# buckets = min_hash.perform_lsh()
-# print(f"Number of buckets : {len(buckets)}")
-# min_hash.jaccard_similarity_test(buckets, real)
\ No newline at end of file
+    # min_hash = MinHashLSH(fake, num_hashes=100)
+    # buckets = min_hash.perform_lsh()
+    # print(f"Number of buckets : {len(buckets)}")
+    # min_hash.jaccard_similarity_test(buckets, fake)
+    # *****************************************************
+    # min_hash = MinHashLSH(real, num_hashes=100)
+    # buckets = min_hash.perform_lsh()
+    # print(f"Number of buckets : {len(buckets)}")
+    # min_hash.jaccard_similarity_test(buckets, real)
@@ -1,9 +1,13 @@
 from .document_lengths_index import *
+from .filter_index import *
 from .index import *
 from .index_reader import *
 from .indexes_enum import *
 from .LSH import *
 from .metadata_index import *
+from .range_index import *
+from .snippet_index import *
+from .term_dictionary import *
 from .tiered_index import *
 
 
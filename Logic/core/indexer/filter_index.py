@@ -0,0 +1,284 @@
+import json
+import numpy as np
+from .indexes_enum import Indexes, Index_types
+from .index_reader import Index_reader
+from ..utility.preprocess import Preprocessor
+
+# the fields that are filtered by value, and the fields that are filtered by a (min, max) range
+VALUE_FIELDS = ['genres', 'mpaa']
+RANGE_FIELDS = {'release_year': int, 'rating': float}
+# the genres of IMDb, to show the genres of a documents index (which holds them stemmed) by name
+GENRE_NAMES = [
+    'Action', 'Adult', 'Adventure', 'Animation', 'Biography', 'Comedy', 'Crime', 'Documentary',
+    'Drama', 'Family', 'Fantasy', 'Film-Noir', 'Game-Show', 'History', 'Horror', 'Music',
+    'Musical', 'Mystery', 'News', 'Reality-TV', 'Romance', 'Sci-Fi', 'Short', 'Sport',
+    'Talk-Show', 'Thriller', 'War', 'Western',
+]
+
+
+def encode_bitmap(bitmap):
+    """
+    Packs a boolean array into a hex string.
+    """
+    return np.packbits(bitmap).tobytes().hex()
+
+
+def decode_bitmap(encoded, number_of_documents):
+    """
+    Unpacks a hex string made by `encode_bitmap` into a boolean array.
+    """
+    packed = np.frombuffer(bytes.fromhex(encoded), dtype=np.uint8)
+    return np.unpackbits(packed, count=number_of_documents).astype(bool)
+
+
+class Filter_index:
+    def __init__(self, path='indexes/', crawled_data_path='IMDB_crawled.json'):
+        """
+        Initializes the Filter_index.
+
+        The release year, rating and mpaa are not kept in the documents index, so they are read
+        from the crawled movies. The genres are read from them too, as they are shown on IMDb;
+        a document that is not in the crawl gets the stemmed genres of the documents index
+        mapped back to the names in `GENRE_NAMES`.
+
+        Parameters
+        ----------
+        path : str
+            The path to the indexes.
+        crawled_data_path : str
+            The path to the crawled movies.
+
+        Raises
+        ------
+        ValueError
+            If a filtered field has no value in any document, e.g. because the crawl lacks it.
+        """
+        self.documents_index = Index_reader(path, index_name=Indexes.DOCUMENTS).index
+        self.document_ids = sorted(self.documents_index.keys())
+        self.crawled_data = self.read_crawled_data(crawled_data_path)
+        self.genre_names = self.get_genre_names()
+        self.filter_index = self.create_filter_index()
+        self.store_filter_index(path)
+
+    def read_crawled_data(self, crawled_data_path):
+        """
+        Reads the crawled movies of the indexed documents.
+
+        Returns
+        -------
+        dict
+            The crawled movies keyed by their IDs.
+        """
+        with open(crawled_data_path, 'r') as file:
+            movies = json.load(file)
+        return {movie['id']: movie for movie in movies if movie['id'] in self.documents_index}
+
+    def get_genre_names(self):
+        """
+        Maps the stemmed genres of the documents index back to their names.
+
+        Returns
+        -------
+        dict
+            The names of the genres keyed by their stems. Genres whose stems collide (Music and
+            Musical) keep the first name.
+        """
+        preprocessor = Preprocessor([])
+        genre_names = {}
+        for name in GENRE_NAMES:
+            for term in preprocessor.preprocess_text(name):
+                genre_names.setdefault(term, name)
+        return genre_names
+
+    def get_field_values(self, doc_id, field):
+        """
+        Returns the values of a document in a field, without the crawler's missing markers
+        (e.g. 'No mpaa').
+
+        Returns
+        -------
+        list of str
+            The values of the field.
+        """
+        if field == 'genres':
+            if doc_id in self.crawled_data:
+                return list(self.crawled_data[doc_id].get('genres') or [])
+            genres = self.documents_index[doc_id].get('genres', [])
+            return list(dict.fromkeys(self.genre_names.get(genre, genre) for genre in genres))
+        value = self.crawled_data.get(doc_id, {}).get(field)
+        if value is None or value.startswith('No '):
+            return []
+        if field in RANGE_FIELDS:
+            try:
+                RANGE_FIELDS[field](value)
+            except ValueError:
+                return []
+        return [value]
+
+    def create_filter_index(self):
+        """
+        Creates one bitmap per value of every filtered field.
+
+        Returns
+        -------
+        dict
+            The sorted document IDs (the position of a document in every bitmap) and the
+            encoded bitmaps of the form {field: {value: bitmap}}.
+        """
+        positions = {doc_id: i for i, doc_id in enumerate(self.document_ids)}
+        bitmaps = {}
+        for field in VALUE_FIELDS + list(RANGE_FIELDS):
+            field_bitmaps = {}
+            for doc_id in self.document_ids:
+                for value in self.get_field_values(doc_id, field):
+                    if value not in field_bitmaps:
+                        field_bitmaps[value] = np.zeros(len(self.document_ids), dtype=bool)
+                    field_bitmaps[value][positions[doc_id]] = True
+            bitmaps[field] = {
+                value: encode_bitmap(bitmap) for value, bitmap in sorted(field_bitmaps.items())
+            }
+        empty_fields = [field for field, field_bitmaps in bitmaps.items() if not field_bitmaps]
+        if empty_fields:
+            raise ValueError(
+                f"No document has a value for {', '.join(empty_fields)}; check the crawled movies"
+            )
+        return {'document_ids': self.document_ids, 'bitmaps': bitmaps}
+
+    def store_filter_index(self, path):
+        """
+        Stores the filter index to a file.
+
+        Parameters
+        ----------
+        path : str
+            The path to the directory where the indexes are stored.
+        """
+        path = path + Indexes.DOCUMENTS.value + '_' + Index_types.FILTER.value + '_index.json'
+        with open(path, 'w') as file:
+            json.dump(self.filter_index, file, indent=4)
+
+
+class Filter_bitmaps:
+    def __init__(self, filter_index):
+        """
+        Evaluates filters and facet counts on a loaded filter index.
+
+        Parameters
+        ----------
+        filter_index : dict
+            The filter index, as stored by `Filter_index`.
+        """
+        self.document_ids = filter_index['document_ids']
+        self.positions = {doc_id: i for i, doc_id in enumerate(self.document_ids)}
+        self.bitmaps = {
+            field: {
+                value: decode_bitmap(encoded, len(self.document_ids))
+                for value, encoded in field_bitmaps.items()
+            }
+            for field, field_bitmaps in filter_index['bitmaps'].items()
+        }
+        # mpaa ratings are matched case-insensitively
+        self.lowered_values = {
+            field: {value.lower(): value for value in field_bitmaps}
+            for field, field_bitmaps in self.bitmaps.items()
+        }
+
+    def get_mask(self, filters):
+        """
+        Returns the bitmap of the documents that pass the filters.
+
+        Parameters
+        ----------
+        filters : dict
+            The filters of the form {field: condition}. Conditions of different fields must all
+            hold. For 'genres' and 'mpaa' the condition is a list of values, any of which may
+            match. For 'release_year' and 'rating' it is an inclusive (min, max) range, where
+            either end may be None.
+
+        Returns
+        -------
+        np.ndarray or None
+            A boolean array over `document_ids`, or None if there are no filters.
+        """
+        mask = None
+        for field, condition in filters.items():
+            if condition is None:
+                continue
+            if field not in self.bitmaps:
+                raise ValueError(f"Unknown filter field: {field}")
+            field_bitmaps = self.bitmaps[field]
+            field_mask = np.zeros(len(self.document_ids), dtype=bool)
+            if field in RANGE_FIELDS:
+                low, high = condition
+                cast = RANGE_FIELDS[field]
+                for value, bitmap in field_bitmaps.items():
+                    if (low is None or cast(value) >= low) and (high is None or cast(value) <= high):
+                        field_mask |= bitmap
+            else:
+                if isinstance(condition, str):
+                    condition = [condition]
+                for value in condition:
+                    value = self.lowered_values[field].get(value.lower())
+                    if value is not None:
+                        field_mask |= field_bitmaps[value]
+            mask = field_mask if mask is None else mask & field_mask
+        return mask
+
+    def get_mask_of_documents(self, document_ids):
+        """
+        Returns the bitmap of the given documents.
+        """
+        mask = np.zeros(len(self.document_ids), dtype=bool)
+        positions = [self.positions[doc_id] for doc_id in document_ids if doc_id in self.positions]
+        mask[positions] = True
+        return mask
+
+    def get_document_ids(self, mask):
+        """
+        Returns the IDs of the documents set in a bitmap.
+
+        Returns
+        -------
+        set
+            The document IDs.
+        """
+        return {self.document_ids[i] for i in np.flatnonzero(mask)}
+
+    def get_facet_counts(self, mask, fields=None):
+        """
+        Counts the documents of a bitmap that have each value of the given fields.
+
+        Parameters
+        ----------
+        mask : np.ndarray
+            The documents to count.
+        fields : list of str, optional
+            The fields to count. Defaults to every field with at least one value.
+
+        Returns
+        -------
+        dict
+            The counts of the form {field: {value: count}}, without the zero counts, sorted by
+            count.
+        """
+        if fields is None:
+            fields = [field for field, field_bitmaps in self.bitmaps.items() if field_bitmaps]
+        facet_counts = {}
+        for field in fields:
+            counts = {
+                value: int(np.count_nonzero(mask & bitmap))
+                for value, bitmap in self.bitmaps[field].items()
+            }
+            facet_counts[field] = dict(
+                sorted(
+                    ((value, count) for value, count in counts.items() if count),
+                    key=lambda x: x[1],
+                    reverse=True,
+                )
+            )
+        return facet_counts
+
+
+if __name__ == '__main__':
+    filter_index = Filter_index(crawled_data_path='IMDB_crawled.json')
+    print('Filter index stored successfully.')
@@ -1,106 +1,59 @@
 from collections import defaultdict
 import time
 import os
-import sys
 import json
 import copy
-from indexes_enum import Indexes
-curr_dir = os.path.dirname(os.path.abspath(__file__))
-parent_dir = os.path.dirname(curr_dir)
-sys.path.append(parent_dir)
-from preprocess import Preprocessor
-from .indexes_enum import Indexes
+from ..utility.preprocess import Preprocessor, FieldAnalyzer
+from ..utility.stem_cache import StemCache
+from .indexes_enum import Indexes, Index_types
 
 
 class Index:
-    def __init__(self, preprocessed_documents: list):
+    def __init__(self, preprocessed_documents, analyzers=None):
         """
         Create a class for indexing.
-        """
 
-        self.preprocessed_documents = preprocessed_documents
+        Parameters
+        ----------
+        preprocessed_documents : iterable of dict
+            The preprocessed documents. They are read once, so a generator works as well as a
+            list.
+        analyzers : dict, optional
+            The analyzer type each field was analyzed with ({field: 'keyword' | 'lowercase' |
+            'text'}). It is stored next to the field's index by `store_index`, so that queries
+            are analyzed like the documents of that index were.
+        """
+        self.analyzers = dict(analyzers or {})
 
         self.index = {
-            Indexes.DOCUMENTS.value: self.index_documents(),
-            Indexes.STARS.value: self.index_stars(),
-            Indexes.GENRES.value: self.index_genres(),
-            Indexes.SUMMARIES.value: self.index_summaries(),
+            Indexes.DOCUMENTS.value: {},
+            Indexes.STARS.value: defaultdict(dict),
+            Indexes.GENRES.value: defaultdict(dict),
+            Indexes.SUMMARIES.value: defaultdict(dict),
         }
+        for document in preprocessed_documents:
+            self.index_document(document)
 
-    def index_documents(self):
-        """
-        Index the documents based on the document ID. In other words, create a dictionary
-        where the key is the document ID and the value is the document.
+        # the documents index keeps every document, so it is all the later checks need
+        self.preprocessed_documents = self.index[Indexes.DOCUMENTS.value].values()
 
-        Returns
-        ----------
-        dict
-            The index of the documents based on the document ID.
+    def index_document(self, document: dict):
         """
+        Adds a preprocessed document to the documents index and to the posting lists of its
+        stars, genres and summaries terms.
 
-        current_index = {}
-        for document in self.preprocessed_documents:
-            doc_id = document['id']
-            current_index[doc_id] = document
-        return current_index
-
-    def index_stars(self):
-        """
-        Index the documents based on the stars.
-
-        Returns
-        ----------
-        dict
-            The index of the documents based on the stars. You should also store each terms' tf in each document.
-            So the index type is: {term: {document_id: tf}}
-        """
-        current_index = defaultdict(dict)
-        for document in self.preprocessed_documents:
-            for star in document['stars']:
-                if document['id'] in current_index[star]:
-                    current_index[star][document['id']] += 1
-                else:
-                    current_index[star][document['id']] = 1
-        return current_index
-
-    def index_genres(self):
-        """
-        Index the documents based on the genres.
-
-        Returns
-        ----------
-        dict
-            The index of the documents based on the genres. You should also store each terms' tf in each document.
-            So the index type is: {term: {document_id: tf}}
-        """
-        current_index = defaultdict(dict)
-        for document in self.preprocessed_documents:
-            for genre in document['genres']:
-                if document['id'] in current_index[genre]:
-                    current_index[genre][document['id']] += 1
-                else:
-                    current_index[genre][document['id']] = 1
-        return current_index
-
-    def index_summaries(self):
-        """
-        Index the documents based on the summaries (not first_page_summary).
-
-        Returns
+        Parameters
         ----------
-        dict
-            The index of the documents based on the summaries. You should also store each terms' tf in each document.
-            So the index type is: {term: {document_id: tf}}
+        document : dict
+            The preprocessed document.
         """
-    
-        current_index = defaultdict(dict)
-        for document in self.preprocessed_documents:
-            for summary in document['summaries']:
-                if document['id'] in current_index[summary]:
-                    current_index[summary][document['id']] += 1
-                else:
-                    current_index[summary][document['id']] = 1
-        return current_index
+        doc_id = document['id']
+        self.index[Indexes.DOCUMENTS.value][doc_id] = document
+        for field in [Indexes.STARS.value, Indexes.GENRES.value, Indexes.SUMMARIES.value]:
+            current_index = self.index[field]
+            for term in document[field]:
+                postings = current_index[term]
+                postings[doc_id] = postings.get(doc_id, 0) + 1
 
     def get_posting_list(self, word: str, index_type: str):
         """
@@ -252,6 +205,10 @@ class Index:
 
         with open(os.path.join(path, f"{index_name}.json"), "w") as f:
             json.dump(self.index[index_name], f)
+        if index_name in self.analyzers:
+            analyzer_path = os.path.join(path, f"{index_name}_{Index_types.ANALYZER.value}_index.json")
+            with open(analyzer_path, "w") as f:
+                json.dump({'analyzer': self.analyzers[index_name]}, f)
 
     def load_index(self, path: str):
         """
@@ -350,59 +307,57 @@ class Index:
 
 # TODO: Run the class with needed parameters, then run check methods and finally report the results of check methods
 
-file_path = os.path.abspath("./IMDB_crawled.json")
-with open(file_path, "r") as f:
-    imdb_data = json.load(f)
-
-ids_list = []
-stars_list = []
-genres_list = []
-summareis_list = []
-for movie in imdb_data:
-    if (movie['stars'] != 'No stars') and (movie['genres'] != 'No generes') and (movie['summaries'] != 'No summary'):
-        ids_list.append(movie['id'])
-        stars_list.append(' '.join(movie['stars']))
-        genres_list.append(' '.join(movie['genres']))
-        summareis_list.append(' '.join(movie['summaries']))
-
-pre2 = Preprocessor(stars_list)
-preprocessed_stars = pre2.preprocess()
-pre3 = Preprocessor(genres_list)
-preprocessed_genres = pre3.preprocess()
-pre1 = Preprocessor(summareis_list)
-preprocessed_summaries = pre1.preprocess()
-
-pre_docs = []
-num_movies = len(ids_list)
-for i in range(num_movies):
-    movie = {
-        'id':ids_list[i],
-        'stars':preprocessed_stars[i],
-        'genres':preprocessed_genres[i],
-        'summaries':preprocessed_summaries[i]
-    }
-    pre_docs.append(movie)
-
-index = Index(preprocessed_documents=pre_docs)
-
-index.check_add_remove_is_correct()
-
-index.check_if_indexing_is_good('stars', 'Henry')
-index.check_if_indexing_is_good('genres', 'drama')
-index.check_if_indexing_is_good('summaries', 'good')
-
-index.store_index('indexes', 'documents')
-index.store_index('indexes', 'stars')
-index.store_index('indexes', 'genres')
-index.store_index('indexes', 'summaries')
-
-
-doc_stat = index.check_if_index_loaded_correctly('documents', index.index['documents'])
-stars_stat = index.check_if_index_loaded_correctly('stars', index.index['stars'])
-genres_stat = index.check_if_index_loaded_correctly('genres', index.index['genres'])
-summaries_stat = index.check_if_index_loaded_correctly('summaries', index.index['summaries'])
-
-print(f'documents loaded: {doc_stat}')
-print(f'stars loaded: {stars_stat}')
-print(f'genres loaded: {genres_stat}')
-print(f'summaries loaded: {summaries_stat}')
+if __name__ == "__main__":
+    file_path = os.path.abspath("./IMDB_crawled.json")
+    with open(file_path, "r") as f:
+        imdb_data = json.load(f)
+
+    movies = [
+        movie for movie in imdb_data
+        if (movie['stars'] != 'No stars') and (movie['genres'] != 'No generes') and (movie['summaries'] != 'No summary')
+    ]
+    # the stems of earlier builds are reused, and the new words are added for the next build
+    stem_cache = StemCache(os.path.join('indexes', 'stem_cache.bin'))
+    preprocessor = Preprocessor([], persistent_stem_cache=stem_cache)
+    # every field is analyzed as registered in `Indexes`: only the text fields (the summaries)
+    # go through the preprocessing pipeline. Each movie is read once and all of its fields are
+    # analyzed together, so the fields of a document can't come from different movies.
+    fields = [Indexes.STARS, Indexes.GENRES, Indexes.SUMMARIES]
+    field_analyzers = {field: FieldAnalyzer(field.analyzer.value, preprocessor) for field in fields}
+
+    def analyze_movie(movie):
+        document = {'id': movie['id']}
+        for field in fields:
+            document[field.value] = field_analyzers[field].analyze(movie[field.value])
+        return document
+
+    pre_docs = (analyze_movie(movie) for movie in movies)
+
+    index = Index(
+        preprocessed_documents=pre_docs,
+        analyzers={field.value: field_analyzers[field].analyzer_type for field in fields},
+    )
+
+    index.check_add_remove_is_correct()
+
+    index.check_if_indexing_is_good('stars', 'henry fonda')
+    index.check_if_indexing_is_good('genres', 'drama')
+    index.check_if_indexing_is_good('summaries', 'good')
+
+    index.store_index('indexes', 'documents')
+    index.store_index('indexes', 'stars')
+    index.store_index('indexes', 'genres')
+    index.store_index('indexes', 'summaries')
+    stem_cache.save()
+    print(f'stem cache: {stem_cache.get_statistics()}')
+
+
+    doc_stat = index.check_if_index_loaded_correctly('documents', index.index['documents'])
+    stars_stat = index.check_if_index_loaded_correctly('stars', index.index['stars'])
+    genres_stat = index.check_if_index_loaded_correctly('genres', index.index['genres'])
+    summaries_stat = index.check_if_index_loaded_correctly('summaries', index.index['summaries'])
+
+    print(f'documents loaded: {doc_stat}')
+    print(f'stars loaded: {stars_stat}')
+    print(f'genres loaded: {genres_stat}')
+    print(f'summaries loaded: {summaries_stat}')
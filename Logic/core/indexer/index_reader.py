@@ -1,5 +1,27 @@
 from .indexes_enum import Indexes,Index_types
+from types import MappingProxyType
 import json
+
+
+def freeze_mapping(mapping):
+    """
+    Returns a read-only view of a (possibly nested) dictionary.
+
+    Parameters
+    ----------
+    mapping : dict
+        The dictionary to freeze. Nested dictionaries are frozen as well.
+
+    Returns
+    -------
+    MappingProxyType
+        The read-only view.
+    """
+    return MappingProxyType({
+        key: freeze_mapping(value) if isinstance(value, dict) else value
+        for key, value in mapping.items()
+    })
+
 class Index_reader:
     def __init__(self,path: str, index_name: Indexes, index_type: Index_types = None):
         """
@@ -31,10 +53,15 @@ class Index_reader:
         absolute_path = self.path + self.index_name.value
         
         if self.index_type != None:
-            absolute_path = absolute_path + "_" + self.index_type.value
+            absolute_path = absolute_path + "_" + self.index_type.value + "_index"
 
         absolute_path = absolute_path + ".json"
         
         with open(absolute_path, 'r') as file:
             return json.load(file)
-        
\ No newline at end of file
+
+    def freeze(self):
+        """
+        Makes the loaded index read-only, so it can be shared between threads without locking.
+        """
+        self.index = freeze_mapping(self.index)
@@ -1,13 +1,37 @@
 from enum import Enum
 
 
+class Analyzer_types(Enum):
+    KEYWORD = 'keyword'
+    LOWERCASE = 'lowercase'
+    TEXT = 'text'
+
 class Indexes(Enum):
     DOCUMENTS = 'documents'
     STARS = 'stars'
     GENRES = 'genres'
     SUMMARIES = 'summaries'
 
+    @property
+    def analyzer(self):
+        """
+        The analyzer the field is indexed with (see `FieldAnalyzer`): a star name is one
+        keyword, a genre its lower-cased words and a summary goes through the whole
+        `Preprocessor`.
+        """
+        return FIELD_ANALYZERS.get(self, Analyzer_types.TEXT)
+
+FIELD_ANALYZERS = {
+    Indexes.STARS: Analyzer_types.KEYWORD,
+    Indexes.GENRES: Analyzer_types.LOWERCASE,
+    Indexes.SUMMARIES: Analyzer_types.TEXT,
+}
+
 class Index_types(Enum):
     TIERED = 'tiered'
     DOCUMENT_LENGTH = 'document_length'
-    METADATA = 'metadata'
\ No newline at end of file
+    METADATA = 'metadata'
+    FILTER = 'filter'
+    RANGE = 'range'
+    SNIPPET = 'snippet'
+    ANALYZER = 'analyzer'
\ No newline at end of file
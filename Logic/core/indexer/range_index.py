@@ -0,0 +1,213 @@
+import json
+import numpy as np
+from .indexes_enum import Indexes, Index_types
+from .index_reader import Index_reader
+
+NUMERIC_FIELDS = ['release_year', 'rating', 'budget', 'gross_worldwide']
+
+
+def parse_numeric_field(field, value):
+    """
+    Parses a numeric field of a crawled movie.
+
+    Parameters
+    ----------
+    field : str
+        One of NUMERIC_FIELDS.
+    value : str
+        The value collected by the crawler, e.g. '1994', '9.3', '25000000 USD' or '28884504'.
+
+    Returns
+    -------
+    float or None
+        The value, or None if it is missing (e.g. 'No budget') or cannot be compared with the
+        other movies. Budgets are only kept in USD, since amounts in different currencies
+        cannot be ordered.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    if field == 'budget':
+        parts = value.split()
+        if len(parts) != 2 or parts[1] != 'USD':
+            return None
+        value = parts[0]
+    value = value.replace(',', '')
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class Range_index:
+    def __init__(self, path='indexes/', crawled_data_path='IMDB_crawled.json'):
+        """
+        Initializes the Range_index.
+
+        The numeric fields are not kept in the documents index, so they are parsed from the
+        crawled movies of the indexed documents.
+
+        Parameters
+        ----------
+        path : str
+            The path to the indexes.
+        crawled_data_path : str
+            The path to the crawled movies.
+        """
+        self.documents_index = Index_reader(path, index_name=Indexes.DOCUMENTS).index
+        self.document_ids = sorted(self.documents_index.keys())
+        self.crawled_data = self.read_crawled_data(crawled_data_path)
+        self.range_index = self.create_range_index()
+        self.store_range_index(path)
+
+    def read_crawled_data(self, crawled_data_path):
+        """
+        Reads the crawled movies of the indexed documents.
+
+        Returns
+        -------
+        dict
+            The crawled movies keyed by their IDs.
+        """
+        with open(crawled_data_path, 'r') as file:
+            movies = json.load(file)
+        return {movie['id']: movie for movie in movies if movie['id'] in self.documents_index}
+
+    def create_range_index(self):
+        """
+        Creates a typed column and a sorted order for every numeric field.
+
+        Returns
+        -------
+        dict
+            The sorted document IDs (the position of a document in every column) and, per field,
+            the column of values (None where missing) and the positions of the documents that
+            have a value, sorted by that value.
+        """
+        columns = {}
+        for field in NUMERIC_FIELDS:
+            values = [
+                parse_numeric_field(field, self.crawled_data.get(doc_id, {}).get(field))
+                for doc_id in self.document_ids
+            ]
+            order = sorted(
+                (i for i, value in enumerate(values) if value is not None),
+                key=lambda i: values[i],
+            )
+            columns[field] = {'values': values, 'order': order}
+        return {'document_ids': self.document_ids, 'columns': columns}
+
+    def store_range_index(self, path):
+        """
+        Stores the range index to a file.
+
+        Parameters
+        ----------
+        path : str
+            The path to the directory where the indexes are stored.
+        """
+        path = path + Indexes.DOCUMENTS.value + '_' + Index_types.RANGE.value + '_index.json'
+        with open(path, 'w') as file:
+            json.dump(self.range_index, file)
+
+
+class Range_columns:
+    def __init__(self, range_index):
+        """
+        Evaluates range predicates and sorts on a loaded range index.
+
+        Parameters
+        ----------
+        range_index : dict
+            The range index, as stored by `Range_index`.
+        """
+        self.document_ids = range_index['document_ids']
+        self.positions = {doc_id: i for i, doc_id in enumerate(self.document_ids)}
+        self.columns = {}
+        self.orders = {}
+        self.sorted_values = {}
+        for field, column in range_index['columns'].items():
+            values = np.array(
+                [np.nan if value is None else value for value in column['values']], dtype=np.float64
+            )
+            order = np.array(column['order'], dtype=np.int64)
+            self.columns[field] = values
+            self.orders[field] = order
+            self.sorted_values[field] = values[order]
+
+    def get_mask(self, field, low=None, high=None):
+        """
+        Returns the bitmap of the documents whose value lies in an inclusive range.
+
+        Parameters
+        ----------
+        field : str
+            The numeric field.
+        low : float, optional
+            The smallest value. If None, the range is open below.
+        high : float, optional
+            The largest value. If None, the range is open above.
+
+        Returns
+        -------
+        np.ndarray
+            A boolean array over `document_ids`. Documents without a value never match.
+
+        Note
+        -------
+            The range is found with two binary searches on the sorted values, so only the
+            matching documents are touched.
+        """
+        if field not in self.columns:
+            raise ValueError(f"Unknown range field: {field}")
+        sorted_values = self.sorted_values[field]
+        start = 0 if low is None else np.searchsorted(sorted_values, low, side='left')
+        end = len(sorted_values) if high is None else np.searchsorted(sorted_values, high, side='right')
+        mask = np.zeros(len(self.document_ids), dtype=bool)
+        mask[self.orders[field][start:end]] = True
+        return mask
+
+    def get_values(self, field, document_ids):
+        """
+        Returns the values of some documents in a numeric field.
+
+        Returns
+        -------
+        np.ndarray
+            The values, NaN where a document has none.
+        """
+        positions = np.array([self.positions.get(doc_id, -1) for doc_id in document_ids], dtype=np.int64)
+        values = np.full(len(positions), np.nan)
+        known = positions >= 0
+        values[known] = self.columns[field][positions[known]]
+        return values
+
+    def sort_by(self, field, results, descending=True):
+        """
+        Sorts search results by a numeric field, breaking ties by score and then by document ID.
+
+        Parameters
+        ----------
+        field : str
+            The numeric field to sort by.
+        results : list
+            The (document_id, score) results.
+        descending : bool
+            If True, the largest values come first.
+
+        Returns
+        -------
+        list
+            The results sorted by the field. Documents without a value come last.
+        """
+        if not results:
+            return []
+        document_ids = [doc_id for doc_id, _ in results]
+        values = self.get_values(field, document_ids)
+        scores = np.array([score for _, score in results], dtype=np.float64)
+        missing = np.isnan(values)
+        keys = np.where(missing, 0, -values if descending else values)
+        # lexsort sorts by the last key first; the document IDs make the order of ties the
+        # same however the results were gathered (e.g. from several shards)
+        order = np.lexsort((np.array(document_ids), -scores, keys, missing))
+        return [results[i] for i in order]
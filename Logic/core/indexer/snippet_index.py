@@ -0,0 +1,79 @@
+import json
+from ..utility.preprocess import Preprocessor
+from ..utility.snippet import get_snippet_document
+from .indexes_enum import Indexes, Index_types
+from .index_reader import Index_reader
+
+
+class Snippet_index:
+    def __init__(self, path='indexes/', crawled_data_path='IMDB_crawled.json', preprocessor=None):
+        """
+        Initializes the Snippet_index.
+
+        The snippets are made from the first page summaries, which are not kept in the
+        documents index, so they are read from the crawled movies of the indexed documents and
+        tokenized once here instead of for every search result.
+
+        Parameters
+        ----------
+        path : str
+            The path to the indexes.
+        crawled_data_path : str
+            The path to the crawled movies.
+        preprocessor : Preprocessor, optional
+            The preprocessor the summaries are indexed with; the words are stored by their
+            preprocessed terms. Defaults to a new `Preprocessor`.
+        """
+        self.documents_index = Index_reader(path, index_name=Indexes.DOCUMENTS).index
+        self.preprocessor = preprocessor if preprocessor is not None else Preprocessor([])
+        self.crawled_data = self.read_crawled_data(crawled_data_path)
+        self.snippet_index = self.create_snippet_index()
+        self.store_snippet_index(path)
+
+    def read_crawled_data(self, crawled_data_path):
+        """
+        Reads the crawled movies of the indexed documents.
+
+        Returns
+        -------
+        dict
+            The crawled movies keyed by their IDs.
+        """
+        with open(crawled_data_path, 'r') as file:
+            movies = json.load(file)
+        return {movie['id']: movie for movie in movies if movie['id'] in self.documents_index}
+
+    def create_snippet_index(self):
+        """
+        Tokenizes the first page summary of every document.
+
+        Returns
+        -------
+        dict
+            The tokenized summaries keyed by document ID, as `get_snippet_document` returns
+            them: the text, the offsets of its words and the positions of each term.
+        """
+        snippet_index = {}
+        for doc_id, movie in self.crawled_data.items():
+            summary = movie.get('first_page_summary')
+            if summary:
+                snippet_index[doc_id] = get_snippet_document(summary, self.preprocessor.analyzer)
+        return snippet_index
+
+    def store_snippet_index(self, path):
+        """
+        Stores the snippet index to a file.
+
+        Parameters
+        ----------
+        path : str
+            The path to the directory where the indexes are stored.
+        """
+        path = path + Indexes.DOCUMENTS.value + '_' + Index_types.SNIPPET.value + '_index.json'
+        with open(path, 'w') as file:
+            json.dump(self.snippet_index, file)
+
+
+if __name__ == '__main__':
+    snippet_index = Snippet_index(crawled_data_path='IMDB_crawled.json')
+    print('Snippet index stored successfully.')
@@ -0,0 +1,172 @@
+import re
+import fnmatch
+from bisect import bisect_right
+
+
+class Term_dictionary:
+    def __init__(self, terms, block_size=16):
+        """
+        A sorted, front-coded dictionary of the terms of an index.
+
+        The sorted terms are cut into blocks of `block_size`. The first term of every block is
+        kept whole and binary searched; the other terms of a block only keep the length of the
+        prefix they share with the previous term and the rest of the term, packed into one
+        string per block.
+
+        Parameters
+        ----------
+        terms : iterable of str
+            The terms, e.g. the keys of an index.
+        block_size : int
+            The number of terms in a block.
+        """
+        terms = sorted(set(terms))
+        self.block_size = block_size
+        self.size = len(terms)
+        self.block_heads = []
+        self.blocks = []
+        for start in range(0, len(terms), block_size):
+            block = terms[start : start + block_size]
+            self.block_heads.append(block[0])
+            encoded = []
+            for previous, term in zip(block, block[1:]):
+                shared = 0
+                limit = min(len(previous), len(term))
+                while shared < limit and previous[shared] == term[shared]:
+                    shared += 1
+                suffix = term[shared:]
+                encoded.append(chr(shared) + chr(len(suffix)) + suffix)
+            self.blocks.append("".join(encoded))
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for block in range(len(self.blocks)):
+            yield from self.decode_block(block)
+
+    def __contains__(self, term):
+        block = bisect_right(self.block_heads, term) - 1
+        return block >= 0 and term in self.decode_block(block)
+
+    def decode_block(self, block):
+        """
+        Returns the terms of a block.
+
+        Parameters
+        ----------
+        block : int
+            The number of the block.
+
+        Returns
+        -------
+        list of str
+            The sorted terms of the block.
+        """
+        term = self.block_heads[block]
+        terms = [term]
+        encoded = self.blocks[block]
+        position = 0
+        while position < len(encoded):
+            shared = ord(encoded[position])
+            length = ord(encoded[position + 1])
+            term = term[:shared] + encoded[position + 2 : position + 2 + length]
+            terms.append(term)
+            position += 2 + length
+        return terms
+
+    def iterate_from(self, term):
+        """
+        Yields the terms in sorted order, starting at the first term not smaller than `term`.
+
+        Note
+        -------
+            Only the block that can hold `term` is found by binary search over the block
+            heads; the blocks before it are never decoded.
+        """
+        block = max(bisect_right(self.block_heads, term) - 1, 0)
+        for block in range(block, len(self.blocks)):
+            for candidate in self.decode_block(block):
+                if candidate >= term:
+                    yield candidate
+
+    def prefix(self, prefix, limit=None):
+        """
+        Returns the terms that start with a prefix.
+
+        Parameters
+        ----------
+        prefix : str
+            The prefix.
+        limit : int, optional
+            The maximum number of terms to return. If None, all of them are returned.
+
+        Returns
+        -------
+        list of str
+            The matching terms in sorted order.
+        """
+        terms = []
+        for term in self.iterate_from(prefix):
+            if not term.startswith(prefix) or (limit is not None and len(terms) >= limit):
+                break
+            terms.append(term)
+        return terms
+
+    def range(self, low, high, include_high=True):
+        """
+        Returns the terms between two terms.
+
+        Parameters
+        ----------
+        low : str
+            The smallest term (included).
+        high : str
+            The largest term.
+        include_high : bool
+            If True, `high` itself is included.
+
+        Returns
+        -------
+        list of str
+            The matching terms in sorted order.
+        """
+        terms = []
+        for term in self.iterate_from(low):
+            if term > high or (term == high and not include_high):
+                break
+            terms.append(term)
+        return terms
+
+    def wildcard(self, pattern, limit=None):
+        """
+        Returns the terms that match a wildcard pattern, where `*` matches any run of
+        characters and `?` matches one character.
+
+        Parameters
+        ----------
+        pattern : str
+            The pattern, e.g. `pac*` or `wom?n`.
+        limit : int, optional
+            The maximum number of terms to return. If None, all of them are returned.
+
+        Returns
+        -------
+        list of str
+            The matching terms in sorted order.
+
+        Note
+        -------
+            Only the terms that start with the literal prefix of the pattern (the part before
+            its first wildcard) are checked, so a pattern that starts with a wildcard scans the
+            whole dictionary.
+        """
+        literal_prefix = re.split(r"[*?\[]", pattern, maxsplit=1)[0]
+        matcher = re.compile(fnmatch.translate(pattern))
+        terms = []
+        for term in self.prefix(literal_prefix):
+            if matcher.match(term):
+                terms.append(term)
+                if limit is not None and len(terms) >= limit:
+                    break
+        return terms
@@ -1,5 +1,5 @@
-from indexes_enum import Indexes, Index_types
-from index_reader import Index_reader
+from .indexes_enum import Indexes, Index_types
+from .index_reader import Index_reader
 import json
 
 
@@ -53,6 +53,8 @@ class Tiered_index:
                 "second_tier": dict,
                 "third_tier": dict
             }
+            where each tier is an index of type {term: {document_id: tf}} holding the postings
+            whose tf falls in that tier.
         """
         if index_name not in self.index:
             raise ValueError("Invalid index type")
@@ -63,14 +65,14 @@ class Tiered_index:
         second_tier = {}
         third_tier = {}
 
-        for _, index_dict in current_index.items():
+        for term, index_dict in current_index.items():
             for doc_id, tf in index_dict.items():
                 if tf >= first_tier_threshold:
-                    first_tier[doc_id] = tf
+                    first_tier.setdefault(term, {})[doc_id] = tf
                 elif tf >= second_tier_threshold and tf <= first_tier_threshold:
-                    second_tier[doc_id] = tf
+                    second_tier.setdefault(term, {})[doc_id] = tf
                 else:
-                    third_tier[doc_id] = tf
+                    third_tier.setdefault(term, {})[doc_id] = tf
         
         return {
             "first_tier": first_tier,
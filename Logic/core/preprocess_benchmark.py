@@ -0,0 +1,139 @@
+import os
+import re
+import json
+import time
+import argparse
+
+from nltk.stem import PorterStemmer
+
+from .indexer import Indexes, Index_reader
+from .utility import Preprocessor, load_stopwords
+
+
+def legacy_preprocess_text(text, stopwords):
+    """
+    Preprocesses a text the way `Preprocessor` did before the batch mode, as the baseline:
+    a new stemmer per text, every word stemmed again and the link patterns applied one by one.
+
+    Returns
+    -------
+    list of str
+        The preprocessed words.
+    """
+    stemmer = PorterStemmer()
+    text = " ".join(stemmer.stem(word) for word in text.lower().split())
+    for pattern in [r'\S*http\S*', r'\S*www\S*', r'\S+\.ir\S*', r'\S+\.com\S*', r'\S+\.org\S*', r'\S*@\S*']:
+        text = re.sub(pattern, '', text)
+    text = re.sub(r'[^\w\s]', '', text)
+    return [word for word in text.split() if word.lower() not in stopwords]
+
+
+def multi_pass_preprocess(texts):
+    """
+    Preprocesses texts with the separate passes of `Preprocessor` (normalize, remove_links,
+    remove_punctuations, remove_stopwords) instead of its single-pass analyzer.
+
+    Returns
+    -------
+    list of list of str
+        The preprocessed words of each text.
+    """
+    preprocessor = Preprocessor([])
+    return [
+        preprocessor.remove_stopwords(
+            preprocessor.remove_punctuations(preprocessor.remove_links(preprocessor.normalize(text)))
+        )
+        for text in texts
+    ]
+
+
+def load_texts(crawled_data_path=None, indexes_path=None):
+    """
+    Loads the texts to preprocess: the summaries of the crawled movies, or, without a crawl,
+    the (already preprocessed) summaries of the documents index joined back into texts.
+
+    Returns
+    -------
+    list of str
+        The texts.
+    """
+    if crawled_data_path is not None:
+        with open(crawled_data_path, "r") as file:
+            movies = json.load(file)
+        return [
+            " ".join(movie["summaries"])
+            for movie in movies
+            if isinstance(movie.get("summaries"), list)
+        ]
+    documents = Index_reader(indexes_path, Indexes.DOCUMENTS).index
+    return [" ".join(document["summaries"]) for document in documents.values()]
+
+
+def benchmark_preprocessing(texts, workers=None, repeats=3):
+    """
+    Measures the preprocessing throughput of the legacy implementation, the memoized
+    multi-pass pipeline, the single-pass analyzer (with and without its word cache) and the
+    process pool batch mode on the same texts.
+
+    Parameters
+    ----------
+    texts : list of str
+        The texts.
+    workers : int, optional
+        The number of processes of the batch mode. Defaults to the number of CPUs.
+    repeats : int
+        The number of times each configuration is run; the fastest run is reported.
+
+    Returns
+    -------
+    dict
+        The tokens per second and seconds of each configuration, and whether their outputs
+        are identical.
+    """
+    workers = workers or os.cpu_count() or 1
+    stopwords = load_stopwords()
+    tokens = sum(len(text.split()) for text in texts)
+
+    configurations = {
+        "legacy": lambda: [legacy_preprocess_text(text, stopwords) for text in texts],
+        "multi-pass": lambda: multi_pass_preprocess(texts),
+        "uncached": lambda: Preprocessor(texts, stem_cache_size=0).preprocess(),
+        "single-pass": lambda: Preprocessor(texts).preprocess(),
+        f"processes ({workers})": lambda: Preprocessor(texts).preprocess(workers=workers),
+    }
+    results = {}
+    outputs = {}
+    for name, run in configurations.items():
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            outputs[name] = run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = {"seconds": best, "tokens_per_second": tokens / best}
+
+    reference = outputs["legacy"]
+    return {
+        "texts": len(texts),
+        "tokens": tokens,
+        "results": results,
+        "identical": all(output == reference for output in outputs.values()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the throughput of the preprocessor.")
+    parser.add_argument("--crawl", default=None, help="path to IMDB_crawled.json")
+    parser.add_argument(
+        "--indexes",
+        default=os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "indexes", ""),
+        help="the indexes directory used when no crawl is given",
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    report = benchmark_preprocessing(load_texts(args.crawl, args.indexes), args.workers, args.repeats)
+    print(f"{report['texts']} texts, {report['tokens']} tokens, identical outputs: {report['identical']}")
+    for name, result in report["results"].items():
+        print(f"{name:<16}{result['tokens_per_second']:>14.0f} tokens/s{result['seconds']:>10.3f} s")
@@ -1,16 +1,31 @@
+import os
 import json
+import heapq
 import numpy as np
-from .utility import Preprocessor, Scorer
-from .indexer import Indexes, Index_types, Index_reader
+from .utility import QueryAnalyzer, Scorer, SearchProfile, StemCache
+from types import MappingProxyType
+from .indexer import Indexes, Index_types, Analyzer_types, Index_reader, Filter_bitmaps, Range_columns, Term_dictionary
 
 
 class SearchEngine:
-    def __init__(self):
+    def __init__(self, path=None, hooks=None, read_only=False):
         """
         Initializes the search engine.
 
+        Parameters
+        ----------
+        path : str, optional
+            The path to the indexes. Defaults to the `indexes/` directory of the repository.
+        hooks : list of MetricsHook, optional
+            The hooks every search profile is reported to.
+        read_only : bool, optional
+            If True, the indexes are frozen after loading (see `freeze`).
         """
-        path = "/index"
+        self.hooks = list(hooks) if hooks is not None else []
+        if path is None:
+            repository_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            path = os.path.join(repository_dir, "indexes", "")
+        self.path = path
         self.document_indexes = {
             Indexes.STARS: Index_reader(path, Indexes.STARS),
             Indexes.GENRES: Index_reader(path, Indexes.GENRES),
@@ -37,6 +52,112 @@ class SearchEngine:
         self.metadata_index = Index_reader(
             path, Indexes.DOCUMENTS, Index_types.METADATA
         )
+        # the filter index is optional; without it searches cannot be filtered or faceted
+        self.filter_index = None
+        self.filter_bitmaps = None
+        filter_file = Indexes.DOCUMENTS.value + "_" + Index_types.FILTER.value + "_index.json"
+        if os.path.exists(os.path.join(path, filter_file)):
+            self.filter_index = Index_reader(path, Indexes.DOCUMENTS, Index_types.FILTER)
+            self.filter_bitmaps = Filter_bitmaps(self.filter_index.index)
+        # the numeric columns (release_year, rating, budget, gross_worldwide) are optional as well
+        self.range_index = None
+        self.range_columns = None
+        range_file = Indexes.DOCUMENTS.value + "_" + Index_types.RANGE.value + "_index.json"
+        if os.path.exists(os.path.join(path, range_file)):
+            self.range_index = Index_reader(path, Indexes.DOCUMENTS, Index_types.RANGE)
+            self.range_columns = Range_columns(self.range_index.index)
+            # the columns are kept as arrays, so the parsed json is not needed anymore
+            self.range_index.index = {}
+        # the tokenized first page summaries the snippets are made from are optional too
+        self.snippet_index = None
+        snippet_file = Indexes.DOCUMENTS.value + "_" + Index_types.SNIPPET.value + "_index.json"
+        if os.path.exists(os.path.join(path, snippet_file)):
+            self.snippet_index = Index_reader(path, Indexes.DOCUMENTS, Index_types.SNIPPET)
+        number_of_documents = self.metadata_index.index["document_count"]
+        # shards carry the statistics of the whole collection (see sharding.build_shards)
+        global_statistics = self.metadata_index.index.get("global_statistics", {})
+        # the stems of the collection's words, if the index build saved them; the engine never
+        # saves the cache, so the stems of new query words are not kept in it
+        self.stem_cache = None
+        stem_cache_path = os.path.join(path, "stem_cache.bin")
+        if os.path.exists(stem_cache_path):
+            self.stem_cache = StemCache(stem_cache_path, read_only=True)
+        # the analyzers the fields were indexed with, stored next to each field index (older
+        # builds kept them in the metadata); indexes built before they were recorded analyzed
+        # every field as text
+        analyzers = self.metadata_index.index.get("analyzers", {})
+        self.field_analyzers = {}
+        for field in self.document_indexes:
+            analyzer_file = field.value + "_" + Index_types.ANALYZER.value + "_index.json"
+            if os.path.exists(os.path.join(path, analyzer_file)):
+                analyzer = Index_reader(path, field, Index_types.ANALYZER).index["analyzer"]
+            else:
+                analyzer = analyzers.get(field.value, Analyzer_types.TEXT.value)
+            self.field_analyzers[field] = analyzer
+        self.query_analyzer = QueryAnalyzer(self.stem_cache, self.field_analyzers)
+        # the stored genres of the filter index by their analyzed form
+        self.genre_values = {}
+        if self.filter_bitmaps is not None:
+            for value in self.filter_bitmaps.bitmaps.get("genres", {}):
+                for term in self.query_analyzer.analyze(value, Indexes.GENRES):
+                    self.genre_values.setdefault(term, value)
+        self.scorers = {}
+        for field, reader in self.document_indexes.items():
+            field_statistics = global_statistics.get(field.value, {})
+            self.scorers[field] = Scorer(
+                reader.index,
+                number_of_documents,
+                field_statistics.get("document_frequencies"),
+                field_statistics.get("collection_frequencies"),
+            )
+        self.term_dictionaries = {
+            field: Term_dictionary(reader.index.keys()) for field, reader in self.document_indexes.items()
+        }
+        self.tier_max_tfs = {
+            field: {
+                tier: {term: max(postings.values()) for term, postings in tier_index.items()}
+                for tier, tier_index in reader.index.items()
+            }
+            for field, reader in self.tiered_index.items()
+        }
+        # the tiered postings read by the last unsafe search; concurrent searches should read
+        # the postings_read counter of their own profile instead
+        self.postings_touched = 0
+        if read_only:
+            self.freeze()
+
+    def freeze(self):
+        """
+        Makes the engine read-only after loading, so one engine can serve concurrent searches.
+
+        All the indexes and the precomputed statistics of the scorers become read-only views.
+        Every search keeps its own state (query, scores and profile) in local variables, so
+        a frozen engine can be shared by any number of threads without locking.
+        """
+        readers = [self.metadata_index]
+        readers.extend(self.document_indexes.values())
+        readers.extend(self.tiered_index.values())
+        readers.extend(self.document_lengths_index.values())
+        if self.filter_index is not None:
+            readers.append(self.filter_index)
+        if self.snippet_index is not None:
+            readers.append(self.snippet_index)
+        if self.range_columns is not None:
+            for arrays in (self.range_columns.columns, self.range_columns.orders, self.range_columns.sorted_values):
+                for array in arrays.values():
+                    array.flags.writeable = False
+        for reader in readers:
+            reader.freeze()
+
+        for field, scorer in self.scorers.items():
+            scorer.index = self.document_indexes[field].index
+            scorer.idf = MappingProxyType(scorer.idf)
+            scorer.document_frequencies = MappingProxyType(scorer.document_frequencies)
+            scorer.collection_frequencies = MappingProxyType(scorer.collection_frequencies)
+        self.tier_max_tfs = {
+            field: MappingProxyType({tier: MappingProxyType(max_tfs) for tier, max_tfs in tiers.items()})
+            for field, tiers in self.tier_max_tfs.items()
+        }
 
     def search(
         self,
@@ -48,6 +169,10 @@ class SearchEngine:
         smoothing_method=None,
         alpha=0.5,
         lamda=0.5,
+        profile=None,
+        filters=None,
+        sort_by=None,
+        sort_descending=True,
     ):
         """
         searches for the query in the indexes.
@@ -72,37 +197,269 @@ class SearchEngine:
         lamda : float, optional
             The parameter used in some smoothing methods to balance between the document
             probability and the collection probability. Defaults to 0.5.
+        profile : SearchProfile, optional
+            The profile to record the stage timings and counters in. If given, the caller can add
+            its own stages (e.g. snippet, link_analysis) and is responsible for finishing it.
+            Otherwise a profile is created and reported to the engine's hooks.
+        filters : dict, optional
+            Restricts the results to the documents that pass the filters (see `get_filter_mask`).
+            Documents that fail them are dropped before scoring.
+        sort_by : str, optional
+            A numeric field (release_year, rating, budget or gross_worldwide) to order the
+            matching documents by instead of their scores, e.g. 'rating' for the top-rated
+            matches. Ties are broken by score and documents without a value come last.
+        sort_descending : bool, optional
+            If True (the default), the largest values of `sort_by` come first.
 
         Returns
         -------
         list
             A list of tuples containing the document IDs and their scores sorted by their scores.
         """
-        preprocessor = Preprocessor([query])
-        query = preprocessor.preprocess()[0]
+        owns_profile = profile is None
+        if owns_profile:
+            profile = SearchProfile(self.hooks)
+
+        with profile.stage("preprocess"):
+            query = self.query_analyzer.analyze_fields(query, weights)
+
+        allowed_documents = None
+        if filters:
+            with profile.stage("filter"):
+                mask = self.get_filter_mask(filters)
+                if mask is not None:
+                    allowed_documents = self.get_documents_of_mask(mask)
+
+        if sort_by is not None:
+            if self.range_columns is None:
+                raise ValueError("The range index is missing; build it with Range_index first.")
+            # the best scores are not the first results, so tiers cannot be skipped
+            max_results_by_score = None
+        else:
+            max_results_by_score = max_results
 
         scores = {}
         if method == "unigram":
             self.find_scores_with_unigram_model(
-                query, smoothing_method, weights, scores, alpha, lamda
+                query, smoothing_method, weights, scores, alpha, lamda, profile, allowed_documents
             )
         elif safe_ranking:
-            self.find_scores_with_safe_ranking(query, method, weights, scores)
+            self.find_scores_with_safe_ranking(
+                query, method, weights, scores, profile, allowed_documents
+            )
         else:
             self.find_scores_with_unsafe_ranking(
-                query, method, weights, max_results, scores
+                query, method, weights, max_results_by_score, scores, profile, allowed_documents
             )
 
         final_scores = {}
 
-        self.aggregate_scores(weights, scores, final_scores)
+        with profile.stage("aggregation"):
+            self.aggregate_scores(weights, scores, final_scores)
 
-        result = sorted(final_scores.items(), key=lambda x: x[1], reverse=True)
-        if max_results is not None:
-            result = result[:max_results]
+        with profile.stage("sort"):
+            if sort_by is None:
+                # ties are ordered by document ID, the same way sharded results are merged
+                result = sorted(final_scores.items(), key=lambda x: (-x[1], x[0]))
+            else:
+                result = self.range_columns.sort_by(
+                    sort_by, list(final_scores.items()), sort_descending
+                )
+            if max_results is not None:
+                result = result[:max_results]
 
+        if owns_profile:
+            profile.finish()
         return result
 
+    def search_with_facets(self, query, method, weights, max_results=10, facet_fields=None, **kwargs):
+        """
+        Searches for the query and counts the facets of all its matching documents.
+
+        Parameters
+        ----------
+        query : str
+            The query to search for.
+        method : str ((n|l)(n|t)(n|c).(n|l)(n|t)(n|c)) | OkapiBM25 | Unigram
+            The method to use for searching.
+        weights: dict
+            The weights of the fields.
+        max_results : int
+            The maximum number of results to return. If None, all results are returned.
+        facet_fields : list of str, optional
+            The fields to count (e.g. ['genres', 'mpaa']). Defaults to every filtered field.
+        **kwargs
+            The other parameters of `search` (safe_ranking, filters, ...).
+
+        Returns
+        -------
+        tuple
+            The results of `search` and the facet counts of the form {field: {value: count}}.
+
+        Note
+        -------
+            The facets are counted over every document that matches the query and the filters,
+            not only over the returned ones. The counts come from the same bitmaps as the filters,
+            one AND and popcount per value.
+        """
+        if self.filter_bitmaps is None:
+            raise ValueError("The filter index is missing; build it with Filter_index first.")
+        results = self.search(query, method, weights, max_results=None, **kwargs)
+        mask = self.filter_bitmaps.get_mask_of_documents(doc_id for doc_id, _ in results)
+        facet_counts = self.filter_bitmaps.get_facet_counts(mask, facet_fields)
+        if max_results is not None:
+            results = results[:max_results]
+        return results, facet_counts
+
+    def get_filter_mask(self, filters):
+        """
+        Returns the bitmap of the documents that pass the filters.
+
+        Parameters
+        ----------
+        filters : dict
+            The filters of the form {field: condition}, e.g.
+            {'genres': ['Drama', 'Crime'], 'mpaa': ['R'], 'release_year': (1990, 1999), 'rating': (8, None)}.
+            Conditions of different fields must all hold. A document passes a 'genres' or 'mpaa'
+            condition if it has any of its values, and a numeric condition (release_year, rating,
+            budget or gross_worldwide) if its value lies in the inclusive (min, max) range.
+
+        Returns
+        -------
+        np.ndarray or None
+            A boolean array over the documents sorted by ID, or None if no filter is set.
+
+        Note
+        -------
+            Numeric ranges are answered by the range index when there is one, and by the value
+            bitmaps of the filter index otherwise.
+        """
+        mask = None
+        bitmap_filters = {}
+        for field, condition in filters.items():
+            if condition is None:
+                continue
+            if self.range_columns is not None and field in self.range_columns.columns:
+                low, high = condition
+                field_mask = self.range_columns.get_mask(field, low, high)
+                mask = field_mask if mask is None else mask & field_mask
+            else:
+                bitmap_filters[field] = condition
+        if not bitmap_filters:
+            return mask
+
+        if self.filter_bitmaps is None:
+            raise ValueError("The filter index is missing; build it with Filter_index first.")
+        filters = bitmap_filters
+        if filters.get("genres") is not None:
+            # a genre matches the stored one with the same analyzed form, e.g. 'comedies' and 'Comedy'
+            genres = filters["genres"]
+            if isinstance(genres, str):
+                genres = [genres]
+            filters["genres"] = [
+                self.genre_values.get(term, term)
+                for genre in genres
+                for term in self.query_analyzer.analyze(genre, Indexes.GENRES)
+            ]
+        field_mask = self.filter_bitmaps.get_mask(filters)
+        return field_mask if mask is None else mask & field_mask
+
+    def expand_term(self, pattern, field, limit=None):
+        """
+        Expands a wildcard pattern to the indexed terms of a field that match it.
+
+        Parameters
+        ----------
+        pattern : str
+            The pattern, e.g. `pac*`. `*` matches any run of characters and `?` one character.
+            The pattern is matched against the preprocessed (lower-cased and stemmed) terms.
+        field : Indexes
+            The field whose terms are expanded.
+        limit : int, optional
+            The maximum number of terms to return.
+
+        Returns
+        -------
+        list of str
+            The matching terms in sorted order.
+        """
+        return self.term_dictionaries[field].wildcard(pattern.lower(), limit)
+
+    def suggest_terms(self, prefix, fields=None, max_results=10):
+        """
+        Suggests the indexed terms that complete a prefix, for type-ahead.
+
+        Parameters
+        ----------
+        prefix : str
+            The typed prefix. It is lower-cased but not stemmed, since a partial word has no stem.
+        fields : list of Indexes, optional
+            The fields to suggest from. Defaults to all of them.
+        max_results : int
+            The maximum number of suggestions.
+
+        Returns
+        -------
+        list
+            Tuples of the terms and their document frequencies (summed over the fields), the
+            most frequent first.
+        """
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        if fields is None:
+            fields = list(self.term_dictionaries)
+        frequencies = {}
+        for field in fields:
+            scorer = self.scorers[field]
+            for term in self.term_dictionaries[field].prefix(prefix):
+                frequencies[term] = frequencies.get(term, 0) + scorer.get_document_frequency(term)
+        return sorted(frequencies.items(), key=lambda x: (-x[1], x[0]))[:max_results]
+
+    def get_documents_of_mask(self, mask):
+        """
+        Returns the IDs of the documents set in a bitmap of `get_filter_mask`.
+
+        Returns
+        -------
+        set
+            The document IDs.
+        """
+        if self.filter_bitmaps is not None:
+            return self.filter_bitmaps.get_document_ids(mask)
+        return {self.range_columns.document_ids[i] for i in np.flatnonzero(mask)}
+
+    def search_batch(self, queries, method, weights, executor=None, **kwargs):
+        """
+        Searches for several queries.
+
+        Parameters
+        ----------
+        queries : list of str
+            The queries to search for.
+        method : str ((n|l)(n|t)(n|c).(n|l)(n|t)(n|c)) | OkapiBM25 | Unigram
+            The method to use for searching.
+        weights: dict
+            The weights of the fields.
+        executor : concurrent.futures.Executor, optional
+            If given, the queries are searched concurrently on it. Only use a thread pool with a
+            frozen engine.
+        **kwargs
+            The other parameters of `search` (safe_ranking, max_results, smoothing_method, ...).
+
+        Returns
+        -------
+        list
+            The results of `search` for each query, in the same order as the queries.
+        """
+        if executor is None:
+            return [self.search(query, method, weights, **kwargs) for query in queries]
+        futures = [
+            executor.submit(self.search, query, method, weights, **kwargs)
+            for query in queries
+        ]
+        return [future.result() for future in futures]
+
     def aggregate_scores(self, weights, scores, final_scores):
         """
         Aggregates the scores of the fields.
@@ -116,19 +473,24 @@ class SearchEngine:
         final_scores : dict
             The final scores of the documents.
         """
-        # TODO
-        pass
+        for field, field_scores in scores.items():
+            weight = weights.get(field, 0)
+            if weight == 0:
+                continue
+            for doc_id, score in field_scores.items():
+                final_scores[doc_id] = final_scores.get(doc_id, 0) + weight * score
 
     def find_scores_with_unsafe_ranking(
-        self, query, method, weights, max_results, scores
+        self, query, method, weights, max_results, scores, profile=None, allowed_documents=None
     ):
         """
         Finds the scores of the documents using the unsafe ranking method using the tiered index.
 
         Parameters
         ----------
-        query: List[str]
-            The query to be scored
+        query: dict
+            The query terms and their frequencies in the query, or a dictionary of them per
+            field (see `get_field_query`)
         method : str ((n|l)(n|t)(n|c).(n|l)(n|t)(n|c)) | OkapiBM25
             The method to use for searching.
         weights: dict
@@ -137,42 +499,210 @@ class SearchEngine:
             The maximum number of results to return.
         scores : dict
             The scores of the documents.
+        profile : SearchProfile, optional
+            The profile to record the stage timings and counters in.
+        allowed_documents : set, optional
+            If given, only these documents are scored.
+
+        Returns
+        -------
+        int
+            The number of tiered index postings read for the query. It is kept on
+            `postings_touched` as well.
+
+        Note
+        -------
+            Documents found in a tier are scored exactly against the whole index. After each tier,
+            the remaining tiers are skipped once `max_results` documents are known and none of the
+            unseen documents (whose tfs are bounded by the largest tf left in the lower tiers) could
+            beat the current k-th score.
         """
+        if profile is None:
+            profile = SearchProfile()
+        tiers = ["first_tier", "second_tier", "third_tier"]
+        postings_touched = 0
         for field in weights:
-            for tier in ["first_tier", "second_tier", "third_tier"]:
-                # TODO
-                pass
+            if weights[field] == 0:
+                continue
+            tiered_index = self.tiered_index[field].index
+            field_query = self.get_field_query(query, field)
+            field_scores = {}
+            for i, tier in enumerate(tiers):
+                with profile.stage("candidates"):
+                    tier_documents = set()
+                    for term in field_query:
+                        postings = tiered_index.get(tier, {}).get(term, {})
+                        postings_touched += len(postings)
+                        tier_documents.update(postings.keys())
+                    tier_documents.difference_update(field_scores.keys())
+                    if allowed_documents is not None:
+                        tier_documents.intersection_update(allowed_documents)
 
-    def find_scores_with_safe_ranking(self, query, method, weights, scores):
+                if tier_documents:
+                    with profile.stage("scoring." + field.value):
+                        tier_scores = self.get_field_scores(
+                            field_query, method, field, list(tier_documents)
+                        )
+                    profile.count("documents_scored", len(tier_scores))
+                    # the documents of a tier are not in the ones before it
+                    field_scores.update(tier_scores)
+
+                if i == len(tiers) - 1:
+                    break
+                if max_results is None or len(field_scores) < max_results:
+                    continue
+                max_tfs = {}
+                for lower_tier in tiers[i + 1 :]:
+                    lower_tier_max_tfs = self.tier_max_tfs[field].get(lower_tier, {})
+                    for term in field_query:
+                        tf = lower_tier_max_tfs.get(term)
+                        if tf is not None and tf > max_tfs.get(term, 0):
+                            max_tfs[term] = tf
+                bound = self.scorers[field].get_score_upper_bound(field_query, max_tfs, method)
+                kth_score = heapq.nlargest(max_results, field_scores.values())[-1]
+                if kth_score >= bound:
+                    break
+            scores[field] = field_scores
+        profile.count("postings_read", postings_touched)
+        self.postings_touched = postings_touched
+        return postings_touched
+
+    def find_scores_with_safe_ranking(
+        self, query, method, weights, scores, profile=None, allowed_documents=None
+    ):
         """
         Finds the scores of the documents using the safe ranking method.
 
         Parameters
         ----------
-        query: List[str]
-            The query to be scored
+        query: dict
+            The query terms and their frequencies in the query, or a dictionary of them per
+            field (see `get_field_query`)
         method : str ((n|l)(n|t)(n|c).(n|l)(n|t)(n|c)) | OkapiBM25
             The method to use for searching.
         weights: dict
             The weights of the fields.
         scores : dict
             The scores of the documents.
+        profile : SearchProfile, optional
+            The profile to record the stage timings and counters in.
+        allowed_documents : set, optional
+            If given, only these documents are scored.
         """
+        if profile is None:
+            profile = SearchProfile()
 
         for field in weights:
-            # TODO
-            pass
+            if weights[field] == 0:
+                continue
+            scorer = self.scorers[field]
+            field_query = self.get_field_query(query, field)
+            with profile.stage("candidates"):
+                document_ids = scorer.get_list_of_documents(field_query)
+                if allowed_documents is not None:
+                    document_ids = [doc_id for doc_id in document_ids if doc_id in allowed_documents]
+            profile.count("postings_read", self.count_postings(field_query, field))
+            with profile.stage("scoring." + field.value):
+                scores[field] = self.get_field_scores(field_query, method, field, document_ids)
+            profile.count("documents_scored", len(scores[field]))
+
+    def get_field_query(self, query, field):
+        """
+        Returns the terms of a query in one field.
+
+        Parameters
+        ----------
+        query: dict
+            The query terms and their frequencies in the query, the same for every field, or
+            a dictionary of them per field (see `QueryAnalyzer.analyze_fields`).
+        field : Indexes
+            The field.
+
+        Returns
+        -------
+        dict
+            The query terms and their frequencies in the field.
+        """
+        if isinstance(next(iter(query), None), Indexes):
+            return query.get(field, {})
+        return query
+
+    def count_postings(self, query, field):
+        """
+        Counts the postings of the query terms in one field.
+
+        Parameters
+        ----------
+        query: dict
+            The query terms and their frequencies in the query
+        field : Indexes
+            The field to count the postings in.
+
+        Returns
+        -------
+        int
+            The number of postings.
+        """
+        index = self.document_indexes[field].index
+        return sum(len(index.get(term, {})) for term in self.get_field_query(query, field))
+
+    def get_field_scores(self, query, method, field, document_ids=None):
+        """
+        Scores documents in one field with the vector space model or Okapi BM25.
+
+        Parameters
+        ----------
+        query: dict
+            The query terms and their frequencies in the query, or a dictionary of them per
+            field (see `get_field_query`)
+        method : str ((n|l)(n|t)(n|c).(n|l)(n|t)(n|c)) | OkapiBM25
+            The method to use for searching.
+        field : Indexes
+            The field to score.
+        document_ids : list, optional
+            The documents to score. Defaults to the documents that contain at least one of the
+            terms in the query.
+
+        Returns
+        -------
+        dict
+            A dictionary of the document IDs and their scores.
+        """
+        scorer = self.scorers[field]
+        query = self.get_field_query(query, field)
+        if method == "OkapiBM25":
+            average_document_field_length = self.metadata_index.index[
+                "averge_document_length"
+            ][field.value]
+            return scorer.compute_socres_with_okapi_bm25(
+                query,
+                average_document_field_length,
+                self.document_lengths_index[field].index,
+                document_ids,
+            )
+        return scorer.compute_scores_with_vector_space_model(
+            query, method, document_ids
+        )
 
     def find_scores_with_unigram_model(
-        self, query, smoothing_method, weights, scores, alpha=0.5, lamda=0.5
+        self,
+        query,
+        smoothing_method,
+        weights,
+        scores,
+        alpha=0.5,
+        lamda=0.5,
+        profile=None,
+        allowed_documents=None,
     ):
         """
         Calculates the scores for each document based on the unigram model.
 
         Parameters
         ----------
-        query : str
-            The query to search for.
+        query : dict
+            The query terms and their frequencies in the query, or a dictionary of them per
+            field (see `get_field_query`).
         smoothing_method : str (bayes | naive | mixture)
             The method used for smoothing the probabilities in the unigram model.
         weights : dict
@@ -184,9 +714,45 @@ class SearchEngine:
         lamda : float, optional
             The parameter used in some smoothing methods to balance between the document
             probability and the collection probability. Defaults to 0.5.
+        profile : SearchProfile, optional
+            The profile to record the stage timings and counters in.
+        allowed_documents : set, optional
+            If given, only these documents are scored.
+
+        Note
+        -------
+            Every field scores the same candidate set (documents matching the query in any field),
+            so a document that misses the query in one field gets that field's smoothed background
+            score (with naive smoothing, a fixed penalty per missing term, see
+            `Scorer.get_unigram_log_likelihoods`) instead of silently contributing nothing. A
+            field where no query term occurs scores no document.
         """
-        # TODO
-        pass
+        if profile is None:
+            profile = SearchProfile()
+        fields = [field for field in weights if weights[field] != 0]
+
+        with profile.stage("candidates"):
+            candidates = set()
+            for field in fields:
+                candidates.update(
+                    self.scorers[field].get_list_of_documents(self.get_field_query(query, field))
+                )
+            if allowed_documents is not None:
+                candidates.intersection_update(allowed_documents)
+            candidates = list(candidates)
+
+        for field in fields:
+            profile.count("postings_read", self.count_postings(query, field))
+            with profile.stage("scoring." + field.value):
+                scores[field] = self.scorers[field].compute_scores_with_unigram_model(
+                    self.get_field_query(query, field),
+                    smoothing_method,
+                    self.document_lengths_index[field].index,
+                    alpha,
+                    lamda,
+                    document_ids=candidates,
+                )
+            profile.count("documents_scored", len(candidates))
 
     def merge_scores(self, scores1, scores2):
         """
@@ -204,8 +770,10 @@ class SearchEngine:
         dict
             The merged dictionary of scores.
         """
-
-        # TODO
+        merged_scores = dict(scores1)
+        for doc_id, score in scores2.items():
+            merged_scores[doc_id] = merged_scores.get(doc_id, 0) + score
+        return merged_scores
 
 
 if __name__ == "__main__":
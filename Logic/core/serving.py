@@ -0,0 +1,135 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from .search import SearchEngine
+
+# the engine of a worker process, loaded once by `init_worker`
+worker_search_engine = None
+
+
+def init_worker(path):
+    """
+    Loads a read-only search engine in a worker process.
+
+    Parameters
+    ----------
+    path : str
+        The path to the indexes.
+    """
+    global worker_search_engine
+    worker_search_engine = SearchEngine(path, read_only=True)
+
+
+def search_in_worker(query, method, weights, kwargs):
+    """
+    Runs one search on the engine of the current worker process.
+    """
+    return worker_search_engine.search(query, method, weights, **kwargs)
+
+
+def search_batch_in_worker(queries, method, weights, kwargs):
+    """
+    Runs a chunk of searches on the engine of the current worker process.
+    """
+    return worker_search_engine.search_batch(queries, method, weights, **kwargs)
+
+
+class SearchPool:
+    def __init__(self, path=None, workers=None, use_processes=False, hooks=None):
+        """
+        Serves searches concurrently from a pool of threads or processes.
+
+        Parameters
+        ----------
+        path : str, optional
+            The path to the indexes. Defaults to the `indexes/` directory of the repository.
+        workers : int, optional
+            The number of workers. Defaults to the number of CPUs.
+        use_processes : bool
+            If False, all the threads share one frozen engine. NumPy releases the GIL while it
+            scores, but the Python parts of a search do not, so threads scale best on the
+            vectorized methods. If True, every process loads its own engine and scoring
+            scales with the number of workers at the cost of one copy of the indexes per worker.
+        hooks : list of MetricsHook, optional
+            The hooks every search profile is reported to. Only used with threads, since
+            profiles recorded in another process do not reach the hooks of this one.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.use_processes = use_processes
+        if use_processes:
+            self.search_engine = None
+            self.executor = ProcessPoolExecutor(
+                self.workers, initializer=init_worker, initargs=(path,)
+            )
+        else:
+            self.search_engine = SearchEngine(path, hooks=hooks, read_only=True)
+            self.executor = ThreadPoolExecutor(self.workers)
+
+    def submit(self, query, method, weights, **kwargs):
+        """
+        Schedules one search.
+
+        Parameters
+        ----------
+        query : str
+            The query to search for.
+        method : str ((n|l)(n|t)(n|c).(n|l)(n|t)(n|c)) | OkapiBM25 | Unigram
+            The method to use for searching.
+        weights: dict
+            The weights of the fields.
+        **kwargs
+            The other parameters of `SearchEngine.search`.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            The future of the search result.
+        """
+        if self.use_processes:
+            return self.executor.submit(search_in_worker, query, method, weights, kwargs)
+        return self.executor.submit(self.search_engine.search, query, method, weights, **kwargs)
+
+    def search(self, query, method, weights, **kwargs):
+        """
+        Runs one search on the pool and waits for its result.
+        """
+        return self.submit(query, method, weights, **kwargs).result()
+
+    def search_batch(self, queries, method, weights, **kwargs):
+        """
+        Runs several searches on the pool.
+
+        Returns
+        -------
+        list
+            The results of the searches, in the same order as the queries.
+        """
+        if not self.use_processes:
+            return self.search_engine.search_batch(
+                queries, method, weights, executor=self.executor, **kwargs
+            )
+
+        # send the queries in chunks so the inter-process round trip is paid once per chunk
+        chunk_size = max(1, -(-len(queries) // (self.workers * 4)))
+        futures = [
+            self.executor.submit(
+                search_batch_in_worker, queries[i : i + chunk_size], method, weights, kwargs
+            )
+            for i in range(0, len(queries), chunk_size)
+        ]
+        results = []
+        for future in futures:
+            results.extend(future.result())
+        return results
+
+    def close(self):
+        """
+        Shuts the workers down.
+        """
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
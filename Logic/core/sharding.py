@@ -0,0 +1,376 @@
+import os
+import json
+import heapq
+import zlib
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+from .indexer import Indexes, Index_types, Index_reader, Range_columns, encode_bitmap, decode_bitmap
+from .serving import init_worker, search_in_worker, search_batch_in_worker
+
+FIELDS = [Indexes.STARS, Indexes.GENRES, Indexes.SUMMARIES]
+
+
+def get_shard(document_id, number_of_shards):
+    """
+    Returns the shard of a document. The hash is stable across runs and machines.
+
+    Parameters
+    ----------
+    document_id : str
+        The ID of the document.
+    number_of_shards : int
+        The number of shards.
+
+    Returns
+    -------
+    int
+        The shard number, between 0 and number_of_shards - 1.
+    """
+    return zlib.crc32(document_id.encode()) % number_of_shards
+
+
+def get_shard_paths(path, number_of_shards):
+    """
+    Returns the index directories of the shards built from the indexes in `path`.
+    """
+    return [
+        os.path.join(path, "shards", str(number_of_shards), f"shard_{shard}", "")
+        for shard in range(number_of_shards)
+    ]
+
+
+def get_index_files(path):
+    """
+    Returns the index files in `path` that shards are built from, sorted by name.
+    """
+    return sorted(
+        file_name
+        for file_name in os.listdir(path)
+        if file_name.endswith(".json") and os.path.isfile(os.path.join(path, file_name))
+    )
+
+
+def get_index_fingerprint(path):
+    """
+    Returns a hash of the names and contents of the index files in `path`, stored in the
+    metadata of the shards so that shards built from an older index are noticed.
+
+    Returns
+    -------
+    str
+        The hex digest.
+    """
+    digest = hashlib.sha256()
+    for file_name in get_index_files(path):
+        digest.update(file_name.encode() + b"\0")
+        with open(os.path.join(path, file_name), "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def shards_are_current(path, shard_paths):
+    """
+    Returns whether every shard exists and was built from the current indexes in `path`.
+    """
+    metadata_name = Indexes.DOCUMENTS.value + "_" + Index_types.METADATA.value + "_index.json"
+    fingerprint = None
+    for shard_path in shard_paths:
+        metadata_path = os.path.join(shard_path, metadata_name)
+        if not os.path.exists(metadata_path):
+            return False
+        with open(metadata_path, "r") as file:
+            shard_fingerprint = json.load(file).get("source_fingerprint")
+        if fingerprint is None:
+            fingerprint = get_index_fingerprint(path)
+        if shard_fingerprint != fingerprint:
+            return False
+    return True
+
+
+def build_shards(path, number_of_shards):
+    """
+    Splits the indexes in `path` by document into shard directories next to them.
+
+    Every shard gets the same files as the whole index (documents, field indexes, tiered
+    indexes, document lengths, metadata and the analyzer, filter and range indexes if there are
+    any)
+    restricted to its documents. The metadata of each
+    shard keeps the document count and average field lengths of the whole collection and adds
+    the document and collection frequencies of every term, so that scores computed on a
+    shard are the same as on the whole index, and the fingerprint of the indexes it was built
+    from (see `get_index_fingerprint`).
+
+    Parameters
+    ----------
+    path : str
+        The path to the indexes.
+    number_of_shards : int
+        The number of shards.
+
+    Returns
+    -------
+    list of str
+        The paths to the shards.
+    """
+    shard_paths = get_shard_paths(path, number_of_shards)
+    fingerprint = get_index_fingerprint(path)
+    for shard_path in shard_paths:
+        os.makedirs(shard_path, exist_ok=True)
+        # files of an earlier build (e.g. an optional index that is gone now) are not kept
+        for file_name in get_index_files(shard_path):
+            os.remove(os.path.join(shard_path, file_name))
+
+    def store(index_name, index_type, shard_indexes):
+        file_name = index_name.value
+        if index_type is not None:
+            file_name += "_" + index_type.value + "_index"
+        for shard_path, shard_index in zip(shard_paths, shard_indexes):
+            with open(os.path.join(shard_path, file_name + ".json"), "w") as file:
+                json.dump(shard_index, file)
+
+    documents = Index_reader(path, Indexes.DOCUMENTS).index
+    shard_documents = [{} for _ in range(number_of_shards)]
+    for doc_id, document in documents.items():
+        shard_documents[get_shard(doc_id, number_of_shards)][doc_id] = document
+    store(Indexes.DOCUMENTS, None, shard_documents)
+
+    metadata = Index_reader(path, Indexes.DOCUMENTS, Index_types.METADATA).index
+    global_statistics = {}
+
+    for field in FIELDS:
+        index = Index_reader(path, field).index
+        global_statistics[field.value] = {
+            "document_frequencies": {term: len(postings) for term, postings in index.items()},
+            "collection_frequencies": {term: sum(postings.values()) for term, postings in index.items()},
+        }
+        store(field, None, split_postings(index, number_of_shards))
+
+        tiered_index = Index_reader(path, field, Index_types.TIERED).index
+        shard_tiers = [{} for _ in range(number_of_shards)]
+        for tier, tier_index in tiered_index.items():
+            for shard, shard_tier in enumerate(split_postings(tier_index, number_of_shards)):
+                shard_tiers[shard][tier] = shard_tier
+        store(field, Index_types.TIERED, shard_tiers)
+
+        document_lengths = Index_reader(path, field, Index_types.DOCUMENT_LENGTH).index
+        shard_lengths = [{} for _ in range(number_of_shards)]
+        for doc_id, length in document_lengths.items():
+            shard_lengths[get_shard(doc_id, number_of_shards)][doc_id] = length
+        store(field, Index_types.DOCUMENT_LENGTH, shard_lengths)
+
+        analyzer_file = field.value + "_" + Index_types.ANALYZER.value + "_index.json"
+        if os.path.exists(os.path.join(path, analyzer_file)):
+            analyzer = Index_reader(path, field, Index_types.ANALYZER).index
+            store(field, Index_types.ANALYZER, [analyzer] * number_of_shards)
+
+    if os.path.exists(os.path.join(path, Indexes.DOCUMENTS.value + "_" + Index_types.FILTER.value + "_index.json")):
+        filter_index = Index_reader(path, Indexes.DOCUMENTS, Index_types.FILTER).index
+        store(Indexes.DOCUMENTS, Index_types.FILTER, split_filter_index(filter_index, number_of_shards))
+
+    if os.path.exists(os.path.join(path, Indexes.DOCUMENTS.value + "_" + Index_types.RANGE.value + "_index.json")):
+        range_index = Index_reader(path, Indexes.DOCUMENTS, Index_types.RANGE).index
+        store(Indexes.DOCUMENTS, Index_types.RANGE, split_range_index(range_index, number_of_shards))
+
+    shard_metadata = dict(metadata)
+    shard_metadata["global_statistics"] = global_statistics
+    shard_metadata["source_fingerprint"] = fingerprint
+    store(Indexes.DOCUMENTS, Index_types.METADATA, [shard_metadata] * number_of_shards)
+    return shard_paths
+
+
+def split_postings(index, number_of_shards):
+    """
+    Splits an index of type {term: {document_id: tf}} by the shard of each document.
+
+    Returns
+    -------
+    list of dict
+        One index per shard, holding only the terms that occur in the shard.
+    """
+    shard_indexes = [{} for _ in range(number_of_shards)]
+    for term, postings in index.items():
+        for doc_id, tf in postings.items():
+            shard_indexes[get_shard(doc_id, number_of_shards)].setdefault(term, {})[doc_id] = tf
+    return shard_indexes
+
+
+def split_filter_index(filter_index, number_of_shards):
+    """
+    Splits a filter index (see `Filter_index`) by the shard of each document.
+
+    Returns
+    -------
+    list of dict
+        One filter index per shard, with the bitmaps restricted to the shard's documents.
+    """
+    document_ids = filter_index["document_ids"]
+    shards = [get_shard(doc_id, number_of_shards) for doc_id in document_ids]
+    shard_filter_indexes = []
+    for shard in range(number_of_shards):
+        positions = [i for i, doc_shard in enumerate(shards) if doc_shard == shard]
+        bitmaps = {}
+        for field, field_bitmaps in filter_index["bitmaps"].items():
+            bitmaps[field] = {}
+            for value, encoded in field_bitmaps.items():
+                bitmap = decode_bitmap(encoded, len(document_ids))[positions]
+                if bitmap.any():
+                    bitmaps[field][value] = encode_bitmap(bitmap)
+        shard_filter_indexes.append(
+            {"document_ids": [document_ids[i] for i in positions], "bitmaps": bitmaps}
+        )
+    return shard_filter_indexes
+
+
+def split_range_index(range_index, number_of_shards):
+    """
+    Splits a range index (see `Range_index`) by the shard of each document.
+
+    Returns
+    -------
+    list of dict
+        One range index per shard, with the columns and sorted orders restricted to the
+        shard's documents.
+    """
+    document_ids = range_index["document_ids"]
+    shards = [get_shard(doc_id, number_of_shards) for doc_id in document_ids]
+    shard_range_indexes = []
+    for shard in range(number_of_shards):
+        positions = [i for i, doc_shard in enumerate(shards) if doc_shard == shard]
+        shard_positions = {position: i for i, position in enumerate(positions)}
+        columns = {}
+        for field, column in range_index["columns"].items():
+            columns[field] = {
+                "values": [column["values"][i] for i in positions],
+                "order": [shard_positions[i] for i in column["order"] if i in shard_positions],
+            }
+        shard_range_indexes.append(
+            {"document_ids": [document_ids[i] for i in positions], "columns": columns}
+        )
+    return shard_range_indexes
+
+
+def merge_results(shard_results, max_results):
+    """
+    Merges the sorted results of the shards.
+
+    Parameters
+    ----------
+    shard_results : list of list
+        The (document_id, score) results of each shard, sorted by score and then by document ID
+        (as `SearchEngine.search` sorts them).
+    max_results : int
+        The maximum number of results to return. If None, all results are returned.
+
+    Returns
+    -------
+    list
+        The best results of all the shards, sorted by their scores. Equal scores are ordered by
+        document ID, so the results are the same as those of the whole index.
+    """
+    merged = heapq.merge(*shard_results, key=lambda x: (-x[1], x[0]))
+    if max_results is None:
+        return list(merged)
+    return [result for _, result in zip(range(max_results), merged)]
+
+
+class ShardedSearchEngine:
+    def __init__(self, path=None, number_of_shards=2):
+        """
+        Searches an index split over several worker processes.
+
+        Every shard is served by its own worker process that loads only that shard's indexes.
+        A query is sent to all the shards, each returns its own top results, and the results are
+        merged here.
+
+        Parameters
+        ----------
+        path : str, optional
+            The path to the (unsharded) indexes. Defaults to the `indexes/` directory of the
+            repository. The shards are built next to it by `build_shards` if they are missing
+            or were built from other indexes than the ones in `path` now.
+        number_of_shards : int
+            The number of shards (and worker processes).
+        """
+        if path is None:
+            repository_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            path = os.path.join(repository_dir, "indexes", "")
+        shard_paths = get_shard_paths(path, number_of_shards)
+        if not shards_are_current(path, shard_paths):
+            shard_paths = build_shards(path, number_of_shards)
+
+        self.shard_executors = [
+            ProcessPoolExecutor(1, initializer=init_worker, initargs=(shard_path,))
+            for shard_path in shard_paths
+        ]
+        # results sorted by a numeric field are merged by that field, read from the whole range index
+        self.range_columns = None
+        range_file = Indexes.DOCUMENTS.value + "_" + Index_types.RANGE.value + "_index.json"
+        if os.path.exists(os.path.join(path, range_file)):
+            self.range_columns = Range_columns(
+                Index_reader(path, Indexes.DOCUMENTS, Index_types.RANGE).index
+            )
+
+    def merge(self, shard_results, max_results, kwargs):
+        """
+        Merges the results of the shards, by score or by the `sort_by` field of the search.
+        """
+        if kwargs.get("sort_by") is None:
+            return merge_results(shard_results, max_results)
+        results = [result for results in shard_results for result in results]
+        results = self.range_columns.sort_by(
+            kwargs["sort_by"], results, kwargs.get("sort_descending", True)
+        )
+        return results if max_results is None else results[:max_results]
+
+    def search(self, query, method, weights, max_results=10, **kwargs):
+        """
+        Searches all the shards and merges their results.
+        The parameters are the same as `SearchEngine.search`.
+
+        Returns
+        -------
+        list
+            A list of tuples containing the document IDs and their scores sorted by their scores.
+        """
+        kwargs["max_results"] = max_results
+        futures = [
+            executor.submit(search_in_worker, query, method, weights, kwargs)
+            for executor in self.shard_executors
+        ]
+        return self.merge([future.result() for future in futures], max_results, kwargs)
+
+    def search_batch(self, queries, method, weights, max_results=10, **kwargs):
+        """
+        Searches several queries on all the shards; each shard gets the whole batch at once.
+
+        Returns
+        -------
+        list
+            The results of each query, in the same order as the queries.
+        """
+        kwargs["max_results"] = max_results
+        futures = [
+            executor.submit(search_batch_in_worker, queries, method, weights, kwargs)
+            for executor in self.shard_executors
+        ]
+        shard_batches = [future.result() for future in futures]
+        return [
+            self.merge([batch[i] for batch in shard_batches], max_results, kwargs)
+            for i in range(len(queries))
+        ]
+
+    def close(self):
+        """
+        Shuts the shard workers down.
+        """
+        for executor in self.shard_executors:
+            executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,288 @@
+import os
+import sys
+import time
+import random
+import string
+import argparse
+
+from .indexer import Indexes, Index_reader
+from .utility import SpellCorrection, SymSpell, ShingleArrays, jaccard_of_arrays
+
+
+def load_documents(indexes_path):
+    """
+    Loads the (preprocessed) summaries of the documents index as lists of words.
+
+    Returns
+    -------
+    list of list of str
+        The words of every summary.
+    """
+    documents = Index_reader(indexes_path, Indexes.DOCUMENTS).index
+    return [document["summaries"] for document in documents.values()]
+
+
+def misspell(word, edits, rng):
+    """
+    Applies random deletions, insertions, substitutions or transpositions to a word.
+    """
+    for _ in range(edits):
+        operation = rng.choice("dist" if len(word) > 1 else "is")
+        i = rng.randrange(len(word))
+        letter = rng.choice(string.ascii_lowercase)
+        if operation == "d":
+            word = word[:i] + word[i + 1 :]
+        elif operation == "i":
+            word = word[:i] + letter + word[i:]
+        elif operation == "s":
+            word = word[:i] + letter + word[i + 1 :]
+        elif i < len(word) - 1:
+            word = word[:i] + word[i + 1] + word[i] + word[i + 2 :]
+    return word
+
+
+def make_test_set(word_counter, size, rng, min_length=4):
+    """
+    Picks frequent words (drawn by frequency) and misspells each with one or two edits.
+
+    Returns
+    -------
+    list
+        Tuples of the misspelled and the correct words.
+    """
+    words = [word for word in word_counter if len(word) >= min_length and word.isalpha()]
+    weights = [word_counter[word] for word in words]
+    test_set = []
+    while len(test_set) < size:
+        word = rng.choices(words, weights)[0]
+        typo = misspell(word, rng.choice([1, 2]), rng)
+        if typo != word and typo not in word_counter:
+            test_set.append((typo, word))
+    return test_set
+
+
+def make_phrase_test_set(documents, word_counter, size, rng, min_length=4):
+    """
+    Picks runs of two to four words from documents and misspells one or two of them.
+
+    Returns
+    -------
+    list
+        Tuples of the misspelled and the correct phrases.
+    """
+    test_set = []
+    while len(test_set) < size:
+        words = rng.choice(documents)
+        length = rng.randint(2, 4)
+        if len(words) < length:
+            continue
+        start = rng.randrange(len(words) - length + 1)
+        phrase = words[start : start + length]
+        if not all(word in word_counter and len(word) >= min_length and word.isalpha() for word in phrase):
+            continue
+        typos = list(phrase)
+        for i in rng.sample(range(length), rng.randint(1, 2)):
+            typo = misspell(phrase[i], rng.choice([1, 2]), rng)
+            if typo not in word_counter:
+                typos[i] = typo
+        if typos != phrase:
+            test_set.append((" ".join(typos), " ".join(phrase)))
+    return test_set
+
+
+def benchmark_context_correction(documents, size=400, held_out=0.1, seed=0):
+    """
+    Compares correcting the words of a phrase one by one (`SpellCorrection.spell_check`) with
+    correcting them together (`SpellCorrection.spell_check_in_context`).
+
+    Parameters
+    ----------
+    documents : list
+        The documents. The language model is built from most of them, and the phrases are
+        taken from the rest, so that they are not simply remembered.
+    size : int
+        The number of misspelled phrases.
+    held_out : float
+        The share of the documents the phrases are taken from.
+    seed : int
+        The seed of the split and the misspellings.
+
+    Returns
+    -------
+    dict
+        The mean latency and the share of phrases corrected entirely of each mode.
+    """
+    rng = random.Random(seed)
+    documents = list(documents)
+    rng.shuffle(documents)
+    split = len(documents) - max(int(len(documents) * held_out), 1)
+    spell_correction = SpellCorrection(documents[:split])
+    test_set = make_phrase_test_set(documents[split:], spell_correction.word_counter, size, rng)
+
+    report = {}
+    modes = {"independent": spell_correction.spell_check, "context": spell_correction.spell_check_in_context}
+    for name, spell_check in modes.items():
+        correct = 0
+        start = time.perf_counter()
+        for typo, phrase in test_set:
+            correct += spell_check(typo).strip() == phrase
+        elapsed = time.perf_counter() - start
+        report[name] = {
+            "milliseconds_per_phrase": elapsed / len(test_set) * 1000,
+            "accuracy": correct / len(test_set),
+        }
+    return report
+
+
+def benchmark_shingle_storage(words, pairs=20000, seed=0, k=2):
+    """
+    Compares shingles stored as a set of strings per word with `ShingleArrays`, the hashes of
+    all the words in one buffer.
+
+    Parameters
+    ----------
+    words : list of str
+        The vocabulary (e.g. `SpellCorrection.words`).
+    pairs : int
+        The number of random pairs of words whose Jaccard score is timed.
+    seed : int
+        The seed of the pairs.
+    k : int
+        The size of each shingle.
+
+    Returns
+    -------
+    dict
+        The build time, memory in bytes and mean Jaccard time of each representation.
+    """
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    sets = [{word[i : i + k] for i in range(len(word) - k + 1)} for word in words]
+    sets_build = time.perf_counter() - start
+    # the sets and every shingle string they hold, each object counted once
+    strings = {id(shingle): shingle for shingles in sets for shingle in shingles}
+    sets_bytes = sum(sys.getsizeof(shingles) for shingles in sets)
+    sets_bytes += sum(sys.getsizeof(shingle) for shingle in strings.values())
+
+    start = time.perf_counter()
+    arrays = ShingleArrays.from_texts(words, k)
+    arrays_build = time.perf_counter() - start
+
+    sampled = [(rng.randrange(len(words)), rng.randrange(len(words))) for _ in range(pairs)]
+    start = time.perf_counter()
+    for first, second in sampled:
+        intersection = len(sets[first] & sets[second])
+        union = len(sets[first] | sets[second])
+        _ = intersection / union if union else 0.0
+    sets_jaccard = time.perf_counter() - start
+    start = time.perf_counter()
+    for first, second in sampled:
+        jaccard_of_arrays(arrays[first], arrays[second])
+    arrays_jaccard = time.perf_counter() - start
+
+    return {
+        "sets": {
+            "build_seconds": sets_build,
+            "bytes": sets_bytes,
+            "microseconds_per_jaccard": sets_jaccard / pairs * 1e6,
+        },
+        "arrays": {
+            "build_seconds": arrays_build,
+            "bytes": arrays.get_nbytes(),
+            "microseconds_per_jaccard": arrays_jaccard / pairs * 1e6,
+        },
+    }
+
+
+def benchmark_spell_correction(documents, size=200, symspell_path=None, seed=0):
+    """
+    Compares the Jaccard corrector of `SpellCorrection` with `SymSpell` on misspelled words.
+
+    Parameters
+    ----------
+    documents : list
+        The documents the vocabulary is built from.
+    size : int
+        The number of misspelled words.
+    symspell_path : str, optional
+        If given, the SymSpell index is saved to and reloaded from this file, as it would be
+        at query time.
+    seed : int
+        The seed of the misspellings.
+
+    Returns
+    -------
+    dict
+        The build time, mean latency and accuracy of each corrector.
+    """
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    spell_correction = SpellCorrection(documents)
+    spell_correction_build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    symspell = SymSpell(spell_correction.word_counter)
+    symspell_build = time.perf_counter() - start
+    report = {}
+    if symspell_path is not None:
+        symspell.save(symspell_path)
+        start = time.perf_counter()
+        symspell = SymSpell.load(symspell_path)
+        report["symspell_load_seconds"] = time.perf_counter() - start
+        report["symspell_file_bytes"] = os.path.getsize(symspell_path)
+
+    test_set = make_test_set(spell_correction.word_counter, size, rng)
+    correctors = {
+        "jaccard": (spell_correction.spell_check, spell_correction_build),
+        "symspell": (symspell.spell_check, symspell_build),
+    }
+    for name, (spell_check, build_seconds) in correctors.items():
+        correct = 0
+        start = time.perf_counter()
+        for typo, word in test_set:
+            correct += spell_check(typo).strip() == word
+        elapsed = time.perf_counter() - start
+        report[name] = {
+            "build_seconds": build_seconds,
+            "milliseconds_per_word": elapsed / len(test_set) * 1000,
+            "accuracy": correct / len(test_set),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the spelling correctors.")
+    parser.add_argument(
+        "--indexes",
+        default=os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "indexes", ""),
+        help="the indexes directory the vocabulary is read from",
+    )
+    parser.add_argument("--size", type=int, default=200)
+    parser.add_argument("--output", default=None, help="where to save the SymSpell index (.npz)")
+    args = parser.parse_args()
+
+    documents = load_documents(args.indexes)
+    report = benchmark_spell_correction(documents, args.size, args.output)
+    for name in ["jaccard", "symspell"]:
+        result = report[name]
+        print(
+            f"{name:<10}build {result['build_seconds']:>7.2f} s"
+            f"{result['milliseconds_per_word']:>10.3f} ms/word  accuracy {result['accuracy']:.3f}"
+        )
+    if "symspell_file_bytes" in report:
+        print(f"symspell file {report['symspell_file_bytes']} bytes, loaded in {report['symspell_load_seconds']:.3f} s")
+
+    report = benchmark_context_correction(documents)
+    for name in ["independent", "context"]:
+        result = report[name]
+        print(f"{name:<12}{result['milliseconds_per_phrase']:>8.3f} ms/phrase  accuracy {result['accuracy']:.3f}")
+
+    words = SpellCorrection(documents).words
+    report = benchmark_shingle_storage(words)
+    print(f"shingles of {len(words)} words")
+    for name in ["sets", "arrays"]:
+        result = report[name]
+        print(
+            f"{name:<10}build {result['build_seconds']:>7.2f} s{result['bytes'] / 2 ** 20:>9.2f} MiB"
+            f"{result['microseconds_per_jaccard']:>10.2f} us/jaccard"
+        )
@@ -1,8 +1,14 @@
+from .autocomplete import *
 from .crawler import *
 from .evaluation import *
+from .language_model import *
 from .preprocess import *
+from .profiling import *
 from .scorer import *
+from .shingles import *
 from .snippet import *
+from .stem_cache import *
+from .symspell import *
 from .spell_correction import *
 
 
@@ -0,0 +1,339 @@
+import re
+from collections import Counter
+
+from .preprocess import load_stopwords
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+LINK_PATTERN = re.compile(r"<a\b[^>]*>.*?</a>", re.DOTALL | re.IGNORECASE)
+TAG_PATTERN = re.compile(r"<[^>]*>")
+
+
+def normalize_phrase(phrase):
+    """
+    Lower-cases a phrase and collapses its whitespace, the form phrases are keyed by.
+    """
+    return " ".join(phrase.lower().split())
+
+
+class TrieNode:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        # the first character of every edge -> [edge label, child node]
+        self.children = {}
+        # the best phrases below this node, the heaviest first
+        self.top = []
+
+
+class CompletionTrie:
+    def __init__(self, k=10):
+        """
+        A compressed trie (radix tree) that keeps the `k` heaviest phrases of every subtree at
+        its root, so a prefix lookup is a walk down the prefix and no search below it.
+
+        Parameters
+        ----------
+        k : int
+            The number of completions kept per node, the most a lookup can return.
+
+        Note
+        -------
+            Weights may only grow (new phrases, more occurrences, clicks). Under that rule a
+            phrase that is not in a node's top list can only enter it when its own weight
+            grows, so updating the nodes on the phrase's paths keeps every list exact.
+        """
+        self.k = k
+        self.root = TrieNode()
+        self.weights = {}
+        self.keys = {}
+
+    def update_top(self, node, phrase):
+        top = node.top
+        weight = self.weights[phrase]
+        if phrase not in top:
+            last = (-self.weights[top[-1]], top[-1]) if top else None
+            if last is not None and last <= (-weight, phrase):
+                # lighter than every phrase in the list, so it only fits at the end
+                if len(top) < self.k:
+                    top.append(phrase)
+                return
+            top.append(phrase)
+        top.sort(key=lambda x: (-self.weights[x], x))
+        del top[self.k :]
+
+    def insert_key(self, key, phrase):
+        """
+        Adds a key path for a phrase, splitting edges where needed, and updates the top lists
+        along it.
+        """
+        node = self.root
+        self.update_top(node, phrase)
+        i = 0
+        while i < len(key):
+            entry = node.children.get(key[i])
+            if entry is None:
+                leaf = TrieNode()
+                node.children[key[i]] = [key[i:], leaf]
+                self.update_top(leaf, phrase)
+                return
+            label, child = entry
+            common = 0
+            limit = min(len(label), len(key) - i)
+            while common < limit and label[common] == key[i + common]:
+                common += 1
+            if common < len(label):
+                middle = TrieNode()
+                middle.children[label[common]] = [label[common:], child]
+                middle.top = list(child.top)
+                entry[0] = label[:common]
+                entry[1] = middle
+                child = middle
+            node = child
+            i += common
+            self.update_top(node, phrase)
+
+    def find_node(self, key):
+        """
+        Returns the node below which every key starting with `key` lies, or None.
+        """
+        node = self.root
+        i = 0
+        while i < len(key):
+            entry = node.children.get(key[i])
+            if entry is None:
+                return None
+            label, child = entry
+            rest = key[i:]
+            if rest.startswith(label):
+                i += len(label)
+                node = child
+            elif label.startswith(rest):
+                return child
+            else:
+                return None
+        return node
+
+    def add(self, phrase, weight, keys=None):
+        """
+        Adds a phrase or increases its weight.
+
+        Parameters
+        ----------
+        phrase : str
+            The phrase returned by lookups.
+        weight : float
+            The weight added to the phrase. Must not be negative.
+        keys : list of str, optional
+            The normalized keys the phrase is found by. Defaults to the normalized phrase.
+        """
+        if weight < 0:
+            raise ValueError("Completion weights can only grow.")
+        self.weights[phrase] = self.weights.get(phrase, 0) + weight
+        phrase_keys = self.keys.setdefault(phrase, set())
+        for key in keys or [normalize_phrase(phrase)]:
+            phrase_keys.add(key)
+        for key in phrase_keys:
+            self.insert_key(key, phrase)
+
+    def lookup(self, prefix, max_results=None):
+        """
+        Returns the heaviest phrases with a key that starts with the prefix.
+
+        Parameters
+        ----------
+        prefix : str
+            The typed prefix.
+        max_results : int, optional
+            The maximum number of completions, at most `k`.
+
+        Returns
+        -------
+        list
+            Tuples of the phrases and their weights, the heaviest first.
+        """
+        node = self.find_node(normalize_phrase(prefix))
+        if node is None:
+            return []
+        top = node.top if max_results is None else node.top[:max_results]
+        return [(phrase, self.weights[phrase]) for phrase in top]
+
+
+class Autocomplete:
+    def __init__(self, k=10, source_weights=None, click_weight=1.0, min_phrase_count=3):
+        """
+        Completes partly typed queries with movie titles, star names and frequent summary phrases.
+
+        Parameters
+        ----------
+        k : int
+            The maximum number of completions of a prefix.
+        source_weights : dict, optional
+            The weight of each source: a title weighs its movie's rating times 'title', a star
+            the sum of the ratings of their movies times 'star', and a summary phrase its number
+            of occurrences times 'phrase'. Defaults to {'title': 1.0, 'star': 1.0, 'phrase': 0.2}.
+        click_weight : float
+            The weight a phrase gains every time a user picks it.
+        min_phrase_count : int
+            How often a summary phrase must occur before it is suggested.
+        """
+        self.trie = CompletionTrie(k)
+        self.source_weights = {"title": 1.0, "star": 1.0, "phrase": 0.2}
+        if source_weights is not None:
+            self.source_weights.update(source_weights)
+        self.click_weight = click_weight
+        self.min_phrase_count = min_phrase_count
+        self.phrase_counts = Counter()
+        self.stopwords = load_stopwords()
+        # normalized phrase -> the phrase it is suggested as
+        self.phrases = {}
+        # while building from a collection, weights are summed here and inserted once at the end
+        self.deferred = None
+
+    @classmethod
+    def from_documents(cls, documents, crawled_movies, **kwargs):
+        """
+        Builds the completions of an indexed collection.
+
+        Parameters
+        ----------
+        documents : dict
+            The documents index ({document_id: document}), which selects the movies.
+        crawled_movies : list of dict
+            The crawled movies. The titles, star names, ratings and raw summaries of the indexed
+            movies are used; the documents index only holds stems, which must not be suggested.
+        **kwargs
+            The parameters of `Autocomplete`.
+
+        Returns
+        -------
+        Autocomplete
+            The completions.
+        """
+        if crawled_movies is None:
+            raise ValueError("The completions are built from the crawled movies, which are missing.")
+        autocomplete = cls(**kwargs)
+        autocomplete.deferred = {}
+        for movie in crawled_movies:
+            if movie.get("id") in documents:
+                autocomplete.add_movie(movie)
+        for phrase, count in autocomplete.phrase_counts.items():
+            if count >= autocomplete.min_phrase_count:
+                autocomplete.add_phrase(phrase, autocomplete.source_weights["phrase"] * count)
+        deferred, autocomplete.deferred = autocomplete.deferred, None
+        # inserting the heaviest phrases first lets most top lists be filled without sorting
+        for phrase, (weight, keys) in sorted(deferred.items(), key=lambda x: (-x[1][0], x[0])):
+            autocomplete.trie.add(phrase, weight, keys)
+        return autocomplete
+
+    def add_phrase(self, phrase, weight, keys=None):
+        """
+        Adds a phrase or increases its weight (see `CompletionTrie.add`).
+        """
+        self.phrases.setdefault(normalize_phrase(phrase), phrase)
+        if self.deferred is None:
+            self.trie.add(phrase, weight, keys)
+            return
+        total, phrase_keys = self.deferred.get(phrase, (0, set()))
+        phrase_keys.update(keys or [normalize_phrase(phrase)])
+        self.deferred[phrase] = (total + weight, phrase_keys)
+
+    def get_word_suffixes(self, phrase):
+        """
+        Returns the keys of a name or title: the whole phrase and the phrase from each later word
+        on, so that `pac` completes `Al Pacino`.
+        """
+        words = normalize_phrase(phrase).split()
+        return [" ".join(words[i:]) for i in range(len(words))]
+
+    def add_movie(self, movie):
+        """
+        Adds the completions of a movie, e.g. when it is newly indexed.
+
+        Parameters
+        ----------
+        movie : dict
+            The movie, with any of 'title', 'stars' (a list of names), 'rating' and
+            'summaries' (a list of texts).
+        """
+        try:
+            rating = float(movie.get("rating"))
+        except (TypeError, ValueError):
+            rating = 5.0
+
+        title = movie.get("title")
+        if isinstance(title, str) and title.strip():
+            self.add_phrase(title.strip(), self.source_weights["title"] * rating, self.get_word_suffixes(title))
+
+        stars = movie.get("stars")
+        if isinstance(stars, list):
+            for star in stars:
+                if star.strip():
+                    self.add_phrase(star.strip(), self.source_weights["star"] * rating, self.get_word_suffixes(star))
+
+        summaries = movie.get("summaries")
+        if isinstance(summaries, list):
+            for summary in summaries:
+                self.add_summary_phrases(summary)
+
+    def add_summary_phrases(self, summary):
+        """
+        Counts the two and three word phrases of a raw summary that neither start nor end with a
+        stopword, and suggests those that occur often enough. Tags and author links are removed
+        first.
+        """
+        words = WORD_PATTERN.findall(TAG_PATTERN.sub(" ", LINK_PATTERN.sub(" ", summary)).lower())
+        is_stopword = [word in self.stopwords for word in words]
+        phrases = [
+            " ".join(words[i : i + length])
+            for length in (2, 3)
+            for i in range(len(words) - length + 1)
+            if not is_stopword[i] and not is_stopword[i + length - 1]
+        ]
+        if self.deferred is not None:
+            # the counts are added once the whole collection is read
+            self.phrase_counts.update(phrases)
+            return
+        for phrase in phrases:
+            self.phrase_counts[phrase] += 1
+            count = self.phrase_counts[phrase]
+            if count == self.min_phrase_count:
+                self.add_phrase(phrase, self.source_weights["phrase"] * count)
+            elif count > self.min_phrase_count:
+                self.add_phrase(phrase, self.source_weights["phrase"])
+
+    def record_selection(self, phrase):
+        """
+        Makes a completion more popular after a user picked or searched it.
+
+        Only phrases that are already completions (titles, stars and frequent summary phrases)
+        are boosted; other queries are ignored, so free text typed by users is never suggested
+        to others and the completions do not grow with every search.
+
+        Returns
+        -------
+        bool
+            Whether the phrase was a completion.
+        """
+        phrase = self.phrases.get(normalize_phrase(phrase))
+        if phrase is None:
+            return False
+        self.add_phrase(phrase, self.click_weight)
+        return True
+
+    def complete(self, prefix, max_results=None):
+        """
+        Returns the completions of a prefix.
+
+        Parameters
+        ----------
+        prefix : str
+            The typed prefix.
+        max_results : int, optional
+            The maximum number of completions.
+
+        Returns
+        -------
+        list
+            Tuples of the completions and their weights, the heaviest first.
+        """
+        return self.trie.lookup(prefix, max_results)
@@ -0,0 +1,153 @@
+import math
+import numpy as np
+
+# Fibonacci hashing: the high bits of the key times 2 ** 64 / golden ratio pick the slot
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+MASK = (1 << 64) - 1
+
+
+class BigramLanguageModel:
+    def __init__(self, word_counts, bigram_keys, bigram_counts, lamda=0.8):
+        """
+        A bigram language model over a vocabulary, with the bigram counts in a hashed array.
+
+        Parameters
+        ----------
+        word_counts : np.ndarray
+            The count of every word, by word id.
+        bigram_keys : np.ndarray
+            The open addressing hash table of the bigrams: the int64 key
+            `first * len(word_counts) + second` of each bigram in its slot, or -1 in empty slots.
+            Its size is a power of two.
+        bigram_counts : np.ndarray
+            The count of the bigram in each slot of `bigram_keys`.
+        lamda : float
+            The weight of the bigram probability, interpolated with the unigram one.
+        """
+        self.word_counts = word_counts
+        self.bigram_keys = bigram_keys
+        self.bigram_counts = bigram_counts
+        self.lamda = lamda
+        self.vocabulary_size = len(word_counts)
+        self.total_count = int(np.sum(word_counts))
+        self.shift = 64 - (len(bigram_keys).bit_length() - 1)
+
+        used = bigram_keys >= 0
+        # how often each word starts a bigram, the denominator of the bigram probabilities
+        self.history_counts = np.bincount(
+            bigram_keys[used] // max(self.vocabulary_size, 1),
+            weights=bigram_counts[used],
+            minlength=self.vocabulary_size,
+        ).astype(np.int64)
+
+    @classmethod
+    def from_token_ids(cls, token_ids, word_counts, lamda=0.8):
+        """
+        Counts the bigrams of a corpus.
+
+        Parameters
+        ----------
+        token_ids : np.ndarray
+            The word ids of all the documents one after another, with -1 between documents.
+        word_counts : np.ndarray
+            The count of every word, by word id.
+        lamda : float
+            The weight of the bigram probability.
+
+        Returns
+        -------
+        BigramLanguageModel
+            The language model.
+        """
+        token_ids = np.asarray(token_ids, dtype=np.int64)
+        firsts, seconds = token_ids[:-1], token_ids[1:]
+        valid = (firsts >= 0) & (seconds >= 0)
+        keys, counts = np.unique(firsts[valid] * len(word_counts) + seconds[valid], return_counts=True)
+        bigram_keys, bigram_counts = cls.build_hash_table(keys, counts)
+        return cls(word_counts, bigram_keys, bigram_counts, lamda)
+
+    @staticmethod
+    def get_slots(keys, shift):
+        """
+        Returns the home slots of int64 keys in a table of 2 ** (64 - shift) slots.
+        """
+        with np.errstate(over="ignore"):
+            hashes = keys.astype(np.uint64) * np.uint64(HASH_MULTIPLIER)
+        return (hashes >> np.uint64(shift)).astype(np.int64)
+
+    @classmethod
+    def build_hash_table(cls, keys, counts):
+        """
+        Puts distinct keys and their counts into an open addressing hash table with linear
+        probing, at most half full.
+
+        Returns
+        -------
+        tuple
+            The keys of the slots (-1 in empty ones) and the counts of the slots.
+
+        Note
+        -------
+            The keys are inserted all at once, probe by probe: every key that is not placed
+            yet tries its next slot, and of the keys that try the same empty slot the first
+            one takes it.
+        """
+        size = 1 << max(int(2 * len(keys)).bit_length(), 4)
+        shift = 64 - (size.bit_length() - 1)
+        table_keys = np.full(size, -1, dtype=np.int64)
+        table_counts = np.zeros(size, dtype=np.int32)
+        slots = cls.get_slots(keys, shift)
+        pending = np.arange(len(keys))
+        while len(pending):
+            free = table_keys[slots] < 0
+            candidates = pending[free]
+            taken, first = np.unique(slots[free], return_index=True)
+            table_keys[taken] = keys[candidates[first]]
+            table_counts[taken] = counts[candidates[first]]
+            placed = np.zeros(len(pending), dtype=bool)
+            placed[np.flatnonzero(free)[first]] = True
+            pending, slots = pending[~placed], (slots[~placed] + 1) & (size - 1)
+        return table_keys, table_counts
+
+    def get_bigram_count(self, first_id, second_id):
+        """
+        Returns how often a word follows another one.
+        """
+        key = first_id * self.vocabulary_size + second_id
+        slot = ((key * HASH_MULTIPLIER) & MASK) >> self.shift
+        mask = len(self.bigram_keys) - 1
+        while True:
+            slot_key = int(self.bigram_keys[slot])
+            if slot_key == key:
+                return int(self.bigram_counts[slot])
+            if slot_key < 0:
+                return 0
+            slot = (slot + 1) & mask
+
+    def get_log_probability(self, word_id, previous_id=None):
+        """
+        Calculates the log probability of a word after another one.
+
+        Parameters
+        ----------
+        word_id : int or None
+            The id of the word, or None if it is not in the vocabulary.
+        previous_id : int or None
+            The id of the previous word, or None at the start of the query or after a word
+            that is not in the vocabulary.
+
+        Returns
+        -------
+        float
+            The log of lamda * P(word | previous) + (1 - lamda) * P(word), where P(word) is
+            smoothed by adding one to every count.
+        """
+        if word_id is None:
+            return math.log(1 / (self.total_count + self.vocabulary_size))
+        probability = (int(self.word_counts[word_id]) + 1) / (self.total_count + self.vocabulary_size)
+        if previous_id is not None:
+            history_count = int(self.history_counts[previous_id])
+            if history_count > 0:
+                bigram_probability = self.get_bigram_count(previous_id, word_id) / history_count
+                probability = self.lamda * bigram_probability + (1 - self.lamda) * probability
+        return math.log(probability)
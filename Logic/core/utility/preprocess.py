@@ -1,13 +1,208 @@
 import os
 import re
 import json
+import itertools
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
 from nltk.stem import PorterStemmer
 from nltk.stem import WordNetLemmatizer
 from nltk.tokenize import word_tokenize
 
+from .stem_cache import StemCache
+
+
+# the link patterns only ever match whole whitespace-separated words, so one alternation
+# removes the same words as applying them one after another
+LINK_PATTERN = re.compile(r'\S*http\S*|\S*www\S*|\S+\.ir\S*|\S+\.com\S*|\S+\.org\S*|\S*@\S*')
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s]')
+WORD_PATTERN = re.compile(r'\b\w+\b')
+
+# the preprocessor of a worker process, built once by `preprocess_chunk`
+worker_preprocessor = None
+
+
+@lru_cache(maxsize=None)
+def load_stopwords():
+    """
+    Reads the stopwords file next to this module once and caches the result.
+
+    Returns
+    ----------
+    frozenset
+        The stopwords.
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    stopwords_path = os.path.join(script_dir, "stopwords.txt")
+    with open(stopwords_path, "r") as file:
+        return frozenset(word.strip() for word in file)
+
+
+def preprocess_chunk(texts, filters=None, stem_cache_path=None):
+    """
+    Preprocesses a chunk of texts in a worker process of `Preprocessor.preprocess`.
+
+    Parameters
+    ----------
+    texts : list of str
+        The texts.
+    filters : list, optional
+        The filter chain of the preprocessor (see `Analyzer`). Custom filters must be picklable.
+    stem_cache_path : str, optional
+        The file of the preprocessor's persistent stem cache. The workers map the same file
+        read-only: the stems of words missing from it are computed in the workers and are not
+        added to the file.
+
+    Returns
+    ----------
+    list
+        The preprocessed words of each text.
+    """
+    global worker_preprocessor
+    if (
+        worker_preprocessor is None
+        or worker_preprocessor.filters != filters
+        or worker_preprocessor.persistent_stem_cache_path() != stem_cache_path
+    ):
+        stem_cache = StemCache(stem_cache_path, read_only=True) if stem_cache_path is not None else None
+        worker_preprocessor = Preprocessor([], filters=filters, persistent_stem_cache=stem_cache)
+    return [worker_preprocessor.preprocess_text(text) for text in texts]
+
+
+class Analyzer:
+    default_filters = ['lowercase', 'stem', 'links', 'punctuation', 'stopwords']
+
+    def __init__(self, filters: list = None, stem=None, stopwords=None, cache_size: int = 100000):
+        """
+        Splits a text into words once and runs every word through a chain of filters.
+
+        Parameters
+        ----------
+        filters : list, optional
+            The filter chain, in order. An entry is either the name of a built-in filter
+            ('lowercase', 'stem', 'links', 'punctuation', 'stopwords') or a function that takes
+            a word and returns the new word, or an empty string / None to drop it. Defaults to
+            `default_filters`, whose output is the same as `Preprocessor.preprocess`.
+        stem : callable, optional
+            The stemmer of the 'stem' filter. Defaults to the Porter stemmer.
+        stopwords : set, optional
+            The stopwords of the 'stopwords' filter. Defaults to `load_stopwords()`.
+        cache_size : int
+            The most words whose results are remembered, so that a repeated word goes through
+            the chain once. The filters must only depend on the word. 0 turns the cache off.
+        """
+        self.stem = stem if stem is not None else Preprocessor.stemmer.stem
+        self.stopwords = stopwords if stopwords is not None else load_stopwords()
+        built_in_filters = {
+            'lowercase': str.lower,
+            'stem': self.stem,
+            'links': self.filter_link,
+            'punctuation': self.filter_punctuation,
+            'stopwords': self.filter_stopword,
+        }
+        self.filters = [
+            built_in_filters[name] if isinstance(name, str) else name
+            for name in (self.default_filters if filters is None else filters)
+        ]
+        self.cache = {}
+        self.cache_size = cache_size
+
+    def filter_link(self, word: str):
+        """
+        Drops a word that is (or contains) a link or an email address.
+        """
+        return None if LINK_PATTERN.search(word) else word
+
+    def filter_punctuation(self, word: str):
+        """
+        Strips the punctuation out of a word.
+        """
+        return PUNCTUATION_PATTERN.sub('', word)
+
+    def filter_stopword(self, word: str):
+        """
+        Drops a stopword.
+        """
+        return None if word.lower() in self.stopwords else word
+
+    def analyze_word(self, word: str):
+        """
+        Runs a word through the filter chain.
+
+        Returns
+        ----------
+        str
+            The filtered word, or an empty string if a filter dropped it.
+        """
+        for word_filter in self.filters:
+            word = word_filter(word)
+            if not word:
+                return ''
+        return word
+
+    def analyze(self, text: str):
+        """
+        Analyze a text in one pass over its words.
+
+        Parameters
+        ----------
+        text : str
+            The text to be analyzed.
+
+        Returns
+        ----------
+        List[str]
+            The words that pass every filter.
+        """
+        cache = self.cache
+        words = []
+        for word in text.split():
+            result = cache.get(word)
+            if result is None:
+                result = self.analyze_word(word)
+                if len(cache) < self.cache_size:
+                    cache[word] = result
+            if result:
+                words.append(result)
+        return words
+
+    def analyze_words(self, words):
+        """
+        Analyzes every word of a list, keeping the dropped ones as empty strings so that the
+        results line up with the words (e.g. to find where a query term occurs in a text).
+
+        Parameters
+        ----------
+        words : list of str
+            The words.
+
+        Returns
+        ----------
+        List[str]
+            The analyzed form of every word, '' for the dropped ones.
+        """
+        cache = self.cache
+        results = []
+        for word in words:
+            result = cache.get(word)
+            if result is None:
+                result = self.analyze_word(word)
+                if len(cache) < self.cache_size:
+                    cache[word] = result
+            results.append(result)
+        return results
+
+
 class Preprocessor:
+    stemmer = PorterStemmer()
 
-    def __init__(self, documents: list):
+    def __init__(
+        self,
+        documents: list,
+        stem_cache_size: int = 100000,
+        filters: list = None,
+        persistent_stem_cache: StemCache = None,
+    ):
         """
         Initialize the class.
 
@@ -15,32 +210,119 @@ class Preprocessor:
         ----------
         documents : list
             The list of documents to be preprocessed, path to stop words, or other parameters.
+        stem_cache_size : int
+            The most words whose stems are remembered. The vocabulary repeats heavily, so most
+            words are stemmed once. The analyzer remembers as many analyzed words. 0 turns
+            both caches off.
+        filters : list, optional
+            The filter chain of the analyzer (see `Analyzer`). Defaults to lower-casing,
+            stemming and removing links, punctuation and stopwords.
+        persistent_stem_cache : StemCache, optional
+            The on-disk stem cache that words missing from the in-memory cache are looked up
+            in, so words stemmed by an earlier run are not stemmed again. Only the words stemmed
+            in this process are added to it; those stemmed by the worker processes of
+            `preprocess` are not.
         """
         # TODO
-        self.documents = documents        
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        stopwords_path = os.path.join(script_dir, "stopwords.txt")
-        with open(stopwords_path, "r") as file:
-            self.stopwords = set(word.strip() for word in file)
+        self.documents = documents
+        self.stopwords = load_stopwords()
+        self.stem_cache = {}
+        self.stem_cache_size = stem_cache_size
+        self.persistent_stem_cache = persistent_stem_cache
+        self.filters = filters
+        self.analyzer = Analyzer(
+            filters, stem=self.stem, stopwords=self.stopwords, cache_size=stem_cache_size
+        )
 
-    def preprocess(self):
+    def preprocess(self, workers: int = None, chunk_size: int = 256):
         """
         Preprocess the text using the methods in the class.
 
+        Parameters
+        ----------
+        workers : int, optional
+            If more than 1, the documents are preprocessed by this many processes.
+        chunk_size : int
+            The number of documents sent to a worker process at once.
+
         Returns
         ----------
         List[str]
             The preprocessed documents.
         """
         # TODO
-        preprocessed_doc = []
-        for document in self.documents:
-            preprocessed_1 = self.normalize(document)
-            preprocessed_2 = self.remove_links(preprocessed_1)
-            preprocessed_3 = self.remove_punctuations(preprocessed_2)
-            preprocessed_4 = self.remove_stopwords(preprocessed_3)
-            preprocessed_doc.append(preprocessed_4)
-        return preprocessed_doc
+        if workers is not None and len(self.documents) <= chunk_size:
+            workers = None  # a single chunk is not worth starting processes for
+        return list(self.iter_preprocess(self.documents, workers, chunk_size))
+
+    def iter_preprocess(self, documents=None, workers: int = None, chunk_size: int = 256):
+        """
+        Preprocess documents lazily, one at a time.
+
+        Parameters
+        ----------
+        documents : iterable of str, optional
+            The documents, e.g. a generator reading them from a file. Defaults to the documents
+            the preprocessor was created with.
+        workers : int, optional
+            If more than 1, the documents are preprocessed by this many processes.
+        chunk_size : int
+            The number of documents sent to a worker process at once.
+
+        Yields
+        ----------
+        List[str]
+            The preprocessed words of each document, in the order of the documents.
+
+        Note
+        ----------
+            The documents are read as the results are consumed. With worker processes, at most
+            two chunks per worker are read ahead, so memory stays bounded for any number of
+            documents.
+        """
+        if documents is None:
+            documents = self.documents
+        if workers is None or workers <= 1:
+            for document in documents:
+                yield self.preprocess_text(document)
+            return
+
+        documents = iter(documents)
+        with ProcessPoolExecutor(workers) as executor:
+            pending = deque()
+            while True:
+                while len(pending) < 2 * workers:
+                    chunk = list(itertools.islice(documents, chunk_size))
+                    if not chunk:
+                        break
+                    stem_cache_path = self.persistent_stem_cache_path()
+                    pending.append(executor.submit(preprocess_chunk, chunk, self.filters, stem_cache_path))
+                if not pending:
+                    return
+                yield from pending.popleft().result()
+
+    def preprocess_text(self, text: str):
+        """
+        Preprocess a single text using the methods in the class.
+
+        Parameters
+        ----------
+        text : str
+            The text to be preprocessed.
+
+        Returns
+        ----------
+        List[str]
+            The preprocessed words of the text.
+
+        Note
+        ----------
+            The text is split once and each word goes through the analyzer's filters. With the
+            default filters the words are the same as those of `normalize`, `remove_links`,
+            `remove_punctuations` and `remove_stopwords` applied one after another, since every
+            one of them works word by word.
+        """
+        return self.analyzer.analyze(text)
 
     def normalize(self, text: str):
         """
@@ -59,11 +341,10 @@ class Preprocessor:
         # TODO
         lower_text = text.lower()
         processed_words = []
-        stemmer = PorterStemmer()
         text_words = lower_text.split()
 
         for word in text_words:
-            new_word = stemmer.stem(word)
+            new_word = self.stem(word)
             processed_words.append(new_word)
         normalized_text = ' '.join(processed_words)
 
@@ -80,6 +361,36 @@ class Preprocessor:
 
         return normalized_text
 
+    def stem(self, word: str):
+        """
+        Stem a word, remembering the stems of up to `stem_cache_size` words.
+
+        Parameters
+        ----------
+        word : str
+            The lower-cased word.
+
+        Returns
+        ----------
+        str
+            The stem.
+        """
+        stem = self.stem_cache.get(word)
+        if stem is None:
+            if self.persistent_stem_cache is not None:
+                stem = self.persistent_stem_cache.stem(word)
+            else:
+                stem = self.stemmer.stem(word)
+            if len(self.stem_cache) < self.stem_cache_size:
+                self.stem_cache[word] = stem
+        return stem
+
+    def persistent_stem_cache_path(self):
+        """
+        Returns the file of the persistent stem cache, or None without one.
+        """
+        return self.persistent_stem_cache.path if self.persistent_stem_cache is not None else None
+
     def remove_links(self, text: str):
         """
         Remove links from the text.
@@ -94,11 +405,8 @@ class Preprocessor:
         str
             The text with links removed.
         """
-        patterns = [r'\S*http\S*', r'\S*www\S*', r'\S+\.ir\S*', r'\S+\.com\S*', r'\S+\.org\S*', r'\S*@\S*']
         # TODO
-        for ptr in patterns:
-            text = re.sub(ptr, '', text)
-        return text
+        return LINK_PATTERN.sub('', text)
 
     def remove_punctuations(self, text: str):
         """
@@ -115,8 +423,7 @@ class Preprocessor:
             The text with punctuations removed.
         """
         # TODO
-        pattern = r'[^\w\s]'
-        new_text = re.sub(pattern, '', text)
+        new_text = PUNCTUATION_PATTERN.sub('', text)
         return new_text
 
     def tokenize(self, text: str):
@@ -134,8 +441,7 @@ class Preprocessor:
             The list of words.
         """
         # TODO
-        pattern = r'\b\w+\b'
-        list_of_words = re.findall(pattern, text)
+        list_of_words = WORD_PATTERN.findall(text)
         return list_of_words
 
     def remove_stopwords(self, text: str):
@@ -162,3 +468,150 @@ class Preprocessor:
                 final_words.append(word)
         return final_words
 
+
+class FieldAnalyzer:
+    def __init__(self, analyzer_type: str = 'text', preprocessor: Preprocessor = None, max_keyword_words: int = 4):
+        """
+        Turns the values of one field into its terms, as cheaply as the field allows.
+
+        Parameters
+        ----------
+        analyzer_type : str
+            'keyword': every value (e.g. a star name) is one lower-cased term.
+            'lowercase': the lower-cased words of the values (e.g. genres), nothing else.
+            'text': the full preprocessing of `Preprocessor` (e.g. summaries).
+        preprocessor : Preprocessor, optional
+            The preprocessor of 'text' fields. Defaults to a new one.
+        max_keyword_words : int
+            The longest run of query words that is tried as a keyword.
+        """
+        if analyzer_type not in ('keyword', 'lowercase', 'text'):
+            raise ValueError(f"Unknown analyzer {analyzer_type!r}; use keyword, lowercase or text")
+        self.analyzer_type = analyzer_type
+        self.preprocessor = preprocessor if preprocessor is not None else Preprocessor([])
+        self.max_keyword_words = max_keyword_words
+
+    def analyze(self, values):
+        """
+        Analyze the values of a field for indexing.
+
+        Parameters
+        ----------
+        values : str or list of str
+            The field of a document, e.g. its list of star names.
+
+        Returns
+        ----------
+        List[str]
+            The terms of the field.
+        """
+        if isinstance(values, str):
+            values = [values]
+        if self.analyzer_type == 'keyword':
+            keywords = (' '.join(value.lower().split()) for value in values)
+            return [keyword for keyword in keywords if keyword]
+        if self.analyzer_type == 'lowercase':
+            return [word for value in values for word in value.lower().split()]
+        return self.preprocessor.preprocess_text(' '.join(values))
+
+    def analyze_query(self, query: str):
+        """
+        Analyze a query for searching the field.
+
+        Parameters
+        ----------
+        query : str
+            The raw query text.
+
+        Returns
+        ----------
+        List[str]
+            The query terms. For a keyword field every run of up to `max_keyword_words`
+            consecutive query words is a term, so a name anywhere in the query matches.
+        """
+        if self.analyzer_type != 'keyword':
+            return self.analyze(query)
+        words = query.lower().split()
+        return [
+            ' '.join(words[start : start + length])
+            for start in range(len(words))
+            for length in range(1, min(self.max_keyword_words, len(words) - start) + 1)
+        ]
+
+
+class QueryAnalyzer:
+    def __init__(self, stem_cache: StemCache = None, field_analyzers: dict = None):
+        """
+        Initializes the QueryAnalyzer.
+
+        The preprocessor (and with it the stopword set and the stemmer) is built once and
+        reused for every query.
+
+        Parameters
+        ----------
+        stem_cache : StemCache, optional
+            The persistent stem cache of the collection.
+        field_analyzers : dict, optional
+            The analyzer type each field was indexed with ({field: 'keyword' | 'lowercase' | 'text'}).
+            Fields that are missing are analyzed as text.
+        """
+        self.preprocessor = Preprocessor([], persistent_stem_cache=stem_cache)
+        self.field_analyzers = {
+            field: FieldAnalyzer(analyzer_type, self.preprocessor)
+            for field, analyzer_type in (field_analyzers or {}).items()
+            if analyzer_type != 'text'
+        }
+
+    def analyze(self, query: str, field=None):
+        """
+        Preprocess a query and count its terms.
+
+        Parameters
+        ----------
+        query : str
+            The raw query text.
+        field : optional
+            The field the terms are looked up in. Defaults to a text field.
+
+        Returns
+        ----------
+        dict
+            A dictionary of the unique query terms and their frequencies in the query,
+            in the order they first appear. All the scorers accept it in place of a term list.
+        """
+        if field in self.field_analyzers:
+            terms = self.field_analyzers[field].analyze_query(query)
+        else:
+            terms = self.preprocessor.preprocess_text(query)
+        query_tfs = {}
+        for term in terms:
+            query_tfs[term] = query_tfs.get(term, 0) + 1
+        return query_tfs
+
+    def analyze_fields(self, query: str, fields):
+        """
+        Preprocess a query once per distinct analyzer of the fields.
+
+        Parameters
+        ----------
+        query : str
+            The raw query text.
+        fields : iterable
+            The fields to be searched.
+
+        Returns
+        ----------
+        dict
+            The term frequencies of the query in each field ({field: {term: tf}}). Text fields
+            share the same dictionary.
+        """
+        text_query = None
+        field_queries = {}
+        for field in fields:
+            if field in self.field_analyzers:
+                field_queries[field] = self.analyze(query, field)
+            else:
+                if text_query is None:
+                    text_query = self.analyze(query)
+                field_queries[field] = text_query
+        return field_queries
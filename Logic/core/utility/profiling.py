@@ -0,0 +1,175 @@
+import json
+import time
+from collections import deque
+from contextlib import contextmanager
+from threading import Lock
+
+import numpy as np
+
+
+class SearchProfile:
+    def __init__(self, hooks=()):
+        """
+        Collects the stage timings and counters of a single search request.
+
+        Parameters
+        ----------
+        hooks : iterable of MetricsHook
+            The hooks the profile is reported to when it is finished.
+        """
+        self.hooks = list(hooks)
+        self.stages = {}
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times the code inside the `with` block. Timing the same stage twice adds up the durations.
+
+        Parameters
+        ----------
+        name : str
+            The name of the stage (e.g. preprocess, candidates, scoring.stars, sort, snippet).
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, value=1):
+        """
+        Adds a value to a counter.
+
+        Parameters
+        ----------
+        name : str
+            The name of the counter (e.g. postings_read, documents_scored).
+        value : int
+            The value to add.
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def finish(self):
+        """
+        Reports the profile to all of its hooks.
+        """
+        for hook in self.hooks:
+            hook.record(self)
+
+
+class MetricsHook:
+    """
+    Base class of the objects that receive finished search profiles.
+    """
+
+    def record(self, profile):
+        """
+        Receives a finished profile.
+
+        Parameters
+        ----------
+        profile : SearchProfile
+            The profile of one search request.
+        """
+        raise NotImplementedError
+
+
+class MetricsRegistry(MetricsHook):
+    def __init__(self, max_samples=10000):
+        """
+        Keeps the most recent samples of every stage and counter in memory.
+
+        Parameters
+        ----------
+        max_samples : int
+            The number of samples kept for each metric. Older samples are dropped.
+        """
+        self.max_samples = max_samples
+        self.samples = {}
+        self.lock = Lock()
+
+    def record(self, profile):
+        with self.lock:
+            for name, seconds in profile.stages.items():
+                self.add_sample("stage." + name, seconds)
+            for name, value in profile.counters.items():
+                self.add_sample("counter." + name, value)
+
+    def add_sample(self, name, value):
+        """
+        Adds one sample to a metric.
+
+        Parameters
+        ----------
+        name : str
+            The name of the metric.
+        value : float
+            The sample.
+        """
+        if name not in self.samples:
+            self.samples[name] = deque(maxlen=self.max_samples)
+        self.samples[name].append(value)
+
+    def summary(self):
+        """
+        Summarizes every metric as a histogram.
+
+        Returns
+        -------
+        dict
+            A dictionary from metric names to their count, mean, p50, p95 and p99.
+            Stage timings are in milliseconds.
+        """
+        with self.lock:
+            samples = {name: list(values) for name, values in self.samples.items()}
+
+        summary = {}
+        for name, values in samples.items():
+            values = np.array(values, dtype=float)
+            if name.startswith("stage."):
+                values = values * 1e3
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            summary[name] = {
+                "count": len(values),
+                "mean": float(values.mean()),
+                "p50": float(p50),
+                "p95": float(p95),
+                "p99": float(p99),
+            }
+        return summary
+
+
+class MetricsFileHook(MetricsRegistry):
+    def __init__(self, path, flush_every=100, max_samples=10000):
+        """
+        A registry that also writes its summary to a JSON file.
+
+        Parameters
+        ----------
+        path : str
+            The path of the metrics file.
+        flush_every : int
+            The file is rewritten after this many recorded profiles.
+        max_samples : int
+            The number of samples kept for each metric.
+        """
+        super().__init__(max_samples)
+        self.path = path
+        self.flush_every = flush_every
+        self.recorded = 0
+
+    def record(self, profile):
+        super().record(profile)
+        with self.lock:
+            self.recorded += 1
+            should_flush = self.recorded % self.flush_every == 0
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the current summary to the metrics file.
+        """
+        with open(self.path, "w") as file:
+            json.dump(self.summary(), file, indent=4)
@@ -2,7 +2,16 @@ import numpy as np
 
 
 class Scorer:
-    def __init__(self, index, number_of_documents):
+    k1 = 1.5
+    b = 0.75
+
+    def __init__(
+        self,
+        index,
+        number_of_documents,
+        document_frequencies=None,
+        collection_frequencies=None,
+    ):
         """
         Initializes the Scorer.
 
@@ -12,11 +21,71 @@ class Scorer:
             The index to score the documents with.
         number_of_documents : int
             The number of documents in the index.
+        document_frequencies : dict, optional
+            The document frequency of every term. Defaults to the lengths of the postings.
+            A shard of a larger index passes the frequencies of the whole index here (together
+            with the whole number_of_documents) so that its scores match an unsharded index.
+        collection_frequencies : dict, optional
+            The collection frequency of every term, for the unigram model. Defaults to the sums
+            of the postings.
         """
 
         self.index = index
-        self.idf = {}
         self.N = number_of_documents
+        if document_frequencies is None:
+            document_frequencies = {
+                term: len(postings) for term, postings in self.index.items() if postings
+            }
+        self.document_frequencies = document_frequencies
+        self.idf = {
+            term: np.log(self.N / df)
+            for term, df in self.document_frequencies.items()
+            if df
+        }
+        if collection_frequencies is None:
+            self.collection_frequencies, self.collection_length = self.get_collection_statistics()
+        else:
+            self.collection_frequencies = collection_frequencies
+            self.collection_length = sum(collection_frequencies.values())
+
+    def get_collection_statistics(self):
+        """
+        Computes the collection frequency of every term and the total number of tokens in the index.
+
+        Returns
+        -------
+        dict
+            A dictionary of the collection frequencies. The keys are the terms, and the values are
+            the number of times the term occurs in the whole collection.
+        int
+            The total number of tokens in the collection.
+
+        Note
+        -------
+            This is done once per index so the unigram model never rescans the postings to find
+            the collection probability of a query term.
+        """
+        collection_frequencies = {}
+        for term, postings in self.index.items():
+            collection_frequencies[term] = sum(postings.values())
+        collection_length = sum(collection_frequencies.values())
+        return collection_frequencies, collection_length
+
+    def get_document_frequency(self, term):
+        """
+        Returns the number of documents that contain a term.
+
+        Parameters
+        ----------
+        term : str
+            The term to get the document frequency for.
+
+        Returns
+        -------
+        int
+            The document frequency of the term, 0 if no document contains it.
+        """
+        return self.document_frequencies.get(term, 0)
 
     def get_list_of_documents(self, query):
         """
@@ -24,8 +93,8 @@ class Scorer:
 
         Parameters
         ----------
-        query: List[str]
-            The query to be scored
+        query: List[str] | dict
+            The query to be scored, or its term frequencies
 
         Returns
         -------
@@ -44,15 +113,10 @@ class Scorer:
         for term in query:
             if term in self.index.keys():
                 list_of_documents.extend(self.index[term].keys())
-<<<<<<< HEAD:Logic/core/scorer.py
         
         result = list(set(list_of_documents))
         return result
     
-=======
-        return list(set(list_of_documents))
-
->>>>>>> template/main:Logic/core/utility/scorer.py
     def get_idf(self, term):
         """
         Returns the inverse document frequency of a term.
@@ -69,21 +133,50 @@ class Scorer:
 
         Note
         -------
-            It was better to store dfs in a separate dict in preprocessing.
+            The idfs of all the terms in the index are computed when the scorer is built, so
+            scoring never writes to the scorer and one scorer can serve many threads.
         """
         idf = self.idf.get(term, None)
         if idf is None:
-<<<<<<< HEAD:Logic/core/scorer.py
             N = self.N
-            df = len(self.index.get(term, {}))
+            df = self.get_document_frequency(term)
             idf = np.log(N / df)
-            self.idf[term] = idf 
-        return idf    
-=======
-            # TODO
-            pass
         return idf
->>>>>>> template/main:Logic/core/utility/scorer.py
+
+    def get_term_frequency_matrix(self, terms, document_ids):
+        """
+        Gathers the tfs of some terms in some documents into a dense matrix.
+
+        Parameters
+        ----------
+        terms : list of str
+            The terms (rows of the matrix).
+        document_ids : list
+            The documents (columns of the matrix).
+
+        Returns
+        -------
+        numpy.ndarray
+            A matrix of shape (len(terms), len(document_ids)) holding the tf of each term in each
+            document, 0 where the document does not contain the term.
+        """
+        positions = {doc_id: i for i, doc_id in enumerate(document_ids)}
+        tfs = np.zeros((len(terms), len(document_ids)))
+        for row, term in enumerate(terms):
+            postings = self.index.get(term, {})
+            if len(postings) <= len(positions):
+                for doc_id, tf in postings.items():
+                    position = positions.get(doc_id)
+                    if position is not None:
+                        tfs[row, position] = tf
+            else:
+                # a few documents (e.g. one tier of a tiered index) are looked up instead of
+                # walking the whole postings list
+                for doc_id, position in positions.items():
+                    tf = postings.get(doc_id)
+                    if tf is not None:
+                        tfs[row, position] = tf
+        return tfs
 
     def get_query_tfs(self, query):
         """
@@ -91,50 +184,77 @@ class Scorer:
 
         Parameters
         ----------
-        query : List[str]
-            The query to get the term frequencies for.
+        query : List[str] | dict
+            The query to get the term frequencies for. A dictionary of term frequencies
+            (as produced by QueryAnalyzer) is returned as is.
 
         Returns
         -------
         dict
             A dictionary of the term frequencies of the terms in the query.
         """
-<<<<<<< HEAD:Logic/core/scorer.py
-        
+        if isinstance(query, dict):
+            return query
+
         terms_tfs = {}
         for term in query:
             term = term.lower()
             terms_tfs[term] = terms_tfs.get(term, 0) + 1
         return terms_tfs
-=======
->>>>>>> template/main:Logic/core/utility/scorer.py
 
-        # TODO
-
-    def compute_scores_with_vector_space_model(self, query, method):
+    def compute_scores_with_vector_space_model(self, query, method, document_ids=None):
         """
         compute scores with vector space model
 
         Parameters
         ----------
-        query: List[str]
-            The query to be scored
+        query: List[str] | dict
+            The query to be scored, or its term frequencies
         method : str ((n|l)(n|t)(n|c).(n|l)(n|t)(n|c))
             The method to use for searching.
+        document_ids : list, optional
+            The documents to score. Defaults to the documents that contain at least one of the
+            terms in the query.
 
         Returns
         -------
         dict
             A dictionary of the document IDs and their scores.
         """
-        vect_scores = {}
         query_tfs = self.get_query_tfs(query)
         doc_search_method, query_search_method = method.split('.')
-        list_docs = self.get_list_of_documents(query)
-        for doc_id in list_docs:
-            vect_scores[doc_id] = self.get_vector_space_model_score(query, query_tfs, doc_id, doc_search_method, query_search_method)
-        return vect_scores
-        pass
+        list_docs = document_ids
+        if list_docs is None:
+            list_docs = self.get_list_of_documents(query)
+
+        # same weighting as get_vector_space_model_score, for all the documents at once
+        doc_tf_method, doc_idf_method, doc_norm_method = doc_search_method
+        query_tf_method, query_idf_method, query_norm_method = query_search_method
+        terms = [term for term in query_tfs if self.get_document_frequency(term) > 0]
+        idfs = np.array([self.get_idf(term) for term in terms], dtype=float)
+
+        query_vector = np.array([query_tfs[term] for term in terms], dtype=float)
+        if query_tf_method == 'l':
+            query_vector = np.log(query_vector) + 1
+        if query_idf_method == 't':
+            query_vector = query_vector * idfs
+        if query_norm_method == 'c':
+            query_vector = query_vector / np.linalg.norm(query_vector)
+
+        doc_vectors = self.get_term_frequency_matrix(terms, list_docs)
+        if doc_tf_method == 'l':
+            nonzero = doc_vectors > 0
+            doc_vectors[nonzero] = np.log(doc_vectors[nonzero]) + 1
+        if doc_idf_method == 't':
+            doc_vectors = doc_vectors * idfs[:, None]
+        if doc_norm_method == 'c':
+            doc_norms = np.linalg.norm(doc_vectors, axis=0)
+            doc_vectors = np.divide(
+                doc_vectors, doc_norms, out=np.zeros_like(doc_vectors), where=doc_norms > 0
+            )
+
+        scores = query_vector @ doc_vectors
+        return dict(zip(list_docs, scores.tolist()))
 
     def get_vector_space_model_score(
         self, query, query_tfs, document_id, document_method, query_method
@@ -144,8 +264,8 @@ class Scorer:
 
         Parameters
         ----------
-        query: List[str]
-            The query to be scored
+        query: List[str] | dict
+            The query to be scored, or its term frequencies
         query_tfs : dict
             The term frequencies of the terms in the query.
         document_id : str
@@ -160,18 +280,16 @@ class Scorer:
         float
             The Vector Space Model score of the document for the query.
         """
-        terms = []
-        [terms.append(term) for term in query if term not in terms]
-        
+        terms = query_tfs.keys()
+
         query_vactor = []
         doc_vector = []
 
-<<<<<<< HEAD:Logic/core/scorer.py
         doc_tf_method, doc_idf_method, doc_norm_method = document_method
         query_tf_method, query_idf_method, query_norm_method = query_method
         
         for term in terms:
-            if term in self.index:
+            if self.get_document_frequency(term) > 0:
 
                 query_s = 0
                 tf = query_tfs[term]
@@ -189,7 +307,7 @@ class Scorer:
                 
 
                 doc_s = 0
-                doc_tf = self.index[term].get(document_id, 0)
+                doc_tf = self.index.get(term, {}).get(document_id, 0)
                 if doc_tf_method == 'l':
                     if doc_tf == 0:
                         doc_s = 0
@@ -213,26 +331,25 @@ class Scorer:
             doc_vector = list(doc_vect / doc_norm)
 
         return np.dot(np.array(query_vactor), np.array(doc_vector))
-=======
-        # TODO
->>>>>>> template/main:Logic/core/utility/scorer.py
-        pass
 
     def compute_socres_with_okapi_bm25(
-        self, query, average_document_field_length, document_lengths
+        self, query, average_document_field_length, document_lengths, document_ids=None
     ):
         """
         compute scores with okapi bm25
 
         Parameters
         ----------
-        query: List[str]
-            The query to be scored
+        query: List[str] | dict
+            The query to be scored, or its term frequencies
         average_document_field_length : float
             The average length of the documents in the index.
         document_lengths : dict
             A dictionary of the document lengths. The keys are the document IDs, and the values are
             the document's length in that field.
+        document_ids : list, optional
+            The documents to score. Defaults to the documents that contain at least one of the
+            terms in the query.
 
         Returns
         -------
@@ -240,11 +357,26 @@ class Scorer:
             A dictionary of the document IDs and their scores.
         """
 
-        doc_scores = {}
-        list_of_doc_ids = self.get_list_of_documents(query) 
-        for doc_id in list_of_doc_ids:
-            doc_scores[doc_id] = self.get_okapi_bm25_score(query, doc_id, average_document_field_length, document_lengths)
-        return doc_scores
+        list_of_doc_ids = document_ids
+        if list_of_doc_ids is None:
+            list_of_doc_ids = self.get_list_of_documents(query)
+
+        # same formula as get_okapi_bm25_score, for all the documents at once
+        query_tfs = self.get_query_tfs(query)
+        terms = [term for term in query_tfs if self.index.get(term)]
+        tfs = self.get_term_frequency_matrix(terms, list_of_doc_ids)
+        doc_lengths = np.array(
+            [document_lengths.get(doc_id, 0) for doc_id in list_of_doc_ids], dtype=float
+        )
+        B = (1 - self.b) + (self.b * doc_lengths / average_document_field_length)
+
+        scores = np.zeros(len(list_of_doc_ids))
+        for row, term in enumerate(terms):
+            df = self.get_document_frequency(term)
+            okapi_tf = ((self.k1 + 1) * tfs[row]) / (self.k1 * B + tfs[row])
+            okapi_idf = np.log(((self.N - df + 0.5) / (df + 0.5)) + 1)
+            scores += query_tfs[term] * okapi_idf * okapi_tf
+        return dict(zip(list_of_doc_ids, scores.tolist()))
 
     def get_okapi_bm25_score(
         self, query, document_id, average_document_field_length, document_lengths
@@ -254,8 +386,8 @@ class Scorer:
 
         Parameters
         ----------
-        query: List[str]
-            The query to be scored
+        query: List[str] | dict
+            The query to be scored, or its term frequencies
         document_id : str
             The document to calculate the score for.
         average_document_field_length : float
@@ -269,39 +401,113 @@ class Scorer:
         float
             The Okapi BM25 score of the document for the query.
         """
-        k1 = 1.5
-        b = 0.75
+        k1 = self.k1
+        b = self.b
         okapi_bm25_score = 0.0
 
-<<<<<<< HEAD:Logic/core/scorer.py
         dl = document_lengths.get(document_id, 0)
-        for term in query:
-            df = len(self.index.get(term, {}))
+        for term, query_tf in self.get_query_tfs(query).items():
+            df = self.get_document_frequency(term)
             
             if df == 0:
                 continue
 
-            term_docs = self.index[term]
+            term_docs = self.index.get(term, {})
             tf = term_docs.get(document_id, 0)
             B = (1 - b) + (b * dl/average_document_field_length)
             okapi_tf = ((k1 + 1) * tf) / (k1 * B + tf)
             okapi_idf = np.log(((self.N - df + 0.5) / (df + 0.5)) + 1)
-            okapi_bm25_score += okapi_idf * okapi_tf
+            okapi_bm25_score += query_tf * okapi_idf * okapi_tf
         
         return okapi_bm25_score
-=======
-        # TODO
-        pass
+
+    def get_score_upper_bound(self, query, max_tfs, method):
+        """
+        Returns an upper bound on the score of any document whose tf for each query term is at
+        most the given maximum. It is used to decide when the lower tiers of a tiered index can
+        no longer change the top results.
+
+        Parameters
+        ----------
+        query: List[str] | dict
+            The query to be scored, or its term frequencies
+        max_tfs : dict
+            The largest tf a document can still have for each query term. Missing terms count as 0.
+        method : str ((n|l)(n|t)(n|c).(n|l)(n|t)(n|c)) | OkapiBM25
+            The method used for scoring.
+
+        Returns
+        -------
+        float
+            The upper bound.
+        """
+        query_tfs = self.get_query_tfs(query)
+
+        if method == "OkapiBM25":
+            # the document length only appears in the denominator, so an empty document is the best case
+            bound = 0.0
+            for term, query_tf in query_tfs.items():
+                df = self.get_document_frequency(term)
+                tf = max_tfs.get(term, 0)
+                if df == 0 or tf == 0:
+                    continue
+                okapi_tf = ((self.k1 + 1) * tf) / (self.k1 * (1 - self.b) + tf)
+                okapi_idf = np.log(((self.N - df + 0.5) / (df + 0.5)) + 1)
+                bound += query_tf * okapi_idf * okapi_tf
+            return bound
+
+        document_method, query_method = method.split('.')
+        doc_tf_method, doc_idf_method, doc_norm_method = document_method
+        query_tf_method, query_idf_method, query_norm_method = query_method
+
+        query_vector = []
+        doc_vector = []
+        for term, query_tf in query_tfs.items():
+            if self.get_document_frequency(term) == 0:
+                continue
+            idf = self.get_idf(term)
+
+            query_s = np.log(query_tf) + 1 if query_tf_method == 'l' else query_tf
+            if query_idf_method == 't':
+                query_s = query_s * idf
+            query_vector.append(query_s)
+
+            doc_tf = max_tfs.get(term, 0)
+            if doc_tf == 0:
+                doc_s = 0
+            else:
+                doc_s = np.log(doc_tf) + 1 if doc_tf_method == 'l' else doc_tf
+            if doc_idf_method == 't':
+                doc_s = doc_s * idf
+            doc_vector.append(doc_s)
+
+        query_vector = np.array(query_vector, dtype=float)
+        doc_vector = np.array(doc_vector, dtype=float)
+        if query_norm_method == 'c' and query_vector.any():
+            query_vector = query_vector / np.linalg.norm(query_vector)
+
+        if doc_norm_method == 'c':
+            # a unit document vector can at most line up with the query vector
+            if not doc_vector.any():
+                return 0.0
+            return float(np.linalg.norm(query_vector))
+        return float(np.dot(query_vector, doc_vector))
 
     def compute_scores_with_unigram_model(
-        self, query, smoothing_method, document_lengths=None, alpha=0.5, lamda=0.5
+        self,
+        query,
+        smoothing_method,
+        document_lengths=None,
+        alpha=0.5,
+        lamda=0.5,
+        document_ids=None,
     ):
         """
         Calculates the scores for each document based on the unigram model.
 
         Parameters
         ----------
-        query : str
+        query : List[str] | dict
             The query to search for.
         smoothing_method : str (bayes | naive | mixture)
             The method used for smoothing the probabilities in the unigram model.
@@ -313,15 +519,27 @@ class Scorer:
         lamda : float, optional
             The parameter used in some smoothing methods to balance between the document
             probability and the collection probability. Defaults to 0.5.
+        document_ids : list, optional
+            The documents to score. Defaults to the documents that contain at least one of the
+            terms in the query. Documents without any query term get their score from their
+            length and the collection probabilities alone, without touching the postings.
 
         Returns
         -------
-        float
-            A dictionary of the document IDs and their scores.
+        dict
+            A dictionary of the document IDs and their log-likelihood scores. It is empty if no
+            query term occurs in the collection, since every document would then score the same.
         """
+        query_tfs = self.get_query_tfs(query)
+        if not any(self.collection_frequencies.get(term, 0) > 0 for term in query_tfs):
+            return {}
+        if document_ids is None:
+            document_ids = self.get_list_of_documents(query)
+        log_likelihoods = self.get_unigram_log_likelihoods(
+            query, document_ids, smoothing_method, document_lengths, alpha, lamda
+        )
 
-        # TODO
-        pass
+        return dict(zip(document_ids, log_likelihoods.tolist()))
 
     def compute_score_with_unigram_model(
         self, query, document_id, smoothing_method, document_lengths, alpha, lamda
@@ -331,7 +549,7 @@ class Scorer:
 
         Parameters
         ----------
-        query : str
+        query : List[str] | dict
             The query to search for.
         document_id : str
             The document to calculate the score for.
@@ -351,7 +569,91 @@ class Scorer:
         float
             The Unigram score of the document for the query.
         """
+        log_likelihoods = self.get_unigram_log_likelihoods(
+            query, [document_id], smoothing_method, document_lengths, alpha, lamda
+        )
+        return float(log_likelihoods[0])
 
-        # TODO
-        pass
->>>>>>> template/main:Logic/core/utility/scorer.py
+    def get_unigram_log_likelihoods(
+        self, query, document_ids, smoothing_method, document_lengths, alpha, lamda
+    ):
+        """
+        Calculates the log-likelihood of the query for a batch of documents at once.
+
+        Parameters
+        ----------
+        query : List[str] | dict
+            The query to search for.
+        document_ids : list
+            The documents to calculate the scores for.
+        smoothing_method : str (bayes | naive | mixture)
+            The method used for smoothing the probabilities in the unigram model.
+        document_lengths : dict
+            A dictionary of the document lengths. The keys are the document IDs, and the values are
+            the document's length in that field.
+        alpha : float
+            The parameter used in bayesian smoothing method.
+        lamda : float
+            The parameter used in some smoothing methods to balance between the document
+            probability and the collection probability.
+
+        Returns
+        -------
+        numpy.ndarray
+            The log-likelihoods, aligned with document_ids.
+
+        Note
+        -------
+            Query terms that never occur in the collection are skipped: they would multiply every
+            document's likelihood by the same factor (or by zero) and do not change the ranking.
+
+            With naive smoothing a term a document does not contain has no probability, so it
+            costs a fixed penalty instead: the number of query terms times the log of
+            1 / (collection length + 1). A real match costs at least log(1 / document length)
+            per term, so a document that misses fewer query terms always scores higher, and the
+            penalty only depends on collection statistics (which shards share).
+        """
+        if smoothing_method not in ("naive", "bayes", "mixture"):
+            raise ValueError(f"Invalid smoothing method: {smoothing_method}")
+        if document_lengths is None:
+            document_lengths = {}
+
+        doc_lengths = np.array(
+            [document_lengths.get(doc_id, 0) for doc_id in document_ids], dtype=float
+        )
+        log_likelihoods = np.zeros(len(document_ids))
+
+        query_tfs = self.get_query_tfs(query)
+        terms = [term for term in query_tfs if self.collection_frequencies.get(term, 0) > 0]
+        tf_matrix = self.get_term_frequency_matrix(terms, document_ids)
+        missing_log_probability = sum(query_tfs[term] for term in terms) * np.log(
+            1 / (self.collection_length + 1)
+        )
+
+        for term, tfs in zip(terms, tf_matrix):
+            query_tf = query_tfs[term]
+            collection_probability = self.collection_frequencies[term] / self.collection_length
+
+            mle = np.divide(
+                tfs, doc_lengths, out=np.zeros_like(tfs), where=doc_lengths > 0
+            )
+            if smoothing_method == "naive":
+                probabilities = mle
+            elif smoothing_method == "bayes":
+                smoothed_lengths = doc_lengths + alpha
+                probabilities = np.divide(
+                    tfs + alpha * collection_probability,
+                    smoothed_lengths,
+                    out=np.zeros_like(tfs),
+                    where=smoothed_lengths > 0,
+                )
+            else:
+                probabilities = lamda * mle + (1 - lamda) * collection_probability
+
+            with np.errstate(divide="ignore"):
+                log_probabilities = np.log(probabilities)
+            if smoothing_method == "naive":
+                log_probabilities[probabilities == 0] = missing_log_probability
+            log_likelihoods += query_tf * log_probabilities
+
+        return log_likelihoods
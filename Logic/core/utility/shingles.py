@@ -0,0 +1,183 @@
+import numpy as np
+
+# up to three characters are packed exactly into one integer, 21 bits (a code point) each
+CODE_POINT_BITS = 21
+# longer shingles are hashed with a polynomial hash modulo 2 ** 64
+HASH_MULTIPLIER = np.uint64(1099511628211)
+# below this many values in total, two arrays are merged in Python, which is cheaper than a NumPy call
+MERGE_SIZE = 32
+
+
+def get_window_hashes(codes, k):
+    """
+    Returns the hash of every run of k consecutive code points.
+
+    Parameters
+    ----------
+    codes : np.ndarray
+        The code points.
+    k : int
+        The size of each shingle.
+
+    Returns
+    -------
+    np.ndarray
+        The int64 hashes of the shingles starting at each position with a whole shingle.
+    """
+    count = len(codes) - k + 1
+    if count <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k * CODE_POINT_BITS < 64:
+        hashes = np.zeros(count, dtype=np.int64)
+        for i in range(k):
+            hashes = (hashes << CODE_POINT_BITS) | codes[i : i + count]
+        return hashes
+    hashes = np.zeros(count, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for i in range(k):
+            hashes = hashes * HASH_MULTIPLIER + codes[i : i + count].astype(np.uint64)
+    return hashes.view(np.int64)
+
+
+def hash_shingles(text, k=2):
+    """
+    Converts a text into its shingles, hashed to integers.
+
+    Parameters
+    ----------
+    text : str
+        The text.
+    k : int
+        The size of each shingle, in characters.
+
+    Returns
+    -------
+    np.ndarray
+        The sorted, distinct int64 hashes of the shingles. Shingles of up to three characters
+        are packed exactly, so two shingles never share a hash.
+    """
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    return np.unique(get_window_hashes(codes, k))
+
+
+def count_common(first, second):
+    """
+    Counts the values two sorted arrays of distinct values have in common, without building
+    sets: short arrays (the shingles of words) are merged, and for long ones (the shingles of
+    documents) the values of the shorter array are binary searched in the longer one.
+    """
+    if len(first) + len(second) < MERGE_SIZE:
+        first, second = first.tolist(), second.tolist()
+        i = j = common = 0
+        while i < len(first) and j < len(second):
+            if first[i] < second[j]:
+                i += 1
+            elif first[i] > second[j]:
+                j += 1
+            else:
+                common += 1
+                i += 1
+                j += 1
+        return common
+    if len(first) > len(second):
+        first, second = second, first
+    if len(first) == 0:
+        return 0
+    positions = np.searchsorted(second, first)
+    positions[positions == len(second)] = 0
+    return int(np.count_nonzero(second[positions] == first))
+
+
+def jaccard_of_arrays(first, second):
+    """
+    Calculates the jaccard score of two sorted arrays of distinct shingle hashes.
+    """
+    intersection = count_common(first, second)
+    union = len(first) + len(second) - intersection
+    if union != 0:
+        return intersection / union
+    return 0.0
+
+
+class ShingleArrays:
+    def __init__(self, values, offsets):
+        """
+        The shingles of many texts in one buffer: the sorted, distinct hashes of text i are
+        values[offsets[i]:offsets[i + 1]].
+
+        Parameters
+        ----------
+        values : np.ndarray
+            The int64 shingle hashes of all the texts, one text after another.
+        offsets : np.ndarray
+            The int64 start of every text in `values`, and the end of the last one.
+        """
+        self.values = values
+        self.offsets = offsets
+
+    @classmethod
+    def from_texts(cls, texts, k=2):
+        """
+        Shingles many texts at once.
+
+        Parameters
+        ----------
+        texts : list of str
+            The texts.
+        k : int
+            The size of each shingle, in characters.
+
+        Returns
+        -------
+        ShingleArrays
+            The shingles of every text, in the order of the texts.
+
+        Note
+        -------
+            All the texts are hashed as one array of code points. Windows that cross from one
+            text into the next are dropped, then the hashes are sorted by text and value and
+            the repeated ones are removed, with no Python work per shingle. Short shingles are
+            sorted as one integer key holding the text id above the hash.
+        """
+        lengths = np.array([len(text) for text in texts], dtype=np.int64)
+        codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+        hashes = get_window_hashes(codes, k)
+        text_ids = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)[: len(hashes)]
+        ends = np.cumsum(lengths)
+        keep = np.arange(len(hashes)) + k <= ends[text_ids] if len(hashes) else np.zeros(0, dtype=bool)
+        hashes, text_ids = hashes[keep], text_ids[keep]
+
+        hash_bits = k * CODE_POINT_BITS
+        if hash_bits + max(len(texts) - 1, 1).bit_length() < 64:
+            # the exact hashes leave room for the text id in the same integer, and one sort of
+            # the combined keys is several times faster than sorting by two keys
+            keys = np.unique((text_ids << hash_bits) | hashes)
+            text_ids, hashes = keys >> hash_bits, keys & ((1 << hash_bits) - 1)
+        else:
+            order = np.lexsort((hashes, text_ids))
+            hashes, text_ids = hashes[order], text_ids[order]
+            distinct = np.ones(len(hashes), dtype=bool)
+            distinct[1:] = (hashes[1:] != hashes[:-1]) | (text_ids[1:] != text_ids[:-1])
+            hashes, text_ids = hashes[distinct], text_ids[distinct]
+
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(text_ids, minlength=len(texts)), out=offsets[1:])
+        return cls(hashes, offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.values[self.offsets[i] : self.offsets[i + 1]]
+
+    def get_sizes(self):
+        """
+        Returns the number of distinct shingles of every text.
+        """
+        return np.diff(self.offsets)
+
+    def get_nbytes(self):
+        """
+        Returns the memory the shingles take, in bytes.
+        """
+        return self.values.nbytes + self.offsets.nbytes
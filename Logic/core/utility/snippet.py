@@ -1,5 +1,43 @@
+import re
+import numpy as np
+
+from .preprocess import Preprocessor, load_stopwords
+
+TOKEN_PATTERN = re.compile(r'\S+')
+
+
+def get_snippet_document(text, analyzer):
+    """
+    Tokenizes a text once for `Snippet`: the offsets of its words and where each term occurs.
+
+    Parameters
+    ----------
+    text : str
+        The text, e.g. the first page summary of a movie.
+    analyzer : Analyzer
+        The analyzer the words are matched by, e.g. `Preprocessor.analyzer`, so that a word
+        matches a query word with the same stem.
+
+    Returns
+    -------
+    dict
+        The text, the start and end of every word one after another in `offsets`, and the
+        positions of the words of every term in `positions`.
+    """
+    offsets = []
+    words = []
+    for match in TOKEN_PATTERN.finditer(text):
+        offsets.extend(match.span())
+        words.append(match.group())
+    positions = {}
+    for i, term in enumerate(analyzer.analyze_words(words)):
+        if term:
+            positions.setdefault(term, []).append(i)
+    return {'text': text, 'offsets': offsets, 'positions': positions}
+
+
 class Snippet:
-    def __init__(self, number_of_words_on_each_side=5):
+    def __init__(self, number_of_words_on_each_side=5, snippet_index=None, preprocessor=None, idfs=None):
         """
         Initialize the Snippet
 
@@ -7,8 +45,23 @@ class Snippet:
         ----------
         number_of_words_on_each_side : int
             The number of words on each side of the query word in the doc to be presented in the snippet.
+        snippet_index : dict, optional
+            The tokenized documents by ID (see `Snippet_index`). A document that is in it is not
+            tokenized again when its snippet is made.
+        preprocessor : Preprocessor, optional
+            The preprocessor the summaries are indexed with. The words of the doc and the query
+            are matched by their preprocessed terms, so a highlighted word is one the search
+            matched. Defaults to a new `Preprocessor`.
+        idfs : dict, optional
+            The idf of every term, e.g. `Scorer.idf` of the summaries. Terms that are not in it
+            get the largest idf. If None, every term weighs the same.
         """
         self.number_of_words_on_each_side = number_of_words_on_each_side
+        self.snippet_index = snippet_index if snippet_index is not None else {}
+        self.preprocessor = preprocessor if preprocessor is not None else Preprocessor([])
+        self.idfs = idfs if idfs is not None else {}
+        self.default_idf = max(self.idfs.values(), default=1.0)
+        self.stop_words = load_stopwords()
 
     def remove_stop_words_from_query(self, query):
         """
@@ -24,20 +77,159 @@ class Snippet:
         str
             The query without stop words.
         """
-
-        with open('stopwords.txt', 'r') as f:
-            stop_words = set(f.read().split())
-        
         query_words = query.split()
         modified_query = []
         for word in query_words:
-            if word.lower() not in stop_words:
+            if word.lower() not in self.stop_words:
                 modified_query.append(word)
 
         final_query = ' '.join(modified_query)
         return final_query
 
-    def find_snippet(self, doc, query):
+    def get_query_terms(self, query):
+        """
+        Preprocesses the words of a query one by one.
+
+        Returns
+        -------
+        list
+            Tuples of every query word that is not a stopword and its term ('' if the
+            preprocessor drops it).
+        """
+        words = self.remove_stop_words_from_query(query).split()
+        return list(zip(words, self.preprocessor.analyzer.analyze_words(words)))
+
+    def get_document(self, doc, doc_id, terms):
+        """
+        Returns the words of a doc and the positions of some terms in it.
+
+        Returns
+        -------
+        tuple
+            The number of words, a function from a position to its word and the positions of
+            each of the terms that occur in the doc.
+        """
+        document = self.snippet_index.get(doc_id) if doc_id is not None else None
+        if document is not None:
+            text, offsets = document['text'], document['offsets']
+            positions = {term: document['positions'][term] for term in terms if term in document['positions']}
+            return len(offsets) // 2, lambda i: text[offsets[2 * i] : offsets[2 * i + 1]], positions
+        words = doc.split()
+        wanted = set(terms)
+        positions = {}
+        for i, term in enumerate(self.preprocessor.analyzer.analyze_words(words)):
+            if term in wanted:
+                positions.setdefault(term, []).append(i)
+        return len(words), words.__getitem__, positions
+
+    def find_best_passages(self, lengths, term_positions, idfs):
+        """
+        Finds the best passage of `2 * number_of_words_on_each_side + 1` words of every doc of a
+        batch at once.
+
+        Parameters
+        ----------
+        lengths : list of int
+            The number of words of every doc.
+        term_positions : list of dict
+            The positions of every query term (by its index in `idfs`) in every doc.
+        idfs : np.ndarray
+            The idf of every query term.
+
+        Returns
+        -------
+        list of int
+            The first word of the best passage of every doc.
+
+        Note
+        -------
+            The words of all the docs are laid one after another, and a running count of every
+            query term turns the occurrences of a term in any passage into one subtraction, so
+            every passage of every doc is scored at once in O(number of words * query terms).
+            Passages are compared by the number of distinct query terms they contain, then by
+            the idfs of those terms, then by the idfs of all their occurrences (the density of
+            rare terms), then by how centered the occurrences are, and then by which comes first.
+        """
+        width = 2 * self.number_of_words_on_each_side + 1
+        lengths = np.asarray(lengths, dtype=np.int64)
+        doc_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        total_length = int(lengths.sum())
+
+        occurrences = np.zeros((len(idfs), total_length + 1), dtype=np.int32)
+        for doc, positions in enumerate(term_positions):
+            for term, term_positions_in_doc in positions.items():
+                occurrences[term, doc_starts[doc] + np.asarray(term_positions_in_doc) + 1] = 1
+        running_counts = np.cumsum(occurrences, axis=1)
+        running_positions = np.cumsum(occurrences.sum(axis=0) * np.arange(-1, total_length))
+
+        # every doc has max(length - width, 0) + 1 passages; a short doc is a single passage
+        passage_counts = np.maximum(lengths - width, 0) + 1
+        passage_docs = np.repeat(np.arange(len(lengths)), passage_counts)
+        first_passages = np.concatenate(([0], np.cumsum(passage_counts)[:-1]))
+        local_starts = np.arange(len(passage_docs)) - first_passages[passage_docs]
+        starts = doc_starts[passage_docs] + local_starts
+        ends = np.minimum(starts + width, doc_starts[passage_docs] + lengths[passage_docs])
+
+        counts = running_counts[:, ends] - running_counts[:, starts]
+        covered = counts > 0
+        coverage = covered.sum(axis=0)
+        # summed term by term (not with a matrix product) so that ties are exact in any batch
+        covered_idf = (idfs[:, None] * covered).sum(axis=0)
+        density = (idfs[:, None] * counts).sum(axis=0)
+        # how far the middle of the occurrences is from the middle of the passage, from the
+        # positions within the passage so that a doc gets the same passage in any batch
+        total_counts = counts.sum(axis=0)
+        local_positions = running_positions[ends] - running_positions[starts] - starts * total_counts
+        offsets = np.abs(2 * local_positions - (ends - starts - 1) * total_counts) / np.maximum(total_counts, 1)
+        # lexsort sorts by the last key first
+        order = np.lexsort((local_starts, offsets, -density, -covered_idf, -coverage, passage_docs))
+        _, best = np.unique(passage_docs[order], return_index=True)
+        return local_starts[order[best]].tolist()
+
+    def find_snippets(self, docs, query):
+        """
+        Finds the snippets of a batch of docs (e.g. the top results of a search) for a query.
+
+        Parameters
+        ----------
+        docs : list
+            Tuples of every doc and its ID (None if it is not in the snippet index).
+        query : str
+            The query which the snippets should be extracted based on that.
+
+        Returns
+        -------
+        list
+            The snippet and the missing query words of every doc, as `find_snippet` returns them.
+        """
+        query_terms = self.get_query_terms(query)
+        terms = list(dict.fromkeys(term for _, term in query_terms if term))
+        term_ids = {term: i for i, term in enumerate(terms)}
+        idfs = np.array([self.idfs.get(term, self.default_idf) for term in terms], dtype=np.float64)
+
+        documents = [self.get_document(doc, doc_id, terms) for doc, doc_id in docs]
+        starts = [0] * len(documents)
+        if terms and documents:
+            starts = self.find_best_passages(
+                [length for length, _, _ in documents],
+                [{term_ids[term]: positions[term] for term in positions} for _, _, positions in documents],
+                idfs,
+            )
+
+        width = 2 * self.number_of_words_on_each_side + 1
+        results = []
+        for (length, get_word, positions), start in zip(documents, starts):
+            not_exist_words = [word for word, term in query_terms if term and term not in positions]
+            highlighted = {position for term_positions in positions.values() for position in term_positions}
+            end = min(start + width, length)
+            if not highlighted.intersection(range(start, end)):
+                results.append(('', not_exist_words))
+                continue
+            words = (f'***{get_word(i)}***' if i in highlighted else get_word(i) for i in range(start, end))
+            results.append((' '.join(words), not_exist_words))
+        return results
+
+    def find_snippet(self, doc, query, doc_id=None):
         """
         Find snippet in a doc based on a query.
 
@@ -47,6 +239,8 @@ class Snippet:
             The retrieved doc which the snippet should be extracted from that.
         query : str
             The query which the snippet should be extracted based on that.
+        doc_id : str, optional
+            The ID of the doc. If the snippet index has it, its stored offsets are used.
 
         Returns
         -------
@@ -55,48 +249,12 @@ class Snippet:
             For example: Sahwshank ***redemption*** is one of ... (for query: redemption)
         not_exist_words : list
             Words in the query which don't exist in the doc.
-        """
-        # TODO "..." OR " ... "
-        final_snippet = ""
-        not_exist_words = []
-
-        query_without_stop_words = self.remove_stop_words_from_query(query)
-        query_tokens = query_without_stop_words.split()
-
-        s_doc_words = doc.split()
-        lower_doc = doc.lower()
 
-        for token in query_tokens:
-            lower_token = token.lower()
-            if lower_token not in lower_doc:
-                not_exist_words.append(token)
-                continue
-            
-            doc_words = lower_doc.split()
-            index = None
-            for i, word in enumerate(s_doc_words):
-                if lower_token == word.lower():
-                    word_in_doc = word
-                    index = i
-                    break
-            
-            if index is not None:
-                start_index = max(0, index - self.number_of_words_on_each_side)
-                end_index = min(index + self.number_of_words_on_each_side + 1, len(doc_words))
-                
-                words_before = s_doc_words[start_index:index]
-                words_after = s_doc_words[index + 1:end_index]
-
-                if words_before:
-                    final_snippet +=  " " + " ".join(words_before)
-                final_snippet += " " + f'***{word_in_doc}***' + " "
-                if words_after:
-                    final_snippet += " ".join(words_after)
-            else:
-                not_exist_words.append(token)
-        
-        if final_snippet:
-            words = final_snippet.split()
-            final_snippet = " ... ".join(words)
-
-        return final_snippet, not_exist_words
\ No newline at end of file
+        Note
+        -------
+            The snippet is the one passage of 2 * `number_of_words_on_each_side` + 1 words with
+            the most query words, the rarest ones and the most of them (see
+            `find_best_passages`). A word matches a query word if the preprocessor gives both
+            the same term.
+        """
+        return self.find_snippets([(doc, doc_id)], query)[0]
@@ -1,18 +1,161 @@
+import os
+import math
+import numpy as np
+from collections.abc import Mapping
+from .shingles import ShingleArrays, hash_shingles, jaccard_of_arrays
+from .language_model import BigramLanguageModel
+
+
+class ShingledWords(Mapping):
+    def __init__(self, word_ids, word_shingles):
+        """
+        The shingles of a vocabulary by word, as views into the one buffer of `ShingleArrays`
+        instead of a set per word.
+
+        Parameters
+        ----------
+        word_ids : dict
+            The words and their positions in `word_shingles`.
+        word_shingles : ShingleArrays
+            The hashed shingles of every word.
+        """
+        self.word_ids = word_ids
+        self.word_shingles = word_shingles
+
+    def __getitem__(self, word):
+        return self.word_shingles[self.word_ids[word]]
+
+    def __contains__(self, word):
+        return word in self.word_ids
+
+    def __iter__(self):
+        return iter(self.word_ids)
+
+    def __len__(self):
+        return len(self.word_ids)
+
+
 class SpellCorrection:
-    def __init__(self, all_documents):
+    # the arrays `save` writes, each to its own .npy file
+    array_names = [
+        "words",
+        "counts",
+        "word_shingles",
+        "word_offsets",
+        "shingles",
+        "shingle_offsets",
+        "posting_word_ids",
+        "posting_sizes",
+    ]
+    # the arrays of the language model, written if there is one
+    language_model_array_names = ["bigram_keys", "bigram_counts"]
+
+    def __init__(self, all_documents, language_model=True):
         """
         Initialize the SpellCorrection
 
         Parameters
         ----------
-        all_documents : list of str
-            The input documents.
+        all_documents : iterable of str or list of str
+            The input documents, as texts or as lists of words (e.g. from
+            `Preprocessor.iter_preprocess`). They are read once.
+        language_model : bool
+            Whether to count the bigrams of the documents for `spell_check_in_context`.
+        """
+        token_ids = [] if language_model else None
+        self.all_shingled_words, self.word_counter, self.shingle_index = self.shingling_and_counting(
+            all_documents, token_ids
+        )
+        self.set_vocabulary()
+        self.language_model = None
+        if language_model:
+            counts = np.array([self.word_counter[word] for word in self.words], dtype=np.int64)
+            self.language_model = BigramLanguageModel.from_token_ids(token_ids, counts)
+
+    def set_vocabulary(self):
+        """
+        Sets the attributes that are derived from the shingled words.
         """
-        self.all_shingled_words, self.word_counter = self.shingling_and_counting(all_documents)
+        word_shingles = self.all_shingled_words.word_shingles
+        # the shingle index refers to the words by their position in `all_shingled_words`
+        self.words = list(self.all_shingled_words)
+        self.word_sizes = word_shingles.get_sizes()
+
+    def save(self, path):
+        """
+        Stores the vocabulary, the TFs, the shingles of the words and the shingle index in a
+        directory, so that they are built once and not from all the documents on every start.
+
+        Parameters
+        ----------
+        path : str
+            The directory, e.g. `indexes/spell_correction`.
+
+        Note
+        -------
+            Every array is its own .npy file, so `load` can memory-map them: the words as newline
+            separated UTF-8 bytes, their TFs, the hashed shingles of all the words with their
+            offsets, the posting lists of all the shingles one after another with the shingles
+            and their offsets, and the hash table of the bigram counts of the language model.
+        """
+        os.makedirs(path, exist_ok=True)
+        word_shingles = self.all_shingled_words.word_shingles
+        arrays = {
+            "words": np.frombuffer("\n".join(self.words).encode("utf-8"), dtype=np.uint8),
+            "counts": np.array([self.word_counter[word] for word in self.words], dtype=np.int64),
+            "word_shingles": word_shingles.values,
+            "word_offsets": word_shingles.offsets,
+            **self.shingle_index,
+        }
+        if self.language_model is not None:
+            arrays["bigram_keys"] = self.language_model.bigram_keys
+            arrays["bigram_counts"] = self.language_model.bigram_counts
+        for name in arrays:
+            np.save(os.path.join(path, name + ".npy"), np.asarray(arrays[name]))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a spell corrector stored by `save`.
+
+        Parameters
+        ----------
+        path : str
+            The directory.
+
+        Returns
+        -------
+        SpellCorrection
+            The spell corrector. Its arrays are memory-mapped; only the words and their TFs are
+            read into dictionaries. It has no language model if none was saved.
+        """
+        spell_correction = cls.__new__(cls)
+        names = cls.array_names
+        if os.path.exists(os.path.join(path, "bigram_keys.npy")):
+            names = names + cls.language_model_array_names
+        arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r") for name in names}
+
+        words = arrays["words"].tobytes().decode("utf-8")
+        words = words.split("\n") if words else []
+        spell_correction.word_counter = dict(zip(words, arrays["counts"].tolist()))
+        spell_correction.all_shingled_words = ShingledWords(
+            {word: word_id for word_id, word in enumerate(words)},
+            ShingleArrays(arrays["word_shingles"], arrays["word_offsets"]),
+        )
+        spell_correction.shingle_index = {
+            name: arrays[name] for name in ["shingles", "shingle_offsets", "posting_word_ids", "posting_sizes"]
+        }
+        spell_correction.set_vocabulary()
+        spell_correction.language_model = None
+        if "bigram_keys" in arrays:
+            spell_correction.language_model = BigramLanguageModel(
+                arrays["counts"], arrays["bigram_keys"], arrays["bigram_counts"]
+            )
+        return spell_correction
 
     def shingle_word(self, word, k=2):
         """
-        Convert a word into a set of shingles.
+        Convert a word into its shingles.
 
         Parameters
         ----------
@@ -23,72 +166,85 @@ class SpellCorrection:
 
         Returns
         -------
-        set
-            A set of shingles.
+        np.ndarray
+            The sorted hashes of the distinct shingles.
         """
-        shingles = set()
-        word_len = len(word)
-        for i in range(word_len - k + 1):
-            word_to_add = word[i : i + k] 
-            shingles.add(word_to_add)
+        return hash_shingles(word, k)
 
-        return shingles
-    
     def jaccard_score(self, first_set, second_set):
         """
         Calculate jaccard score.
 
         Parameters
         ----------
-        first_set : set
-            First set of shingles.
-        second_set : set
-            Second set of shingles.
+        first_set : np.ndarray
+            First (sorted) array of shingles.
+        second_set : np.ndarray
+            Second (sorted) array of shingles.
 
         Returns
         -------
         float
             Jaccard score.
         """
-        intersection = len(first_set.intersection(second_set))
-        union = len(first_set.union(second_set))
-
-        if union != 0:
-            return intersection / union
-        return 0.0
+        return jaccard_of_arrays(first_set, second_set)
 
-    def shingling_and_counting(self, all_documents):
+    def shingling_and_counting(self, all_documents, token_ids=None):
         """
         Shingle all words of the corpus and count TF of each word.
 
         Parameters
         ----------
-        all_documents : list of str
-            The input documents.
+        all_documents : iterable of str or list of str
+            The input documents, as texts or as lists of words.
+        token_ids : list, optional
+            If given, the ids of the words of every document (their positions in
+            `all_shingled_words`) are appended to it, with -1 after each document.
 
         Returns
         -------
-        all_shingled_words : dict
-            A dictionary from words to their shingle sets.
+        all_shingled_words : ShingledWords
+            The words and their hashed shingles.
         word_counter : dict
             A dictionary from words to their TFs.
+        shingle_index : dict
+            An inverted index from each shingle to the words that have it, as arrays: the sorted
+            `shingles`, and the posting lists of all of them one after another, from
+            `shingle_offsets[i]` to `shingle_offsets[i + 1]`, of the words that have them (their
+            positions in `all_shingled_words`) and their numbers of shingles, ordered by the
+            number of shingles.
         """
-        all_shingled_words = dict()
         word_counter = dict()
+        word_ids = dict()
         for document in all_documents:
-            words = document.split()
+            words = document.split() if isinstance(document, str) else document
             for word in words:
-                shingles = self.shingle_word(word)
-                all_shingled_words[word] = shingles
-                
                 if word in word_counter:
                     word_counter[word] += 1
                 else:
                     word_counter[word] = 1
+                    word_ids[word] = len(word_ids)
+            if token_ids is not None:
+                token_ids.extend(word_ids[word] for word in words)
+                token_ids.append(-1)
 
-        return all_shingled_words, word_counter
-    
-    def find_nearest_words(self, word):
+        words = list(word_counter)
+        word_shingles = ShingleArrays.from_texts(words)
+        sizes = word_shingles.get_sizes()
+        posting_word_ids = np.repeat(np.arange(len(words), dtype=np.int32), sizes)
+        posting_sizes = np.repeat(sizes.astype(np.int32), sizes)
+        order = np.lexsort((posting_word_ids, posting_sizes, word_shingles.values))
+        shingles, shingle_starts = np.unique(word_shingles.values[order], return_index=True)
+        shingle_index = {
+            "shingles": shingles,
+            "shingle_offsets": np.append(shingle_starts, len(order)).astype(np.int64),
+            "posting_word_ids": posting_word_ids[order],
+            "posting_sizes": posting_sizes[order],
+        }
+        all_shingled_words = ShingledWords(word_ids, word_shingles)
+        return all_shingled_words, word_counter, shingle_index
+
+    def find_nearest_words(self, word, max_words=5, min_jaccard=0.3):
         """
         Find correct form of a misspelled word.
 
@@ -96,26 +252,65 @@ class SpellCorrection:
         ----------
         word : stf
             The misspelled word.
+        max_words : int
+            The number of nearest words to return.
+        min_jaccard : float
+            The smallest Jaccard score of a nearest word.
 
         Returns
         -------
         list of str
             5 nearest words.
+
+        Note
+        -------
+            Only words that share shingles with the misspelled word are looked at, through the
+            shingle index. A word with q shingles can only reach `min_jaccard` (t) with words of
+            t * q to q / t shingles that share at least t * q of its shingles, so the posting
+            lists are only read over that range of sizes, the shared shingles of all the words
+            are counted at once from them, and the Jaccard score c / (q + s - c) of a word with
+            s shingles, c of them shared, is only computed for words that share enough.
         """
-        top5_candidates = list()
-        jaccard_scores = {}
         input_word_shingles = self.shingle_word(word)
-        
-        for curr_word, shingles in self.all_shingled_words.items():
-            if curr_word != word:
-                jaccard_scores[curr_word] = self.jaccard_score(input_word_shingles, shingles)
+        query_size = len(input_word_shingles)
+        if query_size == 0 or min_jaccard <= 0:
+            return []
+        min_size = math.ceil(min_jaccard * query_size)
+        max_size = math.floor(query_size / min_jaccard)
+        min_overlap = math.ceil(min_jaccard * query_size)
+
+        shingles = self.shingle_index["shingles"]
+        offsets = self.shingle_index["shingle_offsets"]
+        positions = np.searchsorted(shingles, input_word_shingles)
+        positions = positions[positions < len(shingles)]
+        positions = positions[np.isin(shingles[positions], input_word_shingles)]
+        postings = []
+        for start, end in zip(offsets[positions].tolist(), offsets[positions + 1].tolist()):
+            sizes = self.shingle_index["posting_sizes"][start:end]
+            first, last = np.searchsorted(sizes, [min_size, max_size + 1])
+            postings.append(self.shingle_index["posting_word_ids"][start + first : start + last])
+        if not postings:
+            return []
+        overlaps = np.bincount(np.concatenate(postings))
 
-        sorted_candidates = sorted(jaccard_scores.items(), key=lambda x: x[1], reverse=True)
-        candidates = sorted_candidates[:5]
-        for candidate, s in candidates:
-            top5_candidates.append(candidate)
+        candidates = np.flatnonzero(overlaps >= min_overlap)
+        overlaps = overlaps[candidates]
+        scores = overlaps / (query_size + self.word_sizes[candidates] - overlaps)
+        keep = scores >= min_jaccard
+        candidates, scores = candidates[keep], scores[keep]
+        if len(candidates) > max_words + 1:
+            # the words tied with the last nearest word are kept, so ties break by the word
+            kth_score = np.partition(scores, -(max_words + 1))[-(max_words + 1)]
+            keep = scores >= kth_score
+            candidates, scores = candidates[keep], scores[keep]
 
-        return top5_candidates
+        jaccard_scores = [
+            (self.words[candidate], score)
+            for candidate, score in zip(candidates.tolist(), scores.tolist())
+            if self.words[candidate] != word
+        ]
+        jaccard_scores.sort(key=lambda x: (-x[1], x[0]))
+        return [candidate for candidate, _ in jaccard_scores[:max_words]]
     
     def spell_check(self, query):
         """
@@ -157,4 +352,98 @@ class SpellCorrection:
                 else:
                     final_result = final_result + word + " " 
 
-        return final_result
\ No newline at end of file
+        return final_result
+
+    def get_candidates(self, word, max_words=10):
+        """
+        Finds the corrections of a word, for `beam_search`.
+
+        Parameters
+        ----------
+        word : str
+            The word, as typed. It is looked up lower-cased.
+        max_words : int
+            The number of nearest words of a misspelled word to consider.
+
+        Returns
+        -------
+        list
+            Tuples of each correction, the words the language model sees for it and its log
+            Jaccard score: the word as typed if it is known or has no near words, otherwise its
+            nearest words, as the vocabulary holds them.
+        """
+        key = word.lower()
+        if key in self.all_shingled_words:
+            return [(word, [key], 0.0)]
+        word_shingles = self.shingle_word(key)
+        candidates = []
+        for candidate in self.find_nearest_words(key, max_words):
+            jaccard = self.jaccard_score(word_shingles, self.all_shingled_words[candidate])
+            candidates.append((candidate, [candidate], math.log(jaccard)))
+        return candidates or [(word, [key], 0.0)]
+
+    def beam_search(self, positions, beam_width=5, channel_weight=8.0):
+        """
+        Picks one correction for every position of a query, the combination the bigram
+        language model and the Jaccard scores like best together.
+
+        Parameters
+        ----------
+        positions : list of list
+            The candidates of every position of the query, as `get_candidates` returns them.
+            The words the language model sees may be empty (e.g. for a stopword).
+        beam_width : int
+            The number of partial corrections kept after every position.
+        channel_weight : float
+            The weight of the log Jaccard scores against the log probabilities.
+
+        Returns
+        -------
+        list of str
+            The chosen correction of every position.
+
+        Note
+        -------
+            The score of the rest of the query only depends on the last word seen, so of the
+            partial corrections that end with the same word only the best one is kept.
+        """
+        word_ids = self.all_shingled_words.word_ids
+        beam = [(0.0, None, [])]
+        for candidates in positions:
+            best = dict()
+            for score, previous_id, corrections in beam:
+                for correction, terms, channel_score in candidates:
+                    new_score = score + channel_weight * channel_score
+                    last_id = previous_id
+                    for term in terms:
+                        term_id = word_ids.get(term)
+                        new_score += self.language_model.get_log_probability(term_id, last_id)
+                        last_id = term_id
+                    if last_id not in best or new_score > best[last_id][0]:
+                        best[last_id] = (new_score, last_id, corrections + [correction])
+            beam = sorted(best.values(), key=lambda x: -x[0])[:beam_width]
+        return beam[0][2]
+
+    def spell_check_in_context(self, query, beam_width=5, max_words=10):
+        """
+        Find correct form of a misspelled query, choosing the corrections of its words together
+        with the bigram language model instead of one by one.
+
+        Parameters
+        ----------
+        query : str
+            The misspelled query.
+        beam_width : int
+            The number of partial corrections kept after every word.
+        max_words : int
+            The number of nearest words of a misspelled word to consider.
+
+        Returns
+        -------
+        str
+            Correct form of the query. The known words are kept as typed.
+        """
+        if self.language_model is None:
+            return self.spell_check(query).strip()
+        positions = [self.get_candidates(word, max_words) for word in query.split()]
+        return " ".join(self.beam_search(positions, beam_width))
@@ -0,0 +1,250 @@
+import os
+import mmap
+import json
+import struct
+import argparse
+from bisect import bisect_right
+
+import numpy as np
+from nltk.stem import PorterStemmer
+
+MAGIC = b"STEMS001"
+HEADER = struct.Struct("<8sI")
+# every BLOCK_SIZE-th word is kept in memory, so a lookup only searches one block of the file
+BLOCK_SIZE = 32
+
+
+class StemCache:
+    stemmer = PorterStemmer()
+
+    def __init__(self, path=None, read_only=False):
+        """
+        A word-to-stem cache that is kept on disk between runs.
+
+        The file holds the words in sorted order and is memory-mapped, not parsed: a lookup is
+        a binary search over the mapped pages, so loading is instant and worker processes that
+        open the same file share its memory. Stems of new words are kept in memory until `save`
+        merges them into the file.
+
+        Parameters
+        ----------
+        path : str, optional
+            The cache file. If it does not exist yet, the cache starts empty and `save` creates it.
+        read_only : bool
+            If True, the stems of words missing from the file are computed but not kept, so a
+            long-running process that never saves (e.g. the search engine) does not grow, and
+            `save` is not allowed.
+
+        Note
+        -------
+            The file starts with a header (magic, number of words n), then 2n + 1 little-endian
+            uint32 offsets into the string area that follows. Word i is the UTF-8 bytes between
+            offsets 2i and 2i + 1, its stem the bytes between offsets 2i + 1 and 2i + 2.
+        """
+        self.path = path
+        self.file = None
+        self.mapped = None
+        self.offsets = None
+        self.block_heads = []
+        self.size = 0
+        self.strings_start = 0
+        self.read_only = read_only
+        self.added = {}
+        self.hits = 0
+        self.misses = 0
+        if path is not None and os.path.exists(path):
+            self.open()
+
+    def open(self):
+        """
+        Memory-maps the cache file.
+        """
+        self.file = open(self.path, "rb")
+        if os.fstat(self.file.fileno()).st_size == 0:
+            self.file.close()
+            self.file = None
+            return
+        self.mapped = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.size = HEADER.unpack_from(self.mapped, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} is not a stem cache file.")
+        self.offsets = np.frombuffer(self.mapped, dtype="<u4", count=2 * self.size + 1, offset=HEADER.size)
+        self.strings_start = HEADER.size + self.offsets.nbytes
+        self.block_heads = [self.get_string(2 * i) for i in range(0, self.size, BLOCK_SIZE)]
+
+    def close(self):
+        """
+        Unmaps the cache file. The stems added since the last `save` are kept.
+        """
+        # the offsets are a view of the mapped file, which cannot be closed while they exist
+        self.offsets = None
+        self.block_heads = []
+        if self.mapped is not None:
+            self.mapped.close()
+            self.mapped = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.size = 0
+
+    def __len__(self):
+        # a word is only added when the file does not have it
+        return self.size + len(self.added)
+
+    def __contains__(self, word):
+        return word in self.added or self.find(word) is not None
+
+    def get_string(self, i):
+        """
+        Returns the bytes between offsets i and i + 1 of the string area.
+        """
+        start = self.strings_start + int(self.offsets[i])
+        end = self.strings_start + int(self.offsets[i + 1])
+        return self.mapped[start:end]
+
+    def find(self, word):
+        """
+        Looks a word up in the cache file.
+
+        Returns
+        -------
+        str or None
+            The stem, or None if the file does not have the word.
+        """
+        if not self.size:
+            return None
+        key = word.encode("utf-8")
+        # UTF-8 bytes sort in the same order as the code points of the words
+        block = bisect_right(self.block_heads, key) - 1
+        if block < 0:
+            return None
+        low = block * BLOCK_SIZE
+        high = min(low + BLOCK_SIZE, self.size)
+        while low < high:
+            middle = (low + high) // 2
+            if self.get_string(2 * middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.size and self.get_string(2 * low) == key:
+            return self.get_string(2 * low + 1).decode("utf-8")
+        return None
+
+    def stem(self, word):
+        """
+        Returns the stem of a word, stemming and adding it if the cache does not have it yet.
+        A read-only cache stems the word without adding it.
+
+        Parameters
+        ----------
+        word : str
+            The lower-cased word.
+
+        Returns
+        -------
+        str
+            The stem.
+        """
+        stem = self.added.get(word)
+        if stem is None:
+            stem = self.find(word)
+            if stem is None:
+                self.misses += 1
+                stem = self.stemmer.stem(word)
+                if not self.read_only:
+                    self.added[word] = stem
+                return stem
+        self.hits += 1
+        return stem
+
+    def items(self):
+        """
+        Yields the words and stems of the cache file in sorted order.
+        """
+        for i in range(self.size):
+            yield self.get_string(2 * i).decode("utf-8"), self.get_string(2 * i + 1).decode("utf-8")
+
+    def save(self, path=None):
+        """
+        Merges the added stems into the cache file and maps the new file.
+
+        The new file is written next to the old one and then moved over it, so a process that
+        is reading the old file is not disturbed and a failed save leaves the old file intact.
+
+        Parameters
+        ----------
+        path : str, optional
+            The cache file. Defaults to the file the cache was opened from.
+        """
+        if self.read_only:
+            raise ValueError("A read-only stem cache cannot be saved.")
+        path = path or self.path
+        if path is None:
+            raise ValueError("The stem cache has no file to be saved to.")
+        entries = dict(self.items())
+        entries.update(self.added)
+        offsets = [0]
+        strings = bytearray()
+        for word in sorted(entries):
+            for string in (word, entries[word]):
+                strings += string.encode("utf-8")
+                offsets.append(len(strings))
+
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, len(entries)))
+            file.write(struct.pack(f"<{len(offsets)}I", *offsets))
+            file.write(strings)
+        self.close()
+        os.replace(temporary_path, path)
+        self.path = path
+        self.added = {}
+        self.open()
+
+    def hit_rate(self):
+        """
+        Returns the share of the lookups that did not need the stemmer, or 0 before any lookup.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get_statistics(self):
+        """
+        Returns the size of the cache and its lookup statistics since it was created.
+
+        Returns
+        -------
+        dict
+            The number of words in the file, of words added since the last save, of hits and
+            misses, and the hit rate.
+        """
+        return {
+            "stored_words": self.size,
+            "added_words": len(self.added),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate(),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the stem cache of the crawled movies.")
+    parser.add_argument("--crawl", default="IMDB_crawled.json", help="path to IMDB_crawled.json")
+    parser.add_argument("--output", default=os.path.join("indexes", "stem_cache.bin"))
+    args = parser.parse_args()
+
+    with open(args.crawl, "r") as file:
+        movies = json.load(file)
+    words = (
+        word
+        for movie in movies
+        for field in ["stars", "genres", "summaries"]
+        if isinstance(movie.get(field), list)
+        for word in " ".join(movie[field]).lower().split()
+    )
+    cache = StemCache(args.output)
+    for word in words:
+        cache.stem(word)
+    cache.save()
+    print(f"{cache.size} words in {args.output}")
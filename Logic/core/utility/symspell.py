@@ -0,0 +1,231 @@
+import hashlib
+import numpy as np
+
+
+def hash_delete(delete):
+    """
+    Hashes a deletion string to an unsigned 64-bit integer that is the same in every run.
+    """
+    return int.from_bytes(hashlib.blake2b(delete.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def get_deletes(word, max_edit_distance):
+    """
+    Returns the word and every string made by deleting up to `max_edit_distance` characters of it.
+    """
+    deletes = {word}
+    edges = {word}
+    for _ in range(max_edit_distance):
+        next_edges = set()
+        for edge in edges:
+            if not edge:
+                continue
+            for i in range(len(edge)):
+                delete = edge[:i] + edge[i + 1 :]
+                if delete not in deletes:
+                    deletes.add(delete)
+                    next_edges.add(delete)
+        edges = next_edges
+    return deletes
+
+
+def edit_distance(first, second, max_distance):
+    """
+    Computes the edit distance of two words, counting insertions, deletions, substitutions and
+    transpositions of adjacent characters (optimal string alignment).
+
+    Returns
+    -------
+    int
+        The distance, or max_distance + 1 if it is larger than `max_distance`.
+    """
+    if abs(len(first) - len(second)) > max_distance:
+        return max_distance + 1
+    if first == second:
+        return 0
+    previous_previous = None
+    previous = list(range(len(second) + 1))
+    for i in range(1, len(first) + 1):
+        current = [i] + [0] * len(second)
+        for j in range(1, len(second) + 1):
+            cost = 0 if first[i - 1] == second[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (
+                i > 1
+                and j > 1
+                and first[i - 1] == second[j - 2]
+                and first[i - 2] == second[j - 1]
+            ):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+
+class SymSpell:
+    def __init__(self, word_counter, max_edit_distance=2, prefix_length=7):
+        """
+        A symmetric delete spelling corrector.
+
+        Every word of the vocabulary is stored under the strings made by deleting up to
+        `max_edit_distance` of its characters. A misspelled word is corrected by generating its
+        own deletes and looking them up, so the candidates are found without comparing the word
+        to the vocabulary, and only they are checked with the real edit distance.
+
+        Parameters
+        ----------
+        word_counter : dict
+            The words of the vocabulary and their frequencies (e.g. `SpellCorrection.word_counter`).
+        max_edit_distance : int
+            The largest edit distance of a correction.
+        prefix_length : int
+            Only the deletes of the first `prefix_length` characters of a word are stored, which
+            keeps the index small; the rest of the word is still compared by the edit distance.
+
+        Note
+        -------
+            The deletes are not stored as strings but as 64-bit hashes in one sorted array, with
+            the ids of their words in a parallel array. A hash collision can only add candidates,
+            which the edit distance check removes.
+        """
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.words = list(word_counter)
+        self.counts = np.array([word_counter[word] for word in self.words], dtype=np.int64)
+        self.word_ids = {word: word_id for word_id, word in enumerate(self.words)}
+
+        hashes = []
+        word_ids = []
+        for word_id, word in enumerate(self.words):
+            for delete in get_deletes(word[:prefix_length], max_edit_distance):
+                hashes.append(hash_delete(delete))
+                word_ids.append(word_id)
+        hashes = np.array(hashes, dtype=np.uint64)
+        order = np.argsort(hashes, kind="stable")
+        self.delete_hashes = hashes[order]
+        self.delete_word_ids = np.array(word_ids, dtype=np.int32)[order]
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a corrector stored by `save`.
+
+        Parameters
+        ----------
+        path : str
+            The .npz file.
+
+        Returns
+        -------
+        SymSpell
+            The corrector.
+        """
+        symspell = cls.__new__(cls)
+        with np.load(path) as arrays:
+            symspell.max_edit_distance = int(arrays["max_edit_distance"])
+            symspell.prefix_length = int(arrays["prefix_length"])
+            words = arrays["words"].tobytes().decode("utf-8")
+            symspell.words = words.split("\n") if words else []
+            symspell.counts = arrays["counts"]
+            symspell.delete_hashes = arrays["delete_hashes"]
+            symspell.delete_word_ids = arrays["delete_word_ids"]
+        symspell.word_ids = {word: word_id for word_id, word in enumerate(symspell.words)}
+        return symspell
+
+    def save(self, path):
+        """
+        Stores the corrector in one uncompressed .npz file: the words as newline separated
+        UTF-8 bytes, their counts and the delete hashes with their word ids.
+
+        Parameters
+        ----------
+        path : str
+            The .npz file.
+        """
+        np.savez(
+            path,
+            max_edit_distance=np.array(self.max_edit_distance),
+            prefix_length=np.array(self.prefix_length),
+            words=np.frombuffer("\n".join(self.words).encode("utf-8"), dtype=np.uint8),
+            counts=self.counts,
+            delete_hashes=self.delete_hashes,
+            delete_word_ids=self.delete_word_ids,
+        )
+
+    def lookup(self, word, max_edit_distance=None, max_results=None):
+        """
+        Finds the words of the vocabulary that are closest to a word.
+
+        Parameters
+        ----------
+        word : str
+            The (possibly misspelled) word.
+        max_edit_distance : int, optional
+            The largest edit distance of a suggestion, at most the one the index was built with.
+        max_results : int, optional
+            The maximum number of suggestions. If None, all of them are returned.
+
+        Returns
+        -------
+        list
+            Tuples of the suggested words, their edit distances and their counts, the closest
+            and then the most frequent first. A known word is its own first suggestion.
+        """
+        if max_edit_distance is None:
+            max_edit_distance = self.max_edit_distance
+        max_edit_distance = min(max_edit_distance, self.max_edit_distance)
+
+        hashes = np.array(
+            [hash_delete(delete) for delete in get_deletes(word[: self.prefix_length], max_edit_distance)],
+            dtype=np.uint64,
+        )
+        starts = np.searchsorted(self.delete_hashes, hashes, side="left")
+        ends = np.searchsorted(self.delete_hashes, hashes, side="right")
+        candidate_ids = set()
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            if start < end:
+                candidate_ids.update(self.delete_word_ids[start:end].tolist())
+
+        candidates = [(self.words[candidate_id], int(self.counts[candidate_id])) for candidate_id in candidate_ids]
+        if max_results == 1:
+            # checked from the most frequent on, a candidate can only beat the best one so far
+            # by being closer, so the allowed distance shrinks with every suggestion
+            candidates.sort(key=lambda x: (-x[1], x[0]))
+        suggestions = []
+        for candidate, count in candidates:
+            if max_edit_distance < 0:
+                break
+            distance = edit_distance(word, candidate, max_edit_distance)
+            if distance <= max_edit_distance:
+                suggestions.append((candidate, distance, count))
+                if max_results == 1:
+                    max_edit_distance = distance - 1
+        suggestions.sort(key=lambda x: (x[1], -x[2], x[0]))
+        return suggestions if max_results is None else suggestions[:max_results]
+
+    def correct_word(self, word):
+        """
+        Returns the closest and then most frequent word of the vocabulary, or the word itself
+        if it is known or nothing is close enough.
+        """
+        if word in self.word_ids:
+            return word
+        suggestions = self.lookup(word, max_results=1)
+        return suggestions[0][0] if suggestions else word
+
+    def spell_check(self, query):
+        """
+        Corrects every word of a query.
+
+        Parameters
+        ----------
+        query : str
+            The misspelled query.
+
+        Returns
+        -------
+        str
+            Correct form of the query.
+        """
+        return " ".join(self.correct_word(word) for word in query.split())
@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+
+import numpy as np
+
+from .core.benchmark import SearchBenchmark, load_crawled_movies
+from .core.indexer import Indexes, Index_reader
+
+
+async def run_client(host, port, queries, method, latencies):
+    """
+    Sends queries one after another over a single kept-alive connection.
+
+    Parameters
+    ----------
+    host : str
+        The address of the search server.
+    port : int
+        The port of the search server.
+    queries : list of str
+        The queries this client sends.
+    method : str
+        The search method of every request.
+    latencies : list
+        The latency of every successful request (in seconds) is appended to it.
+
+    Returns
+    -------
+    int
+        The number of failed requests.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    errors = 0
+    try:
+        for query in queries:
+            body = json.dumps({"query": query, "method": method}).encode()
+            request = (
+                f"POST /search HTTP/1.1\r\nHost: {host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+            ).encode() + body
+
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, value = line.decode("latin-1").split(":", 1)
+                if name.strip().lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+
+            if b" 200 " in status_line:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+    finally:
+        writer.close()
+    return errors
+
+
+async def run_load(host, port, queries, concurrency, method):
+    """
+    Replays the queries with `concurrency` clients and reports throughput and latency.
+
+    Returns
+    -------
+    dict
+        The number of requests and errors, the throughput and the latency percentiles in milliseconds.
+    """
+    latencies = []
+    chunks = [queries[i::concurrency] for i in range(concurrency)]
+    start = time.perf_counter()
+    errors = await asyncio.gather(
+        *(run_client(host, port, chunk, method, latencies) for chunk in chunks)
+    )
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1e3
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0, 0, 0)
+    return {
+        "requests": len(queries),
+        "errors": sum(errors),
+        "concurrency": concurrency,
+        "throughput": len(latencies) / elapsed,
+        "latency_ms": {"p50": float(p50), "p95": float(p95), "p99": float(p99)},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate search load against Logic.server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--method", default="ltn.lnn")
+    parser.add_argument(
+        "--indexes",
+        default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "indexes", ""),
+        help="the indexes directory the queries are generated from",
+    )
+    parser.add_argument("--crawl", default="IMDB_crawled.json", help="the crawled movies the queries are made of, if present")
+    args = parser.parse_args()
+
+    # only the query log generator of the benchmark is used, so it needs no search engine
+    documents = Index_reader(args.indexes, Indexes.DOCUMENTS).index
+    benchmark = SearchBenchmark(
+        None, documents, number_of_queries=args.requests, crawled_movies=load_crawled_movies(args.crawl)
+    )
+    queries = benchmark.generate_queries()
+
+    report = asyncio.run(run_load(args.host, args.port, queries, args.concurrency, args.method))
+    print(json.dumps(report, indent=4))
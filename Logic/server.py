@@ -0,0 +1,334 @@
+import json
+import asyncio
+import argparse
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+
+from . import utils
+
+
+class SearchServer:
+    def __init__(self, host="127.0.0.1", port=8080, batch_window=0.002, max_batch_size=32, workers=4):
+        """
+        A small HTTP/1.1 JSON search service on top of `Logic.utils`.
+
+        The indexes are loaded once when the server starts and stay in memory. Connections are
+        kept alive between requests, and the searches that arrive within `batch_window` seconds
+        of each other are run together through `utils.search_batch`.
+
+        Parameters
+        ----------
+        host : str
+            The address to listen on. Defaults to localhost only.
+        port : int
+            The port to listen on.
+        batch_window : float
+            How long (in seconds) the first request of a batch waits for others to join it.
+        max_batch_size : int
+            The largest number of requests in one batch.
+        workers : int
+            The number of threads running the batches, so the event loop keeps accepting requests.
+        """
+        self.host = host
+        self.port = port
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.executor = ThreadPoolExecutor(workers)
+        self.queue = None
+        self.tasks = set()  # keeps the background tasks referenced until they finish
+
+    async def start(self):
+        """
+        Loads the indexes and the completions, and starts listening.
+
+        Returns
+        -------
+        asyncio.AbstractServer
+            The running server.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, utils.get_search_engine)
+        await loop.run_in_executor(self.executor, utils.get_autocomplete)
+        self.queue = asyncio.Queue()
+        self.spawn(self.run_batches())
+        return await asyncio.start_server(self.handle_connection, self.host, self.port)
+
+    async def serve_forever(self):
+        server = await self.start()
+        print(f"Serving on http://{self.host}:{self.port}")
+        async with server:
+            await server.serve_forever()
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serves the requests of one connection until the client closes it.
+        """
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader)
+                except ValueError as error:
+                    # the rest of a malformed request cannot be told apart from the next one
+                    self.write_response(writer, 400, {"error": f"malformed request: {error}"}, False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self.route(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self.write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        """
+        Reads one HTTP request.
+
+        Returns
+        -------
+        tuple or None
+            The method, path, headers (lower-cased names) and body, or None if the connection
+            was closed.
+
+        Raises
+        ------
+        ValueError
+            If the request line, a header or the content length is malformed.
+        """
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        parts = request_line.decode("latin-1").split(" ", 2)
+        if len(parts) != 3:
+            raise ValueError(f"invalid request line {request_line[:100]!r}")
+        method, path, _ = parts
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if b":" not in line:
+                raise ValueError(f"invalid header {line[:100]!r}")
+            name, value = line.decode("latin-1").split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+
+        body = b""
+        length = int(headers.get("content-length", 0))
+        if length < 0:
+            raise ValueError(f"invalid content length {length}")
+        if length:
+            body = await reader.readexactly(length)
+        return method, path, headers, body
+
+    def write_response(self, writer, status, payload, keep_alive):
+        reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+        body = json.dumps(payload).encode()
+        head = (
+            f"HTTP/1.1 {status} {reasons[status]}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode() + body)
+
+    async def route(self, method, path, body):
+        """
+        Dispatches a request.
+
+        Routes
+        ------
+        POST /search
+            Body: {"query": str, "max_results": int, "method": str, "weights": [stars, genres, summaries],
+            "unigram_smoothing": str, "alpha": float, "lamda": float}. Only the query is required.
+            Returns {"results": [[document_id, score], ...]}.
+        GET /suggest?prefix=pac&field=stars&max_results=10
+            Type-ahead over the index terms. Only the prefix is required; `field` may repeat.
+            Returns {"suggestions": [[term, document_frequency], ...]}.
+        GET /complete?prefix=the%20god&max_results=5
+            Query autocomplete over titles, star names and summary phrases.
+            Returns {"completions": [str, ...]}.
+        GET /metrics
+            Returns the latency histograms of `utils.metrics_registry`.
+        GET /health
+            Returns {"status": "ok"}.
+        """
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok"}
+        if method == "GET" and path == "/metrics":
+            return 200, utils.metrics_registry.summary()
+        if method == "GET" and urlsplit(path).path == "/suggest":
+            parameters = parse_qs(urlsplit(path).query)
+            try:
+                suggestions = utils.suggest(
+                    parameters["prefix"][0],
+                    int(parameters.get("max_results", ["10"])[0]),
+                    parameters.get("field"),
+                )
+            except (ValueError, KeyError) as error:
+                return 400, {"error": f"invalid request: {error}"}
+            return 200, {"suggestions": suggestions}
+        if method == "GET" and urlsplit(path).path == "/complete":
+            parameters = parse_qs(urlsplit(path).query)
+            try:
+                completions = utils.complete_query(
+                    parameters["prefix"][0], int(parameters.get("max_results", ["5"])[0])
+                )
+            except (ValueError, KeyError) as error:
+                return 400, {"error": f"invalid request: {error}"}
+            return 200, {"completions": completions}
+        if method != "POST" or path != "/search":
+            return 404, {"error": f"no route for {method} {path}"}
+
+        try:
+            query, options = self.parse_search_request(body)
+        except (ValueError, KeyError, TypeError) as error:
+            return 400, {"error": f"invalid request: {error}"}
+
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((query, options, future))
+        try:
+            results = await future
+        except Exception as error:
+            return 500, {"error": str(error)}
+        return 200, {"results": results}
+
+    def parse_search_request(self, body):
+        """
+        Parses and checks the body of a search request.
+
+        Returns
+        -------
+        tuple
+            The query and its options (max_results, method, weights, unigram_smoothing, alpha,
+            lamda). The options are hashable, so requests with the same options can be batched.
+
+        Raises
+        ------
+        ValueError, KeyError or TypeError
+            If the body is not a JSON object, the query is missing or an option has the wrong type.
+        """
+        request = json.loads(body)
+        if not isinstance(request, dict):
+            raise TypeError("the body must be a JSON object")
+        query = request["query"]
+        if not isinstance(query, str):
+            raise TypeError("query must be a string")
+
+        max_results = request.get("max_results", 10)
+        if not is_integer(max_results) or max_results < -1:
+            raise ValueError("max_results must be a non-negative integer, or -1 for all results")
+        method = request.get("method", "ltn.lnn")
+        if not isinstance(method, str):
+            raise TypeError("method must be a string")
+        weights = request.get("weights", [0.3, 0.3, 0.4])
+        if not isinstance(weights, list) or len(weights) != 3 or not all(is_number(weight) for weight in weights):
+            raise ValueError("weights must be a list of the 3 weights of stars, genres and summaries")
+        unigram_smoothing = request.get("unigram_smoothing")
+        if unigram_smoothing is not None and not isinstance(unigram_smoothing, str):
+            raise TypeError("unigram_smoothing must be a string")
+        for name in ("alpha", "lamda"):
+            if request.get(name) is not None and not is_number(request[name]):
+                raise ValueError(f"{name} must be a number")
+
+        options = (
+            max_results,
+            method,
+            tuple(float(weight) for weight in weights),
+            unigram_smoothing,
+            None if request.get("alpha") is None else float(request["alpha"]),
+            None if request.get("lamda") is None else float(request["lamda"]),
+        )
+        return query, options
+
+    async def run_batches(self):
+        """
+        Collects the queued searches into batches and runs each batch on the thread pool.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # only requests with the same options can share a search_batch call
+            groups = {}
+            for query, options, future in batch:
+                try:
+                    groups.setdefault(options, []).append((query, future))
+                except Exception as error:
+                    # a bad request fails on its own instead of stopping the batching for good
+                    if not future.done():
+                        future.set_exception(error)
+            for options, requests in groups.items():
+                self.spawn(self.run_group(options, requests))
+
+    def spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def run_group(self, options, requests):
+        max_results, method, weights, unigram_smoothing, alpha, lamda = options
+        queries = [query for query, _ in requests]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                lambda: utils.search_batch(
+                    queries, max_results, method, list(weights), unigram_smoothing, alpha, lamda
+                ),
+            )
+        except Exception as error:
+            for _, future in requests:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, future), result in zip(requests, results):
+            if not future.done():
+                future.set_result([[doc_id, float(score)] for doc_id, score in result])
+
+
+def is_integer(value):
+    """
+    Returns True if a JSON value is an integer (and not a boolean).
+    """
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def is_number(value):
+    """
+    Returns True if a JSON value is a number (and not a boolean).
+    """
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the search engine over HTTP on localhost.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--batch-window-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    server = SearchServer(
+        args.host,
+        args.port,
+        batch_window=args.batch_window_ms / 1e3,
+        max_batch_size=args.max_batch_size,
+        workers=args.workers,
+    )
+    asyncio.run(server.serve_forever())
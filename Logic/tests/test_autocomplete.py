@@ -0,0 +1,64 @@
+import pytest
+
+from Logic.core.utility.autocomplete import Autocomplete
+
+SUMMARY_START = '<span style="display: block;" data-reactroot="">'
+SUMMARY_END = '</span><a class="ipc-link" href="/search/title/?plot_author=Nick">Nick Riganas</a>'
+MOVIES = [
+    {
+        "id": "tt0068646",
+        "title": "The Godfather",
+        "stars": ["Marlon Brando", "Al Pacino"],
+        "rating": "9.2",
+        "summaries": [SUMMARY_START + "The aging patriarch of an organized crime dynasty." + SUMMARY_END],
+    },
+    {
+        "id": "tt0071562",
+        "title": "The Godfather Part II",
+        "stars": ["Al Pacino", "Robert De Niro"],
+        "rating": "9.0",
+        "summaries": [SUMMARY_START + "An organized crime dynasty in 1950s New York." + SUMMARY_END],
+    },
+    {
+        "id": "tt0316654",
+        "title": "Spider-Man 2",
+        "stars": ["Tobey Maguire"],
+        "rating": "7.5",
+        "summaries": [SUMMARY_START + "Peter Parker is beset with troubles; Spider-Man fights crime." + SUMMARY_END],
+    },
+    {"id": "tt9999999", "title": "Not Indexed", "stars": [], "summaries": []},
+]
+DOCUMENTS = {movie["id"]: {} for movie in MOVIES[:3]}
+
+
+@pytest.fixture
+def autocomplete():
+    return Autocomplete.from_documents(DOCUMENTS, MOVIES, min_phrase_count=2)
+
+
+def test_completions_need_the_crawled_movies():
+    with pytest.raises(ValueError):
+        Autocomplete.from_documents(DOCUMENTS, None)
+
+
+def test_titles_and_stars_are_suggested_as_crawled(autocomplete):
+    assert [phrase for phrase, _ in autocomplete.complete("the godf")] == ["The Godfather", "The Godfather Part II"]
+    assert [phrase for phrase, _ in autocomplete.complete("pac")] == ["Al Pacino"]
+    assert autocomplete.complete("not ind") == []
+
+
+def test_summary_phrases_hold_no_markup(autocomplete):
+    assert "organized crime dynasty" in autocomplete.trie.weights
+    words = set(" ".join(autocomplete.phrase_counts).split())
+    assert not words & {"span", "style", "display", "block", "class", "href", "nick", "riganas"}
+
+
+def test_record_selection_only_boosts_completions(autocomplete):
+    weight = autocomplete.trie.weights["Al Pacino"]
+    assert autocomplete.record_selection("  al   PACINO ")
+    assert autocomplete.trie.weights["Al Pacino"] == weight + autocomplete.click_weight
+    size = len(autocomplete.trie.weights)
+    assert not autocomplete.record_selection("my private search")
+    assert not autocomplete.record_selection("")
+    assert len(autocomplete.trie.weights) == size
+    assert autocomplete.complete("my priv") == []
@@ -0,0 +1,111 @@
+import random
+
+import pytest
+
+from Logic.core.search import SearchEngine
+from Logic.core.utility.preprocess import QueryAnalyzer
+from Logic.core.indexer.indexes_enum import Indexes
+from Logic.core.boolean_search import (
+    BooleanQueryParser,
+    BooleanSearch,
+    galloping_search,
+    intersect_postings,
+    subtract_postings,
+    unite_postings,
+)
+
+
+@pytest.fixture(scope="module")
+def parser():
+    return BooleanQueryParser(QueryAnalyzer())
+
+
+@pytest.fixture(scope="module")
+def boolean_search():
+    return BooleanSearch(SearchEngine(read_only=True))
+
+
+def test_and_binds_tighter_than_or(parser):
+    assert parser.parse("drama OR crime war") == (
+        "or",
+        [("term", None, "drama"), ("and", [("term", None, "crime"), ("term", None, "war")])],
+    )
+    assert parser.parse("(drama OR crime) AND war") == (
+        "and",
+        [("or", [("term", None, "drama"), ("term", None, "crime")]), ("term", None, "war")],
+    )
+
+
+def test_not(parser):
+    assert parser.parse("drama NOT war") == ("and", [("term", None, "drama"), ("not", ("term", None, "war"))])
+    assert parser.parse("NOT war") == ("not", ("term", None, "war"))
+
+
+def test_not_of_a_removed_term_is_dropped(parser):
+    # "about" is a stopword, so there is nothing to exclude
+    assert parser.parse("drama NOT about") == ("and", [("term", None, "drama"), ("all",)])
+    assert parser.parse("NOT about") == ("all",)
+    assert parser.parse("NOT (summaries:about)") == ("all",)
+
+
+def test_field_prefix_wildcard(parser):
+    assert parser.parse("stars:Pac*") == ("wildcard", "stars", "pac*")
+    assert parser.parse("stars:pac* genres:crime") == (
+        "and",
+        [("wildcard", "stars", "pac*"), ("term", "genres", "crime")],
+    )
+
+
+@pytest.mark.parametrize("query", ["drama AND", "drama OR", "drama NOT", "(drama", "stars:", "foo:bar", ""])
+def test_invalid_queries_raise_value_error(parser, query):
+    with pytest.raises(ValueError):
+        parser.parse(query)
+
+
+def random_postings(rng, size, universe=2000):
+    return sorted(rng.sample(range(universe), size))
+
+
+@pytest.mark.parametrize("sizes", [(0, 50), (5, 1000), (40, 60), (300, 300), (1000, 3)])
+def test_posting_helpers_match_set_operations(sizes):
+    rng = random.Random(sum(sizes))
+    for _ in range(20):
+        postings1, postings2 = random_postings(rng, sizes[0]), random_postings(rng, sizes[1])
+        assert intersect_postings(postings1, postings2) == sorted(set(postings1) & set(postings2))
+        assert subtract_postings(postings1, postings2) == sorted(set(postings1) - set(postings2))
+        assert unite_postings([postings1, postings2]) == sorted(set(postings1) | set(postings2))
+
+
+def test_galloping_search_matches_bisect():
+    rng = random.Random(0)
+    postings = random_postings(rng, 500)
+    for low in [0, 1, 100, 499, 500]:
+        for target in [-1, 0, 7, 1000, 1999, 2000]:
+            expected = next((i for i in range(low, len(postings)) if postings[i] >= target), len(postings))
+            assert galloping_search(postings, target, low) == expected
+
+
+def test_search_matches_the_postings(boolean_search):
+    index = boolean_search.search_engine.document_indexes
+    stars, genres = index[Indexes.STARS].index, index[Indexes.GENRES].index
+    pacino = set(stars["pacino"])
+    crime = set(genres["crime"])
+    assert boolean_search.search("stars:pacino AND genres:crime") == sorted(pacino & crime)
+    assert boolean_search.search("stars:pacino NOT genres:crime") == sorted(pacino - crime)
+    expanded = set().union(*(stars[term] for term in stars if term.startswith("pac")))
+    assert boolean_search.search("stars:pac*") == sorted(expanded)
+
+
+def test_not_of_a_removed_term_excludes_nothing(boolean_search):
+    pacino = boolean_search.search("stars:pacino")
+    assert pacino
+    assert boolean_search.search("stars:pacino NOT summaries:about") == pacino
+    assert boolean_search.search("NOT about") == boolean_search.get_all_documents()
+
+
+def test_ranked_ties_are_ordered_by_document_id(boolean_search):
+    result = boolean_search.search("genres:crime", method="nnn.nnn")
+    scores = [score for _, score in result]
+    assert len(set(scores)) < len(scores)
+    assert result == sorted(result, key=lambda x: (-x[1], x[0]))
+    assert boolean_search.search("genres:crime", method="nnn.nnn", max_results=5) == result[:5]
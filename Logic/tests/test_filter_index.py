@@ -0,0 +1,52 @@
+import os
+import json
+import shutil
+
+import pytest
+
+from Logic.core.indexer.filter_index import Filter_index, Filter_bitmaps
+
+INDEXES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "indexes")
+
+
+def make_crawl(tmp_path, **missing):
+    """
+    Copies the documents index to `tmp_path` and writes a crawl of its documents, where the
+    fields in `missing` are replaced by the crawler's missing markers.
+    """
+    path = os.path.join(str(tmp_path), "")
+    shutil.copy(os.path.join(INDEXES_PATH, "documents.json"), path)
+    with open(os.path.join(path, "documents.json"), "r") as file:
+        document_ids = sorted(json.load(file))
+    movies = [
+        {
+            "id": doc_id,
+            "genres": ["Drama"] if i % 2 else ["Crime", "Drama"],
+            "mpaa": missing.get("mpaa", "PG-13" if i % 3 else "R"),
+            "release_year": missing.get("release_year", str(1950 + i % 70)),
+            "rating": missing.get("rating", str(5 + i % 40 / 10)),
+        }
+        for i, doc_id in enumerate(document_ids)
+    ]
+    crawled_data_path = os.path.join(path, "IMDB_crawled.json")
+    with open(crawled_data_path, "w") as file:
+        json.dump(movies, file)
+    return path, crawled_data_path
+
+
+def test_every_filtered_field_is_built_from_the_crawl(tmp_path):
+    path, crawled_data_path = make_crawl(tmp_path)
+    Filter_index(path, crawled_data_path)
+    with open(os.path.join(path, "documents_filter_index.json"), "r") as file:
+        bitmaps = Filter_bitmaps(json.load(file))
+    assert all(bitmaps.bitmaps[field] for field in ["genres", "mpaa", "release_year", "rating"])
+    mask = bitmaps.get_mask({"genres": ["crime"], "mpaa": ["r"], "release_year": (1950, 1959)})
+    assert len(bitmaps.get_document_ids(mask)) > 0
+
+
+@pytest.mark.parametrize("field", ["mpaa", "release_year", "rating"])
+def test_a_field_without_values_fails_the_build(tmp_path, field):
+    path, crawled_data_path = make_crawl(tmp_path, **{field: "No " + field})
+    with pytest.raises(ValueError, match=field):
+        Filter_index(path, crawled_data_path)
+    assert not os.path.exists(os.path.join(path, "documents_filter_index.json"))
@@ -0,0 +1,37 @@
+import os
+import json
+import shutil
+
+from Logic.core.search import SearchEngine
+from Logic.core.indexer.index import Index
+from Logic.core.indexer.indexes_enum import Indexes
+
+INDEXES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "indexes")
+
+
+def test_search_engine_reads_the_analyzers_the_indexes_were_stored_with(tmp_path):
+    path = os.path.join(str(tmp_path), "")
+    for file_name in os.listdir(INDEXES_PATH):
+        if file_name.endswith(".json"):
+            shutil.copy(os.path.join(INDEXES_PATH, file_name), path)
+    with open(os.path.join(path, "documents.json"), "r") as file:
+        documents = json.load(file)
+    # a stale analyzer in the metadata is not used once the index records its own
+    metadata_path = os.path.join(path, "documents_metadata_index.json")
+    with open(metadata_path, "r") as file:
+        metadata = json.load(file)
+    metadata["analyzers"] = {"stars": "lowercase", "genres": "lowercase"}
+    with open(metadata_path, "w") as file:
+        json.dump(metadata, file)
+
+    index = Index(documents.values(), analyzers={"stars": "keyword"})
+    index.store_index(path, "stars")
+    with open(os.path.join(path, "stars_analyzer_index.json"), "r") as file:
+        assert json.load(file) == {"analyzer": "keyword"}
+
+    search_engine = SearchEngine(path, read_only=True)
+    assert search_engine.field_analyzers == {
+        Indexes.STARS: "keyword",
+        Indexes.GENRES: "lowercase",
+        Indexes.SUMMARIES: "text",
+    }
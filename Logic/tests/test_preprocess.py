@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from Logic.core.utility.preprocess import Analyzer, Preprocessor
+
+TEXTS = [
+    "",
+    "   \t\n ",
+    "The Godfather: Part II (1974) is about Michael Corleone's rise.",
+    "Spider-Man's web... spider-man SPIDER-MAN spiderman!",
+    "Visit https://www.imdb.com/title/tt0068646 or www.example.org, mail me@example.com now.",
+    "He said: \"Where is it?\" -- why, whom, being, That, this, THIS, each; should had.",
+    "ranks: #1, 2nd, 3.5/10 ... !!! ?? --- ''",
+    "a.b.com site.ir/path foo.org!bar plain.words end.",
+    "Café Amélie naïve résumé — fiancée's cliché",
+    "running runs ran runner easily fairly generously connection connected",
+    "tab\tseparated\nnew\nlines\r\nand  double  spaces",
+]
+
+WORDS = [
+    "Running", "run", "the", "This", "that", "about", "Don't", "X-Men", "e-mail", "www", "http",
+    "a@b", "x.com", "1999", "50%", "...", "Amélie", "café", "UPPER", "mixedCase", "why?", "(where)",
+]
+
+
+def legacy_preprocess(preprocessor, text):
+    """
+    The preprocessing pipeline the analyzer replaced, one pass over the whole text per step.
+    """
+    normalized = preprocessor.normalize(text)
+    without_links = preprocessor.remove_links(normalized)
+    without_punctuations = preprocessor.remove_punctuations(without_links)
+    return preprocessor.remove_stopwords(without_punctuations)
+
+
+def random_texts(count=200, seed=0):
+    rng = random.Random(seed)
+    return [
+        rng.choice([" ", "  ", "\n", "\t"]).join(rng.choice(WORDS) for _ in range(rng.randint(0, 30)))
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize("stem_cache_size", [0, 100000])
+def test_analyzer_matches_the_legacy_pipeline(stem_cache_size):
+    preprocessor = Preprocessor([], stem_cache_size=stem_cache_size)
+    # every text twice, so the cached results are checked as well
+    for text in (TEXTS + random_texts()) * 2:
+        assert preprocessor.preprocess_text(text) == legacy_preprocess(preprocessor, text)
+
+
+def test_analyze_words_lines_up_with_the_words():
+    analyzer = Analyzer()
+    for text in TEXTS + random_texts(seed=1):
+        words = text.split()
+        results = analyzer.analyze_words(words)
+        assert len(results) == len(words)
+        assert [result for result in results if result] == analyzer.analyze(text)
+
+
+def test_worker_processes_match_the_legacy_pipeline():
+    texts = TEXTS + random_texts(count=50, seed=2)
+    preprocessor = Preprocessor(texts)
+    expected = [legacy_preprocess(preprocessor, text) for text in texts]
+    assert preprocessor.preprocess(workers=2, chunk_size=8) == expected
@@ -0,0 +1,86 @@
+import pytest
+
+from Logic.core.search import SearchEngine
+from Logic.core.indexer.indexes_enum import Indexes
+
+
+ALL_FIELDS = {Indexes.STARS: 1, Indexes.GENRES: 1, Indexes.SUMMARIES: 1}
+
+
+@pytest.fixture(scope="module")
+def search_engine():
+    return SearchEngine(read_only=True)
+
+
+@pytest.mark.parametrize("query", ["al pacino crime", "spider man in wonderland"])
+def test_naive_unigram_returns_results_for_a_multi_field_query(search_engine, query):
+    result = search_engine.search(query, "unigram", ALL_FIELDS, smoothing_method="naive")
+    assert result
+
+
+def test_naive_unigram_keeps_documents_matched_by_any_field(search_engine):
+    query = "al pacino crime"
+    result = search_engine.search(query, "unigram", ALL_FIELDS, max_results=None, smoothing_method="naive")
+    field_query = search_engine.query_analyzer.analyze_fields(query, ALL_FIELDS)
+    matched = set()
+    for field in ALL_FIELDS:
+        scorer = search_engine.scorers[field]
+        matched.update(
+            scorer.compute_scores_with_unigram_model(
+                search_engine.get_field_query(field_query, field),
+                "naive",
+                search_engine.document_lengths_index[field].index,
+            )
+        )
+    assert {doc_id for doc_id, _ in result} == matched
+
+
+@pytest.mark.parametrize("query", ["spider man", "new york police", "world war love"])
+def test_naive_unigram_ranks_documents_with_more_query_terms_first(search_engine, query):
+    weights = {Indexes.SUMMARIES: 1}
+    result = search_engine.search(query, "unigram", weights, max_results=None, smoothing_method="naive")
+    index = search_engine.document_indexes[Indexes.SUMMARIES].index
+    terms = search_engine.query_analyzer.analyze(query)
+    matched_terms = [sum(doc_id in index.get(term, {}) for term in terms) for doc_id, _ in result]
+    assert matched_terms[0] == len(terms)
+    assert matched_terms == sorted(matched_terms, reverse=True)
+
+
+def test_naive_unigram_ranks_full_matches_first_over_all_fields(search_engine):
+    result = search_engine.search("spider man", "unigram", ALL_FIELDS, max_results=5, smoothing_method="naive")
+    assert "tt0316654" in [doc_id for doc_id, _ in result]  # Spider-Man 2
+
+
+def test_naive_unigram_skips_fields_without_query_terms(search_engine):
+    scorer = search_engine.scorers[Indexes.GENRES]
+    assert scorer.compute_scores_with_unigram_model({"wonderland": 1}, "naive") == {}
+    result = search_engine.search(
+        "spider man in wonderland", "unigram", ALL_FIELDS, max_results=None, smoothing_method="naive"
+    )
+    assert result[0][0] == "tt0316654"
+    assert len({score for _, score in result}) > 1
+    assert all(score < 0 for _, score in result)
+
+
+@pytest.mark.parametrize("method", ["ltn.lnn", "ltc.lnc", "OkapiBM25"])
+def test_unsafe_ranking_equals_safe_ranking_when_tiers_are_pruned(search_engine, method):
+    weights = {Indexes.SUMMARIES: 1}
+    queries = ["love", "war", "family", "life", "the", "world war", "new york", "police"]
+    pruned = 0
+    for query in queries:
+        analyzed_query = search_engine.query_analyzer.analyze_fields(query, weights)
+        postings_read = search_engine.find_scores_with_unsafe_ranking(analyzed_query, method, weights, 10, {})
+        assert search_engine.postings_touched == postings_read
+        if postings_read < search_engine.count_postings(analyzed_query, Indexes.SUMMARIES):
+            pruned += 1
+
+        safe = search_engine.search(query, method, weights, safe_ranking=True, max_results=10)
+        unsafe = search_engine.search(query, method, weights, safe_ranking=False, max_results=10)
+        assert [score for _, score in unsafe] == pytest.approx([score for _, score in safe])
+        # documents tied with the k-th score may be any of the tied ones
+        kth_score = safe[-1][1]
+        assert {doc_id for doc_id, score in unsafe if score > kth_score} == {
+            doc_id for doc_id, score in safe if score > kth_score
+        }
+    if method != "OkapiBM25":
+        assert pruned > 0
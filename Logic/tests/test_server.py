@@ -0,0 +1,99 @@
+import json
+import asyncio
+
+import pytest
+
+from Logic import server as server_module
+from Logic.server import SearchServer
+
+
+def post_search(search_server, request):
+    return asyncio.run(search_server.route("POST", "/search", json.dumps(request).encode()))
+
+
+@pytest.mark.parametrize(
+    "request_body",
+    [
+        {"max_results": 5},
+        {"query": ["spider man"]},
+        {"query": "spider man", "max_results": [5]},
+        {"query": "spider man", "max_results": "5"},
+        {"query": "spider man", "max_results": True},
+        {"query": "spider man", "method": 1},
+        {"query": "spider man", "weights": [0.3, 0.3]},
+        {"query": "spider man", "weights": [0.3, "0.3", 0.4]},
+        {"query": "spider man", "weights": {"stars": 1}},
+        {"query": "spider man", "unigram_smoothing": ["naive"]},
+        {"query": "spider man", "alpha": "0.5"},
+        {"query": "spider man", "lamda": [0.5]},
+    ],
+)
+def test_invalid_search_requests_are_rejected(request_body):
+    status, payload = post_search(SearchServer(), request_body)
+    assert status == 400
+    assert "invalid request" in payload["error"]
+
+
+def test_search_options_are_coerced():
+    query, options = SearchServer().parse_search_request(
+        json.dumps({"query": "spider man", "max_results": 5, "weights": [1, 0, 1], "alpha": 1}).encode()
+    )
+    assert query == "spider man"
+    assert options == (5, "ltn.lnn", (1.0, 0.0, 1.0), None, 1.0, None)
+    hash(options)
+
+
+def test_a_bad_batch_does_not_stop_later_searches(monkeypatch):
+    monkeypatch.setattr(
+        server_module.utils, "search_batch", lambda queries, *options: [[("tt0111161", 1.0)] for _ in queries]
+    )
+
+    async def run():
+        search_server = SearchServer(batch_window=0)
+        search_server.queue = asyncio.Queue()
+        search_server.spawn(search_server.run_batches())
+        loop = asyncio.get_running_loop()
+        bad, good = loop.create_future(), loop.create_future()
+        # options that bypassed parse_search_request and cannot be grouped
+        await search_server.queue.put(("spider man", ([5], "ltn.lnn", (0.3, 0.3, 0.4), None, None, None), bad))
+        await search_server.queue.put(("spider man", (5, "ltn.lnn", (0.3, 0.3, 0.4), None, None, None), good))
+        with pytest.raises(TypeError):
+            await asyncio.wait_for(bad, 1)
+        assert await asyncio.wait_for(good, 1) == [["tt0111161", 1.0]]
+
+        status, payload = await search_server.route("POST", "/search", json.dumps({"query": "drama"}).encode())
+        assert status == 200 and payload == {"results": [["tt0111161", 1.0]]}
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize(
+    "raw_request",
+    [b"GARBAGE\r\n\r\n", b"GET /health HTTP/1.1\r\nno colon\r\n\r\n", b"GET /health HTTP/1.1\r\nContent-Length: x\r\n\r\n"],
+)
+def test_malformed_http_requests_get_a_400(raw_request):
+    async def run():
+        search_server = SearchServer()
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw_request)
+        reader.feed_eof()
+        writer = RecordingWriter()
+        await search_server.handle_connection(reader, writer)
+        return bytes(writer.data)
+
+    response = asyncio.run(run())
+    assert response.startswith(b"HTTP/1.1 400 Bad Request")
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data.extend(data)
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
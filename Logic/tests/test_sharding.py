@@ -0,0 +1,74 @@
+import os
+import json
+import shutil
+
+import pytest
+
+from Logic.core.search import SearchEngine
+from Logic.core.sharding import ShardedSearchEngine, get_shard_paths, merge_results, shards_are_current
+from Logic.core.indexer.indexes_enum import Indexes
+
+INDEXES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "indexes")
+QUERIES = ["spider man in wonderland", "al pacino crime", "drama", "love war", "tom hanks", "the"]
+WEIGHTS = {Indexes.STARS: 1, Indexes.GENRES: 1, Indexes.SUMMARIES: 1}
+
+
+def copy_indexes(path):
+    for file_name in os.listdir(INDEXES_PATH):
+        if file_name.endswith(".json"):
+            shutil.copy(os.path.join(INDEXES_PATH, file_name), path)
+    return path
+
+
+@pytest.fixture(scope="module")
+def engines(tmp_path_factory):
+    path = copy_indexes(os.path.join(str(tmp_path_factory.mktemp("indexes")), ""))
+    with ShardedSearchEngine(path, number_of_shards=3) as sharded_search_engine:
+        yield SearchEngine(path, read_only=True), sharded_search_engine
+
+
+def test_merge_results_breaks_ties_by_document_id():
+    shard_results = [[("tt3", 2.0), ("tt5", 1.0)], [("tt4", 2.0), ("tt1", 1.0)], [("tt2", 2.0)]]
+    assert merge_results(shard_results, 4) == [("tt2", 2.0), ("tt3", 2.0), ("tt4", 2.0), ("tt1", 1.0)]
+
+
+@pytest.mark.parametrize(
+    "method, options",
+    [
+        ("ltn.lnn", {}),
+        ("ltc.lnc", {}),
+        ("OkapiBM25", {}),
+        ("unigram", {"smoothing_method": "naive"}),
+        ("unigram", {"smoothing_method": "bayes"}),
+        ("unigram", {"smoothing_method": "mixture"}),
+    ],
+)
+def test_sharded_results_equal_the_whole_index(engines, method, options):
+    search_engine, sharded_search_engine = engines
+    for query in QUERIES:
+        expected = search_engine.search(query, method, WEIGHTS, max_results=20, **options)
+        result = sharded_search_engine.search(query, method, WEIGHTS, max_results=20, **options)
+        assert [doc_id for doc_id, _ in result] == [doc_id for doc_id, _ in expected]
+        assert [score for _, score in result] == pytest.approx([score for _, score in expected])
+
+
+def test_shards_of_an_older_index_are_rebuilt(tmp_path):
+    path = copy_indexes(os.path.join(str(tmp_path), ""))
+    metadata_path = os.path.join(path, "documents_metadata_index.json")
+    with ShardedSearchEngine(path, number_of_shards=2):
+        pass
+    shard_paths = get_shard_paths(path, 2)
+    assert shards_are_current(path, shard_paths)
+
+    with open(metadata_path, "r") as file:
+        metadata = json.load(file)
+    metadata["document_count"] += 1
+    with open(metadata_path, "w") as file:
+        json.dump(metadata, file)
+    assert not shards_are_current(path, shard_paths)
+
+    with ShardedSearchEngine(path, number_of_shards=2):
+        pass
+    assert shards_are_current(path, shard_paths)
+    with open(os.path.join(shard_paths[0], "documents_metadata_index.json"), "r") as file:
+        assert json.load(file)["document_count"] == metadata["document_count"]
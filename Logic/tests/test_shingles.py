@@ -0,0 +1,64 @@
+import random
+
+import numpy as np
+import pytest
+
+from Logic.core.utility.shingles import ShingleArrays, hash_shingles, jaccard_of_arrays
+from Logic.core.utility.spell_correction import SpellCorrection
+
+ALPHABET = "abcdeé ñ😀"
+
+
+def set_shingles(text, k):
+    return {text[i : i + k] for i in range(len(text) - k + 1)}
+
+
+def set_jaccard(first, second):
+    union = first | second
+    return len(first & second) / len(union) if union else 0.0
+
+
+def random_texts(rng, count, max_length):
+    return ["".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, max_length))) for _ in range(count)]
+
+
+@pytest.mark.parametrize("k", [1, 2, 3, 4])
+@pytest.mark.parametrize("max_length", [6, 200])
+def test_array_jaccard_equals_set_jaccard(k, max_length):
+    # short texts are merged in Python, long ones binary searched
+    rng = random.Random(k * max_length)
+    texts = random_texts(rng, 60, max_length) + ["", "a", "ab", "abc"]
+    for first in texts:
+        second = rng.choice(texts)
+        first_shingles, second_shingles = set_shingles(first, k), set_shingles(second, k)
+        assert len(hash_shingles(first, k)) == len(first_shingles)
+        assert jaccard_of_arrays(hash_shingles(first, k), hash_shingles(second, k)) == pytest.approx(
+            set_jaccard(first_shingles, second_shingles)
+        )
+
+
+@pytest.mark.parametrize("k", [2, 4])
+def test_shingle_arrays_match_each_text(k):
+    texts = random_texts(random.Random(k), 300, 12) + ["", "x", "", "aaaa"]
+    shingle_arrays = ShingleArrays.from_texts(texts, k)
+    assert len(shingle_arrays) == len(texts)
+    for i, text in enumerate(texts):
+        assert np.array_equal(shingle_arrays[i], hash_shingles(text, k))
+    assert shingle_arrays.get_sizes().tolist() == [len(set_shingles(text, k)) for text in texts]
+
+
+def test_nearest_words_match_a_scan():
+    rng = random.Random(0)
+    words = sorted(set(text.replace(" ", "") for text in random_texts(rng, 2000, 9)) - {""})
+    spell_correction = SpellCorrection([words], language_model=False)
+    for word in random_texts(rng, 100, 9):
+        word = word.replace(" ", "")
+        query_shingles = set_shingles(word, 2)
+        scores = [
+            (candidate, set_jaccard(query_shingles, set_shingles(candidate, 2)))
+            for candidate in words
+            if candidate != word
+        ]
+        scores = [(candidate, score) for candidate, score in scores if score >= 0.3 and query_shingles]
+        scores.sort(key=lambda x: (-x[1], x[0]))
+        assert spell_correction.find_nearest_words(word) == [candidate for candidate, _ in scores[:5]]
@@ -0,0 +1,86 @@
+import random
+from fractions import Fraction
+
+import pytest
+
+from Logic.core.utility.preprocess import Preprocessor
+from Logic.core.utility.snippet import Snippet, get_snippet_document
+
+VOCABULARY = (
+    "the man men running runs runner Ran war wars love loved lovers city night Redemption, prison "
+    "prisons friend escape escaped (hope) life dark knight knights return returns"
+).split()
+
+
+@pytest.fixture(scope="module")
+def snippet():
+    preprocessor = Preprocessor([])
+    rng = random.Random(0)
+    terms = sorted(set(preprocessor.preprocess_text(" ".join(VOCABULARY))))
+    return Snippet(preprocessor=preprocessor, idfs={term: rng.uniform(0.1, 5) for term in terms})
+
+
+def exhaustive_best_start(snippet, doc, query):
+    """
+    Scores every passage of a doc on its own, in the order `find_best_passages` documents.
+    """
+    analyzer = snippet.preprocessor.analyzer
+    terms = analyzer.analyze_words(doc.split())
+    query_terms = {term for _, term in snippet.get_query_terms(query) if term}
+    width = 2 * snippet.number_of_words_on_each_side + 1
+    best = None
+    for start in range(max(len(terms) - width, 0) + 1):
+        end = min(start + width, len(terms))
+        hits = [i for i in range(start, end) if terms[i] in query_terms]
+        covered = {terms[i] for i in hits}
+        covered_idf = sum(snippet.idfs.get(term, snippet.default_idf) for term in covered)
+        density = sum(snippet.idfs.get(terms[i], snippet.default_idf) for i in hits)
+        offset = Fraction(abs(2 * sum(i - start for i in hits) - (end - start - 1) * len(hits)), max(len(hits), 1))
+        key = (-len(covered), -round(covered_idf, 9), -round(density, 9), offset, start)
+        if best is None or key < best:
+            best = key
+    return best[-1] if best is not None else 0
+
+
+def random_batch(rng):
+    docs = [
+        " ".join(rng.choice(VOCABULARY) for _ in range(rng.choice([0, 3, 11, 12, 40, 150])))
+        for _ in range(rng.randint(1, 8))
+    ]
+    query = " ".join(rng.sample(VOCABULARY + ["zebra", "the"], rng.randint(1, 4)))
+    return docs, query
+
+
+def test_batch_passages_equal_the_exhaustive_choice(snippet):
+    rng = random.Random(1)
+    width = 2 * snippet.number_of_words_on_each_side + 1
+    for _ in range(200):
+        docs, query = random_batch(rng)
+        for doc, (text, _) in zip(docs, snippet.find_snippets([(doc, None) for doc in docs], query)):
+            if not text:
+                continue
+            start = exhaustive_best_start(snippet, doc, query)
+            words = [word[3:-3] if word.startswith("***") else word for word in text.split()]
+            assert words == doc.split()[start : start + width]
+
+
+def test_batch_snippets_equal_single_and_stored_snippets(snippet):
+    rng = random.Random(2)
+    analyzer = snippet.preprocessor.analyzer
+    for _ in range(100):
+        docs, query = random_batch(rng)
+        stored = Snippet(
+            snippet_index={i: get_snippet_document(doc, analyzer) for i, doc in enumerate(docs)},
+            preprocessor=snippet.preprocessor,
+            idfs=snippet.idfs,
+        )
+        batch = snippet.find_snippets([(doc, None) for doc in docs], query)
+        assert batch == [snippet.find_snippet(doc, query) for doc in docs]
+        assert batch == stored.find_snippets([(doc, i) for i, doc in enumerate(docs)], query)
+
+
+def test_missing_query_words(snippet):
+    doc = "A man was running through the dark city, while knights returned."
+    text, missing = snippet.find_snippet(doc, "Dark Knight zebra")
+    assert "***dark***" in text and "***knights***" in text
+    assert missing == ["zebra"]
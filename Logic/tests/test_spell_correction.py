@@ -0,0 +1,53 @@
+import pytest
+
+from Logic import utils
+from Logic.core.utility.spell_correction import SpellCorrection
+
+# the vocabulary has words close to the star names ('human', 'thurmana') but not the names
+TEXTS = [
+    "The Godfather is a 1972 crime film.",
+    "A human story of the Godfather's family.",
+    "Thurmana",
+    "The Shawshank Redemption tells of hope.",
+]
+
+
+@pytest.fixture
+def corrector(monkeypatch):
+    corrector = SpellCorrection(utils.get_spell_words(text) for text in TEXTS)
+    monkeypatch.setattr(utils, "spell_correction", corrector)
+    return corrector
+
+
+@pytest.mark.parametrize("context", [True, False])
+@pytest.mark.parametrize("query", ["uma thurman", "Uma Thurman", "al pacino", "quentin tarantino"])
+def test_indexed_star_names_are_not_corrected(corrector, query, context):
+    assert utils.correct_text(query, context=context) == query
+
+
+@pytest.mark.parametrize("context", [True, False])
+def test_corrections_are_not_stems(corrector, context):
+    assert utils.correct_text("godfathr", context=context) == "godfather"
+    assert utils.correct_text("shawshenk", context=context) == "shawshank"
+
+
+def test_known_words_of_any_field():
+    assert utils.get_known_words(["uma", "thurman", "drama", "godfather", "the", "xqzvw"]) == [
+        True, True, True, True, True, False
+    ]
+
+
+@pytest.mark.parametrize("query", ["The Shawshank Redemption", "the godfather", "Uma Thurman", "Pulp Fiction"])
+def test_known_phrases_round_trip_in_context(corrector, query):
+    assert utils.correct_text(query, context=True) == query
+
+
+@pytest.mark.parametrize("query", ["The Shawshank Redemption", "the Godfather", "A HUMAN story"])
+def test_vocabulary_phrases_round_trip_in_context(corrector, query):
+    assert corrector.spell_check_in_context(query) == query
+
+
+def test_context_corrections_are_vocabulary_words(corrector):
+    assert corrector.spell_check_in_context("The Shawshenk Redemptoin") == "The shawshank redemption"
+    for word, terms, _ in corrector.get_candidates("godfathr"):
+        assert word in corrector.word_counter and terms == [word]
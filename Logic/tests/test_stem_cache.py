@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from Logic.core.utility.stem_cache import StemCache
+from Logic.core.utility.preprocess import Preprocessor
+
+WORDS = ["running", "runs", "connection", "connected", "movies", "godfather", "café"]
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    cache = StemCache(str(tmp_path / "stem_cache.bin"))
+    for word in WORDS[:3]:
+        cache.stem(word)
+    cache.save()
+    cache.close()
+    return str(tmp_path / "stem_cache.bin")
+
+
+def test_saved_stems_are_found(cache_path):
+    cache = StemCache(cache_path)
+    assert list(cache.items()) == sorted((word, StemCache.stemmer.stem(word)) for word in WORDS[:3])
+    for word in WORDS:
+        assert cache.stem(word) == StemCache.stemmer.stem(word)
+    assert cache.get_statistics()["hits"] == 3
+    assert len(cache.added) == len(WORDS) - 3
+    cache.save()
+    assert len(StemCache(cache_path)) == len(WORDS)
+
+
+def test_read_only_cache_does_not_grow(cache_path):
+    cache = StemCache(cache_path, read_only=True)
+    for _ in range(3):
+        for word in WORDS:
+            assert cache.stem(word) == StemCache.stemmer.stem(word)
+    assert cache.added == {}
+    assert len(cache) == 3
+    with pytest.raises(ValueError):
+        cache.save()
+
+
+def test_worker_processes_do_not_write_the_cache(cache_path):
+    cache = StemCache(cache_path)
+    preprocessor = Preprocessor([" ".join(WORDS)] * 20, persistent_stem_cache=cache)
+    expected = [StemCache.stemmer.stem(word) for word in WORDS]
+    assert preprocessor.preprocess(workers=2, chunk_size=4) == [expected] * 20
+    # only the words stemmed in this process are added
+    assert cache.added == {}
+    assert len(StemCache(cache_path)) == 3
+    preprocessor.preprocess_text(" ".join(WORDS))
+    assert sorted(cache.added) == sorted(WORDS[3:])
@@ -0,0 +1,102 @@
+import json
+import os
+import random
+import fnmatch
+
+import pytest
+
+from Logic.core.indexer.term_dictionary import Term_dictionary
+
+INDEXES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "indexes")
+
+
+def load_vocabulary(field):
+    with open(os.path.join(INDEXES_PATH, field + ".json"), "r") as file:
+        return sorted(json.load(file))
+
+
+def make_boundary_vocabulary():
+    """
+    Terms that share long prefixes, repeat, and straddle the edges of 16-term blocks.
+    """
+    terms = [f"filler{i:02d}" for i in range(14)]
+    # positions 14 to 19 cross the first block boundary with one shared prefix
+    terms += ["pac", "paca", "pacino", "pacino", "pacinos", "pack"]
+    terms += ["a" * length for length in range(1, 20)]
+    terms += ["", "b", "ba", "bab", "baba", "babab", "z" * 300, "z" * 299 + "y"]
+    return terms
+
+
+VOCABULARIES = {
+    "boundary": make_boundary_vocabulary(),
+    "stars": load_vocabulary("stars"),
+    "summaries": load_vocabulary("summaries"),
+}
+
+
+def get_queries(terms, rng, count=200):
+    """
+    Prefixes of the terms at and around the block boundaries, random ones, and ones not in the vocabulary.
+    """
+    unique_terms = sorted(set(terms))
+    boundary_terms = [unique_terms[i] for i in range(len(unique_terms)) if i % 16 in (0, 1, 14, 15)]
+    sampled_terms = boundary_terms[:count] + rng.sample(unique_terms, min(count, len(unique_terms)))
+    prefixes = {term[:length] for term in sampled_terms for length in range(len(term) + 1)}
+    prefixes.update(["zzzzzzzzzzzzzzzzzzzzzzzzzzzzzzz", "￿", "pacj", "aaaaab"])
+    return sorted(prefixes)
+
+
+@pytest.mark.parametrize("name", list(VOCABULARIES))
+@pytest.mark.parametrize("block_size", [1, 2, 16])
+def test_iteration_and_membership(name, block_size):
+    terms = VOCABULARIES[name]
+    dictionary = Term_dictionary(terms, block_size)
+    unique_terms = sorted(set(terms))
+    assert list(dictionary) == unique_terms
+    assert len(dictionary) == len(unique_terms)
+    assert all(term in dictionary for term in unique_terms)
+    assert not any(term + "\x00" in dictionary for term in unique_terms[:200])
+
+
+@pytest.mark.parametrize("name", list(VOCABULARIES))
+@pytest.mark.parametrize("block_size", [1, 3, 16])
+def test_prefix_matches_a_scan(name, block_size):
+    terms = VOCABULARIES[name]
+    dictionary = Term_dictionary(terms, block_size)
+    unique_terms = sorted(set(terms))
+    for prefix in get_queries(terms, random.Random(0)):
+        expected = [term for term in unique_terms if term.startswith(prefix)]
+        assert dictionary.prefix(prefix) == expected
+        assert dictionary.prefix(prefix, limit=3) == expected[:3]
+
+
+@pytest.mark.parametrize("name", list(VOCABULARIES))
+@pytest.mark.parametrize("block_size", [1, 3, 16])
+def test_range_matches_a_scan(name, block_size):
+    terms = VOCABULARIES[name]
+    dictionary = Term_dictionary(terms, block_size)
+    unique_terms = sorted(set(terms))
+    rng = random.Random(1)
+    bounds = get_queries(terms, rng, count=50)
+    for _ in range(300):
+        low, high = sorted(rng.sample(bounds, 2))
+        assert dictionary.range(low, high) == [term for term in unique_terms if low <= term <= high]
+        assert dictionary.range(low, high, include_high=False) == [
+            term for term in unique_terms if low <= term < high
+        ]
+
+
+@pytest.mark.parametrize("name", list(VOCABULARIES))
+def test_wildcard_matches_a_scan(name):
+    terms = VOCABULARIES[name]
+    dictionary = Term_dictionary(terms)
+    unique_terms = sorted(set(terms))
+    rng = random.Random(2)
+    patterns = ["pac*", "pa?in*", "a*a", "*ino", "?", "b?b*", "*", "filler1?", "z*y"]
+    for term in rng.sample(unique_terms, 30):
+        if len(term) > 2:
+            patterns += [term[:2] + "*", term[:1] + "?" + term[2:], "*" + term[-2:]]
+    for pattern in patterns:
+        expected = [term for term in unique_terms if fnmatch.fnmatchcase(term, pattern)]
+        assert dictionary.wildcard(pattern) == expected
+        assert dictionary.wildcard(pattern, limit=2) == expected[:2]
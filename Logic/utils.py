@@ -3,14 +3,264 @@ from .core.search import SearchEngine
 from .core.utility.spell_correction import SpellCorrection
 from .core.utility.snippet import Snippet
 from .core.indexer.indexes_enum import Indexes, Index_types
+from .core.utility.profiling import MetricsRegistry
+from .core.utility.autocomplete import Autocomplete, LINK_PATTERN, TAG_PATTERN
+from .core.utility.preprocess import Analyzer
+from .core.indexer.index_reader import Index_reader
 import json
+import os
 
 movies_dataset = None  # TODO: load your movies dataset (from the json file you saved your indexes in), here
 # You can refer to `get_movie_by_id` to see how this is used.
-# search_engine = SearchEngine()
+metrics_registry = MetricsRegistry()  # stage timings of the search engine and the UI
+search_engine = None  # loaded on first use by `get_search_engine`
+autocomplete = None  # built on first use by `get_autocomplete`
+spell_correction = None  # loaded (or built and saved) on first use by `get_spell_correction`
+snippet = None  # made on first use by `get_snippet`
+all_documents = None  # optional raw texts to build the spell corrector from, instead of `get_spell_texts`
+spell_analyzer = Analyzer(["lowercase", "links", "punctuation"])  # the words of the spell corrector
 
 
-def correct_text(text: str, all_documents: List[str]) -> str:
+def get_search_engine() -> SearchEngine:
+    """
+    Returns the shared search engine, loading the indexes on the first call.
+
+    Returns
+    ----------
+    SearchEngine
+        A read-only search engine that reports to `metrics_registry`.
+    """
+    global search_engine
+    if search_engine is None:
+        search_engine = SearchEngine(hooks=[metrics_registry], read_only=True)
+    return search_engine
+
+
+def get_autocomplete() -> Autocomplete:
+    """
+    Returns the shared query completions, building them on the first call.
+
+    Returns
+    ----------
+    Autocomplete
+        The completions of the indexed movies, built from the crawled movies in `movies_dataset`.
+
+    Raises
+    ----------
+    ValueError
+        If `movies_dataset` does not hold the crawled movies.
+    """
+    global autocomplete
+    if autocomplete is None:
+        if not isinstance(movies_dataset, list):
+            raise ValueError("Query completion needs the crawled movies; load them into utils.movies_dataset.")
+        documents = Index_reader(get_search_engine().path, Indexes.DOCUMENTS).index
+        autocomplete = Autocomplete.from_documents(documents, movies_dataset)
+    return autocomplete
+
+
+def get_snippet() -> Snippet:
+    """
+    Returns the shared snippet maker, with the snippet index of the search engine if it was built.
+
+    Returns
+    ----------
+    Snippet
+        The snippet maker. It matches words with the search engine's preprocessor and weighs
+        them by their idf in the summaries. Documents without stored offsets are tokenized when
+        they are shown.
+    """
+    global snippet
+    if snippet is None:
+        engine = get_search_engine()
+        snippet = Snippet(
+            snippet_index=None if engine.snippet_index is None else engine.snippet_index.index,
+            preprocessor=engine.query_analyzer.preprocessor,
+            idfs=engine.scorers[Indexes.SUMMARIES].idf,
+        )
+    return snippet
+
+
+def find_snippets(movies: List[Dict[str, str]], query: str) -> List[tuple]:
+    """
+    Finds the snippets of the first page summaries of some movies (e.g. the search results) at once.
+
+    Parameters
+    ---------
+    movies: List[Dict[str, str]]
+        The movies, with their ids and first page summaries.
+    query: str
+        The query text
+
+    Returns
+    ----------
+    list
+        The snippet and the missing query words of every movie (see `Snippet.find_snippet`).
+    """
+    docs = [(movie["first_page_summary"] or "", movie["id"]) for movie in movies]
+    return get_snippet().find_snippets(docs, query)
+
+
+def complete_query(prefix: str, max_result_count: int = 5) -> List[str]:
+    """
+    Completes a partly typed query.
+
+    Parameters
+    ---------
+    prefix: str
+        The typed text.
+    max_result_count: int
+        The maximum number of completions.
+
+    Returns
+    ----------
+    list of str
+        The completions, the most popular first.
+    """
+    return [phrase for phrase, _ in get_autocomplete().complete(prefix, max_result_count)]
+
+
+def record_query(query: str):
+    """
+    Makes a searched query more popular in the completions, if it is one of them. Other
+    queries are not added.
+
+    Parameters
+    ---------
+    query: str
+        The query the user searched.
+    """
+    get_autocomplete().record_selection(query)
+
+
+def get_weights(weights: list) -> Dict[Indexes, float]:
+    """
+    Maps the list of field weights used by the UI to the weights of the search engine.
+
+    Parameters
+    ---------
+    weights: list
+        The weights of stars, genres and summaries, in this order.
+
+    Returns
+    ----------
+    dict
+        The weights keyed by index.
+    """
+    return {
+        Indexes.STARS: weights[0],
+        Indexes.GENRES: weights[1],
+        Indexes.SUMMARIES: weights[2],
+    }
+
+
+def get_spell_texts():
+    """
+    Returns the unstemmed texts of the indexed movies the spell corrector is built from: the
+    titles, star names, genres and summaries of `movies_dataset`, or else the first page
+    summaries of the snippet index.
+
+    Returns
+    ----------
+    list of str or None
+        The texts, or None if neither is available. The documents index only holds stems,
+        which must not be suggested to users.
+    """
+    if isinstance(movies_dataset, list):
+        texts = []
+        for movie in movies_dataset:
+            for field in ["title", "first_page_summary"]:
+                if isinstance(movie.get(field), str):
+                    texts.append(movie[field])
+            for field in ["stars", "genres", "summaries"]:
+                if isinstance(movie.get(field), list):
+                    texts.extend(value for value in movie[field] if isinstance(value, str))
+        return texts
+    engine = get_search_engine()
+    if engine.snippet_index is not None:
+        return [document["text"] for document in engine.snippet_index.index.values()]
+    return None
+
+
+def get_spell_words(text: str) -> List[str]:
+    """
+    Splits a text into the words the spell corrector knows: lower-cased, without markup, links
+    and punctuation, but not stemmed, so that its corrections can be shown as they are.
+    """
+    return spell_analyzer.analyze(TAG_PATTERN.sub(" ", LINK_PATTERN.sub(" ", text)))
+
+
+def get_spell_correction(all_documents: List[str] = None) -> SpellCorrection:
+    """
+    Returns the shared spell corrector. It is loaded from `spell_correction_words/` next to
+    the indexes; if it has not been built yet, it is built once (from `all_documents`, or the
+    texts of `get_spell_texts`) and saved there.
+
+    Parameters
+    ---------
+    all_documents : list of str, optional
+        The raw (unstemmed) documents to build the spell corrector from, if it has to be built.
+
+    Returns
+    ----------
+    SpellCorrection or None
+        The spell corrector, or None if it is not saved and there are no texts to build it from.
+    """
+    global spell_correction
+    if spell_correction is None:
+        path = os.path.join(get_search_engine().path, "spell_correction_words")
+        if os.path.exists(os.path.join(path, "bigram_keys.npy")):
+            spell_correction = SpellCorrection.load(path)
+        else:
+            if all_documents is None:
+                all_documents = get_spell_texts()
+                if all_documents is None:
+                    return None
+            spell_correction = SpellCorrection(get_spell_words(text) for text in all_documents)
+            try:
+                spell_correction.save(path)
+            except OSError:
+                pass  # e.g. a read-only deployment; the corrector is kept in memory
+    return spell_correction
+
+
+def get_known_words(words: List[str]) -> List[bool]:
+    """
+    Finds the words of a query that the indexes know.
+
+    Parameters
+    ---------
+    words: List[str]
+        The words of the query.
+
+    Returns
+    ----------
+    List[bool]
+        For every word, whether its analyzed terms are in the index of any field (stars,
+        genres or summaries). A word of a keyword field (e.g. a star name) is known if it is
+        part of a run of words that is a term of the field. Stopwords have no terms and are
+        known.
+    """
+    engine = get_search_engine()
+    query_analyzer = engine.query_analyzer
+    known = [False] * len(words)
+    for field, reader in engine.document_indexes.items():
+        index = reader.index
+        field_analyzer = query_analyzer.field_analyzers.get(field)
+        if field_analyzer is not None and field_analyzer.analyzer_type == "keyword":
+            lowered = [word.lower() for word in words]
+            for start in range(len(words)):
+                for length in range(1, min(field_analyzer.max_keyword_words, len(words) - start) + 1):
+                    if " ".join(lowered[start : start + length]) in index:
+                        known[start : start + length] = [True] * length
+            continue
+        for i, word in enumerate(words):
+            if not known[i]:
+                known[i] = all(term in index for term in query_analyzer.analyze(word, field))
+    return known
+
+
+def correct_text(text: str, all_documents: List[str] = None, context: bool = True) -> str:
     """
     Correct the give query text, if it is misspelled using Jacard similarity
 
@@ -18,26 +268,47 @@ def correct_text(text: str, all_documents: List[str]) -> str:
     ---------
     text: str
         The query text
-    all_documents : list of str
-        The input documents.
+    all_documents : list of str, optional
+        The input documents, only read if the spell corrector has not been built yet.
+    context : bool
+        If True, the corrections of the words are chosen together, with the bigram language
+        model of the texts (`SpellCorrection.beam_search`); otherwise one by one.
 
     Returns
     str
-        The corrected form of the given text
+        The corrected form of the given text. Words the indexes know (see `get_known_words`)
+        are kept as typed, the others are replaced by unstemmed words. The text is returned
+        as it is if there is no spell corrector.
     """
-    # TODO: You can add any preprocessing steps here, if needed!
-    # spell_correction_obj = SpellCorrection(all_documents)
-    # text = spell_correction_obj.spell_check(text)
-    return text
+    corrector = get_spell_correction(all_documents)
+    if corrector is None:
+        return text
+    words = text.split()
+    use_context = context and corrector.language_model is not None
+    positions = []
+    for word, known in zip(words, get_known_words(words)):
+        spell_words = get_spell_words(word)
+        if known or not spell_words:
+            positions.append([(word, spell_words, 0.0)])
+        elif use_context:
+            positions.append(corrector.get_candidates(spell_words[0]))
+        else:
+            positions.append([(corrector.spell_check(spell_words[0]).strip(), [], 0.0)])
+    if use_context:
+        return " ".join(corrector.beam_search(positions))
+    return " ".join(candidates[0][0] for candidates in positions)
 
 
 def search(
     query: str,
     max_result_count: int,
-    method: str = "ltn-lnn",
+    method: str = "ltn.lnn",
     weights: list = [0.3, 0.3, 0.4],
     should_print=False,
     preferred_genre: str = None,
+    unigram_smoothing: str = None,
+    alpha: float = None,
+    lamda: float = None,
 ):
     """
     Finds relevant documents to query
@@ -50,7 +321,7 @@ def search(
     max_result_count: Return top 'max_result_count' docs which have the highest scores.
                       notice that if max_result_count = -1, then you have to return all docs
 
-    method: 'ltn.lnn' or 'ltc.lnc' or 'OkapiBM25'
+    method: 'ltn.lnn' or 'ltc.lnc' or 'OkapiBM25' or 'unigram'
 
     weights:
         The list, containing importance weights in the search result for each of these items:
@@ -59,19 +330,90 @@ def search(
             Indexes.SUMMARIES: weights[2],
 
     preferred_genre:
-        A list containing preference rates for each genre. If None, the preference rates are equal.
-        (You can leave it None for now)
+        A genre, or a list of genres, the results must have at least one of. If None, the results
+        are not filtered by genre.
+
+    unigram_smoothing:
+        The smoothing method of the unigram model (naive, bayes or mixture).
+
+    alpha, lamda:
+        The parameters of the unigram smoothing. None means the search engine's default.
 
     Returns
     ----------------------------------------------------------------------------------------------------
     list
     Retrieved documents with snippet
     """
-    # weights = ...  # TODO
-    # return search_engine.search(
-    #     query, method, weights, max_results=max_result_count, safe_ranking=True
-    # )
-    return None
+    return search_batch(
+        [query],
+        max_result_count,
+        method,
+        weights,
+        unigram_smoothing=unigram_smoothing,
+        alpha=alpha,
+        lamda=lamda,
+        filters=None if preferred_genre is None else {"genres": preferred_genre},
+    )[0]
+
+
+def search_batch(
+    queries: List[str],
+    max_result_count: int,
+    method: str = "ltn.lnn",
+    weights: list = [0.3, 0.3, 0.4],
+    unigram_smoothing: str = None,
+    alpha: float = None,
+    lamda: float = None,
+    filters: dict = None,
+    executor=None,
+):
+    """
+    Finds relevant documents to several queries that share the same options.
+    The parameters are the same as `search`; `filters` and `executor` are passed to
+    `SearchEngine.search_batch`.
+
+    Returns
+    ----------------------------------------------------------------------------------------------------
+    list
+    The results of each query, in the same order as the queries
+    """
+    return get_search_engine().search_batch(
+        queries,
+        method,
+        get_weights(weights),
+        executor=executor,
+        max_results=None if max_result_count == -1 else max_result_count,
+        safe_ranking=True,
+        smoothing_method=unigram_smoothing,
+        alpha=0.5 if alpha is None else alpha,
+        lamda=0.5 if lamda is None else lamda,
+        filters=filters,
+    )
+
+
+def suggest(prefix: str, max_result_count: int = 10, fields: list = None):
+    """
+    Suggests completions of a partly typed query word.
+
+    Parameters
+    ---------------------------------------------------------------------------------------------------
+    prefix:
+        The typed prefix.
+
+    max_result_count:
+        The maximum number of suggestions.
+
+    fields:
+        The names of the fields to suggest from ('stars', 'genres', 'summaries'). If None, all of them.
+
+    Returns
+    ----------------------------------------------------------------------------------------------------
+    list
+    The suggested index terms and their document frequencies, the most frequent first
+    """
+    if fields is not None:
+        fields = [Indexes(field) for field in fields]
+    return get_search_engine().suggest_terms(prefix, fields, max_result_count)
 
 
 def get_movie_by_id(id: str, movies_dataset: List[Dict[str, str]]) -> Dict[str, str]:
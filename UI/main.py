@@ -6,11 +6,9 @@ from Logic import utils
 import time
 from enum import Enum
 import random
-from Logic.core.utility.snippet import Snippet
 from Logic.core.link_analysis.analyzer import LinkAnalyzer
 from Logic.core.indexer.index_reader import Index_reader, Indexes
-
-snippet_obj = Snippet()
+from Logic.core.utility.profiling import SearchProfile
 
 
 class color(Enum):
@@ -45,15 +43,16 @@ def get_top_x_movies_by_rank(x: int, results: list):
     return actors, movies
 
 
-def get_summary_with_snippet(movie_info, query):
+def get_summary_with_snippet(movie_info, snippet_result):
     summary = movie_info["first_page_summary"]
-    snippet, not_exist_words = snippet_obj.find_snippet(summary, query)
+    snippet, not_exist_words = snippet_result
     if "***" in snippet:
         snippet = snippet.split()
         for i in range(len(snippet)):
             current_word = snippet[i]
             if current_word.startswith("***") and current_word.endswith("***"):
-                current_word_without_star = current_word[3:-3]
+                # the summary is lower-cased, so the highlighted word is looked up lower-cased too
+                current_word_without_star = current_word[3:-3].lower()
                 summary = summary.lower().replace(
                     current_word_without_star,
                     f"<b><font size='4' color={random.choice(list(color)).value}>{current_word_without_star}</font></b>",
@@ -77,11 +76,13 @@ def search_handling(
     filter_button,
     num_filter_results,
 ):
+    profile = SearchProfile([utils.metrics_registry])
     if filter_button:
         if "search_results" in st.session_state:
-            top_actors, top_movies = get_top_x_movies_by_rank(
-                num_filter_results, st.session_state["search_results"]
-            )
+            with profile.stage("link_analysis"):
+                top_actors, top_movies = get_top_x_movies_by_rank(
+                    num_filter_results, st.session_state["search_results"]
+                )
             st.markdown(f"**Top {num_filter_results} Actors:**")
             actors_ = ", ".join(top_actors)
             st.markdown(
@@ -91,14 +92,18 @@ def search_handling(
             st.divider()
 
         st.markdown(f"**Top {num_filter_results} Movies:**")
+        infos = [utils.get_movie_by_id(movie_id, utils.movies_dataset) for movie_id in top_movies]
+        with profile.stage("snippet"):
+            snippets = utils.find_snippets(infos, search_term)
         for i in range(len(top_movies)):
             card = st.columns([3, 1])
-            info = utils.get_movie_by_id(top_movies[i], utils.movies_dataset)
+            info = infos[i]
             with card[0].container():
                 st.title(info["title"])
                 st.markdown(f"[Link to movie]({info['URL']})")
+                summary = get_summary_with_snippet(info, snippets[i])
                 st.markdown(
-                    f"<b><font size = '4'>Summary:</font></b> {get_summary_with_snippet(info, search_term)}",
+                    f"<b><font size = '4'>Summary:</font></b> {summary}",
                     unsafe_allow_html=True,
                 )
 
@@ -127,6 +132,7 @@ def search_handling(
                 st.image(info["Image_URL"], use_column_width=True)
 
             st.divider()
+        profile.finish()
         return
 
     if search_button:
@@ -157,16 +163,21 @@ def search_handling(
                 return
 
             search_time(start_time, end_time)
+            utils.record_query(search_term)
 
+        infos = [utils.get_movie_by_id(movie_id, utils.movies_dataset) for movie_id, _ in result]
+        with profile.stage("snippet"):
+            snippets = utils.find_snippets(infos, search_term)
         for i in range(len(result)):
             card = st.columns([3, 1])
-            info = utils.get_movie_by_id(result[i][0], utils.movies_dataset)
+            info = infos[i]
             with card[0].container():
                 st.title(info["title"])
                 st.markdown(f"[Link to movie]({info['URL']})")
                 st.write(f"Relevance Score: {result[i][1]}")
+                summary = get_summary_with_snippet(info, snippets[i])
                 st.markdown(
-                    f"<b><font size = '4'>Summary:</font></b> {get_summary_with_snippet(info, search_term)}",
+                    f"<b><font size = '4'>Summary:</font></b> {summary}",
                     unsafe_allow_html=True,
                 )
 
@@ -196,6 +207,7 @@ def search_handling(
 
             st.divider()
 
+        profile.finish()
         st.session_state["search_results"] = result
         if "filter_state" in st.session_state:
             st.session_state["filter_state"] = (
@@ -215,6 +227,10 @@ def main():
     )
 
     search_term = st.text_input("Seacrh Term")
+    if search_term:
+        suggestions = utils.complete_query(search_term)
+        if suggestions:
+            st.caption("Suggestions: " + ", ".join(suggestions))
     with st.expander("Advanced Search"):
         search_max_num = st.number_input(
             "Maximum number of results", min_value=5, max_value=100, value=10, step=5